@@ -10,10 +10,21 @@ import os
 from contextlib import asynccontextmanager
 
 from commoncrawl_client import CommonCrawlClient
-from database import SessionLocal, NewsArticle, save_articles, get_articles, get_stats
+from article_record import ArticleRecord
+from ingest_pipeline import IngestPipeline
+from crawl_catalog import get_catalog
+import warc_parallel
+from database import (
+    SessionLocal, NewsArticle, iter_article_urls, async_engine,
+    insert_articles_async, get_articles_async, get_stats_async, count_articles_async,
+    get_article_content_uri_async, check_db_health_async, get_yield_summary_async
+)
+import content_store
+import seen_urls
+import processing_queue
 from models import FetchRequest, FetchResponse, Article
 
-from database import init_db, check_db_health
+from database import init_db
 
 # Configurar logging
 logging.basicConfig(
@@ -24,6 +35,36 @@ logger = logging.getLogger(__name__)
 
 # Cache en memoria (para producción usar Redis)
 fetch_cache = {}
+# Pipelines de ingesta en curso (estado por etapa en vivo para /status)
+active_pipelines: Dict[str, IngestPipeline] = {}
+
+# Reconstrucción periódica del filtro de URLs vistas (0 = desactivada)
+SEEN_FILTER_REBUILD_HOURS = float(os.getenv('SEEN_URL_FILTER_REBUILD_HOURS', '24'))
+
+async def persist_articles(articles: List[ArticleRecord], job_id: str) -> int:
+    """
+    Guardar artículos en BD, registrar sus URLs en el filtro de URLs vistas
+    y encolar los IDs insertados para el text-processor
+    """
+    if not articles:
+        return 0
+    articles = [ArticleRecord.coerce(a) for a in articles]
+    inserted = await insert_articles_async(articles)
+    await asyncio.to_thread(seen_urls.remember_urls, [a.url for a in articles if a.url])
+    try:
+        await processing_queue.get_publisher().publish([row['id'] for row in inserted], job_id)
+    except Exception as e:
+        logger.error(f"❌ Error encolando artículos para procesamiento: {e}")
+    return len(inserted)
+
+async def rebuild_seen_filter_periodically():
+    """Reconstruir el filtro desde la BD para acotar la tasa de falsos positivos"""
+    while True:
+        await asyncio.sleep(SEEN_FILTER_REBUILD_HOURS * 3600)
+        try:
+            await asyncio.to_thread(seen_urls.rebuild, iter_article_urls())
+        except Exception as e:
+            logger.error(f"❌ Error reconstruyendo filtro de URLs vistas: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -34,9 +75,17 @@ async def lifespan(app: FastAPI):
         logger.info("✅ Base de datos inicializada")
     except Exception as e:
         logger.error(f"❌ Error inicializando BD: {e}")
+    rebuild_task = None
+    if seen_urls.get_seen_filter() is not None and SEEN_FILTER_REBUILD_HOURS > 0:
+        rebuild_task = asyncio.create_task(rebuild_seen_filter_periodically())
     yield
     # Shutdown
     logger.info("👋 Apagando Data Acquisition Service...")
+    if rebuild_task:
+        rebuild_task.cancel()
+    warc_parallel.shutdown_pool()
+    await processing_queue.close_publisher()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Data Acquisition Service",
@@ -62,6 +111,12 @@ class DateRange(BaseModel):
     limit: Optional[int] = Field(50, example=50)
     keywords: Optional[List[str]] = Field([], example=["colombia", "economía"])
     domains: Optional[List[str]] = Field([], example=[".co", "eltiempo.com"])
+    content_format: Optional[str] = Field(None, pattern="^(warc|wet)$", example="wet", description="warc (HTML) o wet (texto plano); null = COMMON_CRAWL_CONTENT_FORMAT")
+
+class ReprocessRequest(BaseModel):
+    warc_file: str = Field(..., example="crawl-data/CC-MAIN-2024-10/segments/1707947425256.96/warc/CC-MAIN-20240215215748-20240216005748-00000.warc.gz")
+    relevant: Optional[bool] = Field(True, description="Veredicto previo de los candidatos (null = todos)")
+    domains: Optional[List[str]] = Field([], example=[".co", "eltiempo.com"])
 
 # ===== ENDPOINTS PRINCIPALES =====
 
@@ -82,9 +137,13 @@ async def root():
             {"method": "POST", "path": "/fetch", "description": "Iniciar adquisición (async)"},
             {"method": "POST", "path": "/fetch-sync", "description": "Adquisición síncrona (pruebas)"},
             {"method": "POST", "path": "/fetch-safe", "description": "Adquisición segura (con fallback)"},
+            {"method": "POST", "path": "/reprocess", "description": "Reprocesar candidatos de un WARC indexado"},
             {"method": "GET", "path": "/status/{job_id}", "description": "Estado de un job"},
             {"method": "GET", "path": "/articles", "description": "Obtener artículos almacenados"},
+            {"method": "GET", "path": "/articles/{article_id}/content", "description": "Contenido completo (HTML y texto) de un artículo"},
             {"method": "GET", "path": "/db/stats", "description": "Estadísticas de la BD"},
+            {"method": "GET", "path": "/seen-filter/stats", "description": "Estado del filtro de URLs vistas"},
+            {"method": "POST", "path": "/seen-filter/rebuild", "description": "Reconstruir el filtro de URLs vistas desde la BD"},
             {"method": "GET", "path": "/test/connection", "description": "Probar conexión a Common Crawl"},
             {"method": "GET", "path": "/test/mock-data", "description": "Obtener datos mock"}
         ]
@@ -94,7 +153,7 @@ async def root():
 async def health_check():
     """Verificar salud del servicio"""
     # Verificar conexión a BD usando la función
-    db_healthy = check_db_health()
+    db_healthy = await check_db_health_async()
     
     return {
         "status": "healthy",
@@ -119,6 +178,12 @@ async def service_info():
         except Exception as e:
             connection_test = {"error": str(e)}
     
+    # Rendimiento de la ingesta: noticias relevantes por GB descargado y mejores segmentos
+    try:
+        ingestion_yield = await get_yield_summary_async()
+    except Exception as e:
+        ingestion_yield = {"error": str(e)}
+    
     return {
         "service": "data-acquisition",
         "version": "2.0.0",
@@ -135,6 +200,8 @@ async def service_info():
             "max_records": os.getenv('MAX_TOTAL_RECORDS', '50'),
             "max_warc_files": os.getenv('MAX_WARC_FILES', '3')
         },
+        "segment_scheduler": os.getenv('WARC_SCHEDULER_POLICY', 'bandit'),
+        "ingestion_yield": ingestion_yield,
         "connection_test": connection_test,
         "timestamp": datetime.now().isoformat()
     }
@@ -143,23 +210,16 @@ async def service_info():
 async def list_crawls():
     """Listar crawls disponibles de Common Crawl"""
     use_mock = os.getenv('USE_MOCK_MODE', 'true').lower() == 'true'
+    catalog = get_catalog()
     
-    if use_mock:
-        # Datos mock para desarrollo
-        crawls = [
-            {"id": "CC-MAIN-2024-10", "date": "2024-05-2024-06", "size": "280TB", "status": "mock"},
-            {"id": "CC-MAIN-2024-05", "date": "2024-03-2024-04", "size": "250TB", "status": "mock"},
-            {"id": "CC-MAIN-2023-50", "date": "2023-12-2024-01", "size": "270TB", "status": "mock"}
-        ]
-    else:
-        # Datos reales
-        async with CommonCrawlClient(use_s3_direct=False, mode="auto") as client:
-            crawls = client.get_available_crawls()
+    # Misma cache que usa el cliente para resolver rangos de fechas
+    crawls = await asyncio.to_thread(catalog.list_crawls)
     
     return {
         "crawls": crawls,
         "count": len(crawls),
         "mode": "MOCK" if use_mock else "REAL",
+        "catalog_source": catalog.source,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -195,10 +255,13 @@ async def fetch_news(
 async def get_job_status(job_id: str):
     """Obtener estado de un job de adquisición"""
     if job_id in fetch_cache:
-        return {
+        status = {
             "job_id": job_id,
             **fetch_cache[job_id]
         }
+        if job_id in active_pipelines:
+            status["pipeline"] = active_pipelines[job_id].snapshot()
+        return status
     else:
         raise HTTPException(
             status_code=404, 
@@ -225,7 +288,7 @@ async def fetch_news_sync(request: DateRange):
                 )
         else:
             logger.info("🌐 Usando modo REAL para fetch-sync")
-            async with CommonCrawlClient(use_s3_direct=False, mode="auto") as client:
+            async with CommonCrawlClient(use_s3_direct=False, mode="auto", content_format=request.content_format) as client:
                 articles = await client.search_news_by_date(
                     start_date=request.start_date,
                     end_date=request.end_date,
@@ -233,7 +296,7 @@ async def fetch_news_sync(request: DateRange):
                 )
         
         # Guardar en base de datos
-        saved_count = save_articles(articles) if articles else 0
+        saved_count = await persist_articles(articles, "fetch-sync")
         
         return {
             "status": "success",
@@ -277,7 +340,7 @@ async def fetch_safe(request: DateRange):
         # Intentar con conexión real
         try:
             logger.info("🌐 Intentando conexión REAL a Common Crawl...")
-            async with CommonCrawlClient(use_s3_direct=False, mode="auto") as client:
+            async with CommonCrawlClient(use_s3_direct=False, mode="auto", content_format=request.content_format) as client:
                 articles = await client.search_news_by_date(
                     start_date=request.start_date,
                     end_date=request.end_date,
@@ -307,7 +370,7 @@ async def fetch_safe(request: DateRange):
             actual_mode = "MOCK (error fallback)"
     
     # Guardar en BD
-    saved_count = save_articles(articles) if articles else 0
+    saved_count = await persist_articles(articles, "fetch-safe")
     
     return {
         "status": "success",
@@ -320,6 +383,34 @@ async def fetch_safe(request: DateRange):
         "recommendation": "Usa /fetch-sync para solo REAL o /fetch para async"
     }
 
+@app.post("/reprocess")
+async def reprocess_warc(request: ReprocessRequest):
+    """
+    Reprocesar un WARC ya leído usando su índice de registros
+    (solo se leen los registros candidatos mediante lecturas por rango)
+    """
+    try:
+        async with CommonCrawlClient(use_s3_direct=False, mode="auto") as client:
+            articles = await client.reprocess_warc_file(
+                request.warc_file,
+                relevant=request.relevant,
+                domains=request.domains or None
+            )
+        
+        saved_count = await persist_articles(articles, f"reprocess:{request.warc_file}")
+        
+        return {
+            "status": "success",
+            "warc_file": request.warc_file,
+            "articles_found": len(articles),
+            "articles_saved": saved_count,
+            "sample": articles[:3],
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"❌ Error reprocesando {request.warc_file}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/articles")
 async def get_articles_endpoint(
     limit: int = Query(10, ge=1, le=100),
@@ -331,21 +422,18 @@ async def get_articles_endpoint(
 ):
     """Obtener artículos almacenados de la base de datos"""
     try:
-        articles = get_articles(
-            limit=limit, 
-            offset=offset, 
-            domain=domain, 
-            keyword=keyword,
-            start_date=start_date,
-            end_date=end_date
+        articles, total_count = await asyncio.gather(
+            get_articles_async(
+                limit=limit, 
+                offset=offset, 
+                domain=domain, 
+                keyword=keyword,
+                start_date=start_date,
+                end_date=end_date
+            ),
+            count_articles_async()
         )
         
-        # Obtener estadísticas
-        from database import SessionLocal, func
-        session = SessionLocal()
-        total_count = session.query(func.count(NewsArticle.id)).scalar()
-        session.close()
-        
         return {
             "articles": articles,
             "metadata": {
@@ -366,11 +454,30 @@ async def get_articles_endpoint(
         logger.error(f"Error obteniendo artículos: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/articles/{article_id}/content")
+async def get_article_content(article_id: int, include_html: bool = False):
+    """Obtener el contenido completo de un artículo desde el almacén de contenido"""
+    article = await get_article_content_uri_async(article_id)
+    if article is None:
+        raise HTTPException(status_code=404, detail=f"Artículo {article_id} no encontrado")
+    if not article["content_uri"]:
+        raise HTTPException(status_code=404, detail=f"Artículo {article_id} sin contenido completo almacenado")
+    
+    try:
+        document = await asyncio.to_thread(content_store.load_content, article["content_uri"])
+    except Exception as e:
+        logger.error(f"❌ Error leyendo contenido de {article['content_uri']}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not include_html:
+        document.pop("html", None)
+    return {**article, **document}
+
 @app.get("/db/stats")
 async def get_database_stats():
     """Obtener estadísticas de la base de datos"""
     try:
-        stats = get_stats()
+        stats = await get_stats_async()
         return {
             "status": "success",
             "stats": stats,
@@ -380,6 +487,29 @@ async def get_database_stats():
         logger.error(f"Error obteniendo stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ===== FILTRO DE URLs VISTAS =====
+
+@app.get("/seen-filter/stats")
+async def seen_filter_stats():
+    """Estado del filtro de URLs vistas (capas, URLs registradas, tasa de error)"""
+    seen_filter = seen_urls.get_seen_filter()
+    return {
+        "enabled": seen_filter is not None,
+        "backend": seen_urls.FILTER_BACKEND,
+        "stats": seen_filter.stats() if seen_filter else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/seen-filter/rebuild")
+async def rebuild_seen_filter():
+    """Reconstruir el filtro de URLs vistas con las URLs almacenadas en la BD"""
+    try:
+        result = await asyncio.to_thread(seen_urls.rebuild, iter_article_urls())
+        return {**result, "timestamp": datetime.now().isoformat()}
+    except Exception as e:
+        logger.error(f"❌ Error reconstruyendo filtro de URLs vistas: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/db/test-connection")
 async def test_database_connection():
     """Probar conexión a la base de datos"""
@@ -573,6 +703,20 @@ async def process_fetch_request(job_id: str, request: DateRange):
                     request.end_date,
                     request.limit
                 )
+            
+            fetch_cache[job_id].update({
+                "progress": 60,
+                "message": f"Encontrados {len(articles) if articles else 0} artículos. Guardando...",
+                "articles_found": len(articles) if articles else 0
+            })
+            
+            # Guardar en base de datos
+            saved_count = await persist_articles(articles, job_id)
+            result = {
+                "articles_found": len(articles) if articles else 0,
+                "articles_saved": saved_count,
+                "sample_articles": articles[:3] if articles else []
+            }
         else:
             fetch_cache[job_id].update({
                 "progress": 20,
@@ -580,34 +724,44 @@ async def process_fetch_request(job_id: str, request: DateRange):
                 "mode": "REAL"
             })
             
-            async with CommonCrawlClient(use_s3_direct=False, mode="auto") as client:
+            async with CommonCrawlClient(use_s3_direct=False, mode="auto", content_format=request.content_format) as client:
                 fetch_cache[job_id].update({
                     "progress": 40,
-                    "message": "Buscando archivos WARC..."
+                    "message": "Pipeline de ingesta en curso..."
                 })
                 
-                articles = await client.search_news_by_date(
-                    start_date=request.start_date,
-                    end_date=request.end_date,
-                    max_records=request.limit
+                def on_progress(pipeline: IngestPipeline):
+                    fetch_cache[job_id].update({
+                        "articles_found": len(pipeline.accepted_urls),
+                        "articles_saved": pipeline.articles_saved,
+                        "last_update": datetime.now().isoformat()
+                    })
+                
+                # Los artículos se guardan y encolan por lotes a medida que avanzan las etapas
+                pipeline = IngestPipeline(
+                    client, job_id, request.start_date, request.end_date, request.limit,
+                    on_progress=on_progress
                 )
-        
-        fetch_cache[job_id].update({
-            "progress": 60,
-            "message": f"Encontrados {len(articles) if articles else 0} artículos. Guardando...",
-            "articles_found": len(articles) if articles else 0
-        })
-        
-        # Guardar en base de datos
-        saved_count = save_articles(articles) if articles else 0
+                active_pipelines[job_id] = pipeline
+                try:
+                    summary = await pipeline.run()
+                finally:
+                    active_pipelines.pop(job_id, None)
+            
+            result = {
+                "articles_found": summary["articles_accepted"],
+                "articles_saved": pipeline.articles_saved,
+                "articles_enqueued": pipeline.articles_enqueued,
+                "pipeline": summary,
+                "sample_articles": pipeline.sample
+            }
         
         fetch_cache[job_id].update({
             "status": "completed",
             "progress": 100,
-            "message": f"Completado. Guardados {saved_count} artículos.",
-            "articles_saved": saved_count,
-            "end_time": datetime.now().isoformat(),
-            "sample_articles": articles[:3] if articles else []
+            "message": f"Completado. Guardados {result['articles_saved']} artículos.",
+            **result,
+            "end_time": datetime.now().isoformat()
         })
         
         # Limpiar cache antiguo (mantener solo últimos 10 jobs por 1 hora)
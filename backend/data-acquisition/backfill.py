@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Backfill de noticias históricas desde Common Crawl (fuera de los endpoints HTTP).
+
+Reparte los WARCs de los crawls del rango entre varios procesos (un event loop por proceso),
+guarda en BD, registra las URLs en el filtro de URLs vistas y encola para el text-processor.
+El estado compartido entre procesos es:
+  - checkpoint: archivo JSONL con los WARCs terminados (se omiten al relanzar)
+  - dedupe: filtro de URLs vistas (archivo o Redis) + INSERT ... ON CONFLICT (url)
+
+Uso:
+    python backfill.py --start-date 2024-01-01 --end-date 2024-01-31 --shards 16
+    python backfill.py --start-date 2024-01-01 --end-date 2024-01-31 --crawls CC-MAIN-2024-05 --warcs-per-crawl 2000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger("backfill")
+
+DEFAULT_CHECKPOINT = os.getenv('BACKFILL_CHECKPOINT', 'data/backfill-checkpoint.jsonl')
+PROGRESS_SECONDS = float(os.getenv('BACKFILL_PROGRESS_SECONDS', '10'))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill multi-proceso de noticias desde Common Crawl")
+    parser.add_argument('--start-date', required=True, help="Fecha inicial (YYYY-MM-DD)")
+    parser.add_argument('--end-date', required=True, help="Fecha final (YYYY-MM-DD)")
+    parser.add_argument('--crawls', nargs='*', default=None,
+                        help="IDs de crawl (por defecto, los que cubren el rango según el catálogo)")
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 1,
+                        help="Procesos worker (uno con su propio event loop)")
+    parser.add_argument('--concurrency', type=int, default=2, help="WARCs simultáneos por proceso")
+    parser.add_argument('--warcs-per-crawl', type=int, default=int(os.getenv('BACKFILL_WARCS_PER_CRAWL', '500')),
+                        help="WARCs a leer por crawl (elegidos por el scheduler de segmentos)")
+    parser.add_argument('--records-per-file', type=int, default=int(os.getenv('BACKFILL_RECORDS_PER_FILE', '100000')),
+                        help="Máximo de registros a leer por WARC")
+    parser.add_argument('--format', choices=['warc', 'wet'], default=None, help="Formato de entrada")
+    parser.add_argument('--limit', type=int, default=0, help="Detener al guardar N artículos (0 = sin límite)")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="Archivo JSONL de WARCs terminados")
+    parser.add_argument('--job-id', default=None, help="Job ID para las tareas encoladas")
+    parser.add_argument('--no-enqueue', action='store_true', help="No encolar para el text-processor")
+    return parser.parse_args(argv)
+
+
+# ===== CHECKPOINT =====
+
+def load_checkpoint(path: str) -> Set[str]:
+    """WARCs terminados en ejecuciones anteriores"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)['warc'])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def append_checkpoint(path: str, event: Dict) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({k: event[k] for k in ('warc', 'found', 'saved', 'shard')}) + '\n')
+
+
+# ===== PLANIFICACIÓN =====
+
+async def plan_warcs(args: argparse.Namespace, done: Set[str]) -> List[str]:
+    """Rutas de WARCs a procesar (sin las ya terminadas según el checkpoint)"""
+    from commoncrawl_client import CommonCrawlClient
+
+    async with CommonCrawlClient(mode="http", content_format=args.format) as client:
+        crawl_ids = args.crawls
+        if not crawl_ids:
+            crawls = await asyncio.to_thread(client._get_crawls_for_date_range, args.start_date, args.end_date)
+            crawl_ids = [crawl['id'] for crawl in crawls]
+        if not crawl_ids:
+            return []
+
+        paths = []
+        for crawl_id in crawl_ids:
+            # Se piden de más para compensar los ya terminados
+            warc_files = await client._get_warc_files_for_crawl(
+                crawl_id, limit=args.warcs_per_crawl + len(done), kind=client.content_format
+            )
+            pending = [path for path in warc_files if path not in done][:args.warcs_per_crawl]
+            logger.info(f"📋 {crawl_id}: {len(pending)} archivos pendientes ({len(warc_files) - len(pending)} omitidos)")
+            paths.extend(pending)
+        return paths
+
+
+# ===== WORKER (un proceso, un event loop) =====
+
+def _in_window(article, start_date: str, end_date: str) -> bool:
+    date = (article.date or '')[:10]
+    return not date or start_date <= date <= end_date
+
+
+async def _shard_main(shard: int, args: argparse.Namespace, work: multiprocessing.Queue,
+                      events: multiprocessing.Queue, stop: multiprocessing.Event) -> None:
+    import seen_urls
+    import processing_queue
+    from commoncrawl_client import CommonCrawlClient
+    from database import async_engine, insert_articles_async
+
+    publisher = processing_queue.get_publisher()
+    job_id = args.job_id or f"backfill_{args.start_date}_{args.end_date}"
+
+    async def handle(client: CommonCrawlClient, warc_path: str) -> None:
+        downloaded_before = client.stats.get('bytes_downloaded', 0)
+        read_before = client.stats.get('records_read', 0)
+        try:
+            records = await client.download_warc_file(warc_path, max_records=args.records_per_file)
+            if client.stats.get('records_read', 0) == read_before:
+                # download_warc_file no propaga errores: sin registros leídos no se marca como terminado
+                raise IOError("no se leyó ningún registro")
+            articles = [a for a in records if _in_window(a, args.start_date, args.end_date)]
+            inserted = await insert_articles_async(articles) if articles else []
+            await asyncio.to_thread(seen_urls.remember_urls, [a.url for a in articles])
+            enqueued = 0
+            if inserted and not args.no_enqueue:
+                enqueued = await publisher.publish([row['id'] for row in inserted], job_id)
+            events.put({
+                'type': 'warc', 'shard': shard, 'warc': warc_path,
+                'found': len(articles), 'saved': len(inserted), 'enqueued': enqueued,
+                'bytes_downloaded': client.stats.get('bytes_downloaded', 0) - downloaded_before
+            })
+        except Exception as e:
+            events.put({'type': 'error', 'shard': shard, 'warc': warc_path, 'error': str(e)})
+
+    async def consume(client: CommonCrawlClient) -> None:
+        while not stop.is_set():
+            warc_path = await asyncio.to_thread(work.get)
+            if warc_path is None:
+                return
+            await handle(client, warc_path)
+
+    try:
+        async with CommonCrawlClient(mode="http", content_format=args.format) as client:
+            await asyncio.gather(*(consume(client) for _ in range(max(args.concurrency, 1))))
+    finally:
+        await publisher.close()
+        await async_engine.dispose()
+
+
+def run_shard(shard: int, args: argparse.Namespace, work: multiprocessing.Queue,
+              events: multiprocessing.Queue, stop: multiprocessing.Event) -> None:
+    """Punto de entrada del proceso worker"""
+    # Cada shard ya es un proceso: sin pool de parseo anidado
+    os.environ['WARC_PARSE_WORKERS'] = '1'
+    logging.basicConfig(
+        level=os.getenv('LOG_LEVEL', 'WARNING'),
+        format=f'%(asctime)s - shard {shard} - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(_shard_main(shard, args, work, events, stop))
+    finally:
+        events.put({'type': 'done', 'shard': shard})
+
+
+# ===== PROCESO PRINCIPAL =====
+
+class Progress:
+    """Acumulados y throughput del backfill"""
+
+    def __init__(self, total_warcs: int):
+        self.total_warcs = total_warcs
+        self.warcs = 0
+        self.errors = 0
+        self.found = 0
+        self.saved = 0
+        self.enqueued = 0
+        self.bytes_downloaded = 0
+        self.started = time.perf_counter()
+
+    def add(self, event: Dict) -> None:
+        if event['type'] == 'error':
+            self.errors += 1
+            return
+        self.warcs += 1
+        self.found += event['found']
+        self.saved += event['saved']
+        self.enqueued += event['enqueued']
+        self.bytes_downloaded += event['bytes_downloaded']
+
+    def line(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        finished = self.warcs + self.errors
+        eta = (self.total_warcs - finished) * elapsed / finished if finished else 0
+        gb = self.bytes_downloaded / 1024 ** 3
+        per_gb = f"{self.found / gb:.0f}" if gb else "-"
+        return (
+            f"⏱️  {finished}/{self.total_warcs} WARCs ({self.errors} errores) | "
+            f"{self.saved} guardados de {self.found} ({self.saved / elapsed:.1f} art/s) | "
+            f"{self.bytes_downloaded / 1024 ** 2 / elapsed:.1f} MB/s | {per_gb} relevantes/GB | "
+            f"ETA {eta / 60:.1f} min"
+        )
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "warcs_processed": self.warcs,
+            "warc_errors": self.errors,
+            "articles_found": self.found,
+            "articles_saved": self.saved,
+            "articles_enqueued": self.enqueued,
+            "gb_downloaded": round(self.bytes_downloaded / 1024 ** 3, 3),
+            "elapsed_seconds": round(elapsed, 1),
+            "articles_per_second": round(self.saved / elapsed, 2) if elapsed else 0.0
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    from database import init_db
+    init_db()
+
+    done = load_checkpoint(args.checkpoint)
+    paths = asyncio.run(plan_warcs(args, done))
+    if not paths:
+        print("⚠️  Nada que procesar (sin crawls para el rango o todo en el checkpoint)")
+        return 0
+
+    shards = max(min(args.shards, len(paths)), 1)
+    print(f"🚀 Backfill {args.start_date} - {args.end_date}: {len(paths)} archivos en {shards} procesos")
+
+    ctx = multiprocessing.get_context('spawn')
+    work = ctx.Queue()
+    events = ctx.Queue()
+    stop = ctx.Event()
+    for path in paths:
+        work.put(path)
+    for _ in range(shards * max(args.concurrency, 1)):
+        work.put(None)
+
+    processes = [ctx.Process(target=run_shard, args=(i, args, work, events, stop), daemon=True) for i in range(shards)]
+    for process in processes:
+        process.start()
+
+    progress = Progress(len(paths))
+    running = shards
+    last_print = time.monotonic()
+    try:
+        while running:
+            try:
+                event = events.get(timeout=1.0)
+            except queue.Empty:
+                event = None
+                if not any(p.is_alive() for p in processes):
+                    break
+
+            if event is not None:
+                if event['type'] == 'done':
+                    running -= 1
+                else:
+                    progress.add(event)
+                    if event['type'] == 'warc':
+                        append_checkpoint(args.checkpoint, event)
+                    else:
+                        logger.error(f"❌ {event['warc']}: {event['error']}")
+                    if args.limit and progress.saved >= args.limit and not stop.is_set():
+                        print(f"✓ Alcanzado límite de {args.limit} artículos, deteniendo workers")
+                        stop.set()
+
+            if time.monotonic() - last_print >= PROGRESS_SECONDS:
+                print(progress.line(), flush=True)
+                last_print = time.monotonic()
+    except KeyboardInterrupt:
+        print("🛑 Interrumpido: los WARCs terminados quedan en el checkpoint")
+        stop.set()
+    finally:
+        # Los WARCs no consumidos se descartan: el checkpoint permite retomarlos
+        work.cancel_join_thread()
+        for process in processes:
+            process.join(timeout=30)
+
+    print(progress.line())
+    print(json.dumps(progress.summary(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
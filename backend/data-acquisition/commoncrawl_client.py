@@ -2,9 +2,11 @@ import boto3
 import requests
 import gzip
 import io
+import json
+import mmap
 import asyncio
 import aiohttp
-from typing import List, Dict, Optional, AsyncGenerator
+from typing import List, Dict, Optional, AsyncGenerator, Tuple
 from datetime import datetime, timedelta
 import logging
 from warcio import ArchiveIterator
@@ -14,35 +16,74 @@ from botocore.config import Config
 from urllib.parse import urlparse
 import random
 import os
+import time
+
+from crawl_catalog import get_catalog
+import warc_parallel
+import warc_index
+from warc_index import WarcRecordIndex, IndexRow
+from ranged_transport import parse_stream, iter_ranges_in_order, with_retries
+from s3_transport import S3RangedTransport, S3_CONCURRENCY
+from seen_urls import get_seen_filter
+from content_store import get_content_store
+from segment_scheduler import get_scheduler
+from article_record import ArticleRecord
 
 logger = logging.getLogger(__name__)
 
+# Descarga HTTP segmentada (1 = un solo stream)
+DOWNLOAD_SEGMENTS = int(os.getenv('WARC_DOWNLOAD_SEGMENTS', '1'))
+SEGMENT_SIZE = int(os.getenv('WARC_SEGMENT_SIZE', str(8 * 1024 * 1024)))
+RANGE_RETRIES = int(os.getenv('WARC_RANGE_RETRIES', '3'))
+# Prefijo del payload usado para decidir relevancia antes de leerlo completo (0 = desactivado)
+PROBE_BYTES = int(os.getenv('WARC_PROBE_BYTES', str(32 * 1024)))
+# Texto visible mínimo del prefijo para descartar sin leer el resto (con menos, el prefijo es
+# casi todo <head>, scripts y estilos, y no permite decidir)
+PROBE_MIN_TEXT = int(os.getenv('WARC_PROBE_MIN_TEXT', '1000'))
+# Formato de entrada: 'warc' (HTML completo) o 'wet' (texto ya extraído por Common Crawl)
+CONTENT_FORMAT = os.getenv('COMMON_CRAWL_CONTENT_FORMAT', 'warc').lower()
+# En modo WET, completar títulos desde los metadatos WAT del mismo segmento
+WET_BACKFILL_TITLES = os.getenv('WET_BACKFILL_TITLES', 'false').lower() == 'true'
+WAT_MAX_RECORDS = int(os.getenv('WAT_MAX_RECORDS', '20000'))
+
+# Códigos ISO 639-3 de WARC-Identified-Content-Language
+WET_LANGUAGES = {'spa': 'es', 'eng': 'en', 'por': 'pt', 'fra': 'fr', 'deu': 'de', 'ita': 'it'}
+
 class CommonCrawlClient:
     """
     Cliente para descargar y procesar datos de Common Crawl
     Versión corregida que funciona con S3 público
     """
     
-    def __init__(self, use_s3_direct: bool = False, mode: str = "auto"):
+    def __init__(self, use_s3_direct: bool = False, mode: str = "auto", content_format: Optional[str] = None):
         """
         Inicializar cliente
         
         Args:
             use_s3_direct: Si True, usa boto3 para S3 directo
             mode: "auto" (elige el mejor), "s3" (solo S3), "http" (solo HTTP)
+            content_format: "warc" (HTML) o "wet" (texto plano, sin parseo HTML); None = COMMON_CRAWL_CONTENT_FORMAT
         """
         self.mode = mode
         self.use_s3_direct = use_s3_direct
+        self.content_format = (content_format or CONTENT_FORMAT).lower()
+        if self.content_format not in ("warc", "wet"):
+            raise ValueError(f"Formato de contenido no soportado: {self.content_format}")
         
         # Configurar S3 para acceso público SOLO si se va a usar
+        self.s3 = None
         if use_s3_direct or mode in ["s3", "auto"]:
             try:
                 self.s3 = boto3.client(
                     's3',
-                    region_name='us-east-1',
+                    region_name=os.getenv('COMMON_CRAWL_REGION', 'us-east-1'),
+                    # Endpoint alternativo compatible con S3 (MinIO, moto) para pruebas locales
+                    endpoint_url=os.getenv('COMMON_CRAWL_S3_ENDPOINT') or None,
                     config=Config(
-                        signature_version=UNSIGNED,
-                        s3={'addressing_style': 'path'}
+                        # Sin firma para el bucket público; firmado para MinIO/moto con credenciales
+                        signature_version=UNSIGNED if os.getenv('COMMON_CRAWL_S3_UNSIGNED', 'true').lower() == 'true' else None,
+                        s3={'addressing_style': 'path'},
+                        max_pool_connections=max(10, S3_CONCURRENCY)
                     )
                 )
                 logger.info("Cliente S3 configurado (acceso público)")
@@ -50,7 +91,7 @@ class CommonCrawlClient:
                 logger.error(f"Error configurando S3: {e}")
                 self.s3 = None
         
-        self.bucket_name = 'commoncrawl'
+        self.bucket_name = os.getenv('COMMON_CRAWL_BUCKET', 'commoncrawl')
         
         # Determinar la mejor URL base automáticamente
         if mode == "s3":
@@ -60,6 +101,13 @@ class CommonCrawlClient:
         else:  # auto - probar data.commoncrawl.org primero
             self.base_url = "https://data.commoncrawl.org"
         
+        self.catalog = get_catalog()
+        self.seen_urls = get_seen_filter()
+        self.content_store = get_content_store()
+        self.scheduler = get_scheduler()
+        self.stats: Dict[str, int] = {}
+        # Bytes bajados de la red por WARC, pendientes de registrar al terminar su parseo
+        self._downloaded: Dict[str, int] = {}
         self.session = None
         self.test_results = {}
         
@@ -74,47 +122,37 @@ class CommonCrawlClient:
             await self.session.close()
     
     def get_available_crawls(self) -> List[Dict]:
-        """Obtener lista de crawls disponibles - versión corregida"""
+        """Obtener lista de crawls disponibles desde el catálogo cacheado"""
         try:
-            # Intentar con data.commoncrawl.org primero
-            test_url = f"{self.base_url}/crawl-data/CC-MAIN-2024-10/warc.paths.gz"
-            response = requests.head(test_url, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info(f"✅ {self.base_url} accesible")
-                return self._get_real_crawl_list()
-            else:
-                logger.warning(f"{self.base_url} no accesible, usando lista local")
-                return self._get_fallback_crawl_list()
-                
+            return self.catalog.list_crawls()
         except Exception as e:
-            logger.error(f"Error verificando acceso: {e}")
-            return self._get_fallback_crawl_list()
-    
-    def _get_real_crawl_list(self) -> List[Dict]:
-        """Lista real de crawls (simplificada)"""
-        return [
-            {"id": "CC-MAIN-2024-10", "date": "2024-05-2024-06", "size": "~280TB"},
-            {"id": "CC-MAIN-2024-05", "date": "2024-03-2024-04", "size": "~250TB"},
-            {"id": "CC-MAIN-2023-50", "date": "2023-12-2024-01", "size": "~270TB"},
-            {"id": "CC-MAIN-2023-40", "date": "2023-09-2023-10", "size": "~260TB"}
-        ]
-    
-    def _get_fallback_crawl_list(self) -> List[Dict]:
-        """Lista de fallback si no hay conexión"""
-        return [
-            {"id": "CC-MAIN-2024-10", "date": "2024-05-2024-06", "size": "mock"},
-            {"id": "CC-MAIN-2024-05", "date": "2024-03-2024-04", "size": "mock"},
-        ]
+            logger.error(f"Error obteniendo catálogo de crawls: {e}")
+            return []
     
-    async def download_warc_file(self, warc_path: str, max_records: int = 20) -> List[Dict]:
+    async def download_warc_file(
+        self,
+        warc_path: str,
+        max_records: int = 20,
+        segments: Optional[int] = None
+    ) -> List[ArticleRecord]:
         """
         Descargar y procesar un archivo WARC específico
         Versión corregida que maneja diferentes métodos
+        
+        Args:
+            warc_path: ruta del WARC dentro del bucket
+            max_records: máximo de registros a leer
+            segments: conexiones Range simultáneas (None = WARC_DOWNLOAD_SEGMENTS, 1 = un solo stream)
         """
         # Método 1: Intentar con data.commoncrawl.org
         warc_url = f"{self.base_url}/{warc_path}"
         
+        # WARC ya descargado: leer de la cache local
+        cached_path = warc_index.cached_warc_path(warc_path)
+        if cached_path and os.path.exists(cached_path):
+            logger.info(f"Usando WARC cacheado: {warc_path}")
+            return await self._process_cached_warc(cached_path, warc_path, max_records)
+        
         logger.info(f"Descargando WARC: {warc_path}")
         
         # HEADER importante para evitar 403
@@ -124,12 +162,27 @@ class CommonCrawlClient:
             'Accept-Encoding': 'gzip'
         }
         
+        segments = segments if segments is not None else DOWNLOAD_SEGMENTS
+        if segments > 1:
+            return await self._download_segmented(warc_url, warc_path, max_records, segments, headers)
+        
         try:
-            # Intentar descargar
-            async with self.session.get(warc_url, headers=headers, timeout=60) as response:
+            # Intentar descargar. Sin tope total: el stream dura lo que tarde el parser
+            # y solo se corta si dejan de llegar datos
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=60, sock_read=60)
+            async with self.session.get(warc_url, headers=headers, timeout=timeout) as response:
                 if response.status == 200:
-                    content = await response.read()
-                    return await self._process_warc_content(content, warc_path, max_records)
+                    # El cuerpo se parsea mientras llega, en partes de WARC_SEGMENT_SIZE
+                    started = time.perf_counter()
+                    indexed, index_rows, stats = await parse_stream(
+                        self._cached_parts(
+                            self._counted_parts(response.content.iter_chunked(SEGMENT_SIZE), warc_path),
+                            warc_path, response.content_length
+                        ),
+                        lambda stream: self._extract_records(stream, warc_path, max_records),
+                        queue_size=2
+                    )
+                    return await self._finalize_records(warc_path, indexed, index_rows, stats, started)
                 elif response.status == 403 and self.use_s3_direct and self.s3:
                     # Si da 403, intentar con S3 directo
                     logger.info(f"HTTP 403, intentando con S3 directo...")
@@ -145,90 +198,543 @@ class CommonCrawlClient:
             logger.error(f"Error procesando WARC {warc_path}: {e}")
             return []
     
-    async def _download_via_s3_direct(self, s3_key: str, max_records: int) -> List[Dict]:
-        """Descargar usando boto3 S3 directo"""
+    async def _download_segmented(
+        self,
+        warc_url: str,
+        warc_path: str,
+        max_records: int,
+        segments: int,
+        headers: Dict
+    ) -> List[ArticleRecord]:
+        """
+        Descarga segmentada: descubrir el tamaño (HEAD) y bajar rangos concurrentes
+        sobre la sesión compartida. Los rangos se reensamblan en orden para el parser
+        y cada rango se reintenta por separado.
+        
+        El stream reensamblado se parsea en un solo hilo mientras llega (memoria acotada
+        a ~segments * WARC_SEGMENT_SIZE) y se copia a la cache local si está activa.
+        El parseo en paralelo por miembros gzip (pool de procesos) necesita el archivo
+        completo, así que se aplica a las lecturas siguientes desde la cache.
+        """
         try:
-            logger.info(f"Descargando via S3: {s3_key}")
-            response = self.s3.get_object(
-                Bucket=self.bucket_name,
-                Key=s3_key
+            async with self.session.head(warc_url, headers=headers, timeout=30) as response:
+                if response.status == 403 and self.use_s3_direct and self.s3:
+                    logger.info(f"HTTP 403, intentando con S3 directo...")
+                    return await self._download_via_s3_direct(warc_path, max_records)
+                size = int(response.headers.get('Content-Length', 0))
+                accepts_ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+                
+            if response.status != 200 or not size or not accepts_ranges:
+                logger.warning(f"{warc_url} no admite descargas por rango, usando un solo stream")
+                return await self.download_warc_file(warc_path, max_records, segments=1)
+            
+            async def fetch_range(start: int, end: int) -> bytes:
+                async def attempt() -> bytes:
+                    range_headers = {**headers, 'Range': f'bytes={start}-{end}'}
+                    async with self.session.get(warc_url, headers=range_headers, timeout=120) as resp:
+                        if resp.status != 206:
+                            raise IOError(f"HTTP {resp.status} en rango {start}-{end}")
+                        chunk = await resp.read()
+                        self._count_download(warc_path, len(chunk))
+                        return chunk
+                
+                return await with_retries(attempt, retries=RANGE_RETRIES, description=f"rango {start}-{end}")
+            
+            logger.info(f"Descargando WARC segmentado: {warc_path} ({size} bytes, {segments} conexiones)")
+            started = time.perf_counter()
+            
+            indexed, index_rows, stats = await parse_stream(
+                self._cached_parts(
+                    iter_ranges_in_order(fetch_range, size, part_size=SEGMENT_SIZE, window=segments),
+                    warc_path, size
+                ),
+                lambda stream: self._extract_records(stream, warc_path, max_records),
+                queue_size=segments
             )
+            return await self._finalize_records(warc_path, indexed, index_rows, stats, started)
+            
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout descargando {warc_path}")
+            return []
+        except Exception as e:
+            logger.error(f"Error procesando WARC segmentado {warc_path}: {e}")
+            return []
+    
+    async def _download_via_s3_direct(self, s3_key: str, max_records: int) -> List[ArticleRecord]:
+        """
+        Descargar usando S3 directo con GETs por rango concurrentes
+        Las partes se entregan en orden al parser WARC (en un hilo) con una ventana de memoria acotada.
+        """
+        try:
+            logger.info(f"Descargando via S3: {s3_key}")
+            started = time.perf_counter()
+            transport = S3RangedTransport(self.s3, self.bucket_name)
+            size = await transport.get_size(s3_key)
             
-            content = response['Body'].read()
-            return await self._process_warc_content(content, s3_key, max_records)
+            indexed, index_rows, stats = await parse_stream(
+                self._cached_parts(self._counted_parts(transport.iter_parts(s3_key, size), s3_key), s3_key, size),
+                lambda stream: self._extract_records(stream, s3_key, max_records),
+                queue_size=transport.concurrency
+            )
+            return await self._finalize_records(s3_key, indexed, index_rows, stats, started)
             
         except Exception as e:
             logger.error(f"Error S3 directo: {e}")
             return []
     
-    async def _process_warc_content(self, content: bytes, source: str, max_records: int) -> List[Dict]:
-        """Procesar contenido WARC"""
+    async def _process_cached_warc(self, cached_path: str, source: str, max_records: int) -> List[ArticleRecord]:
+        """
+        Procesar un WARC de la cache local sin cargarlo entero en memoria
+        Archivos grandes se dividen por miembros gzip sobre un mmap y se parsean en paralelo
+        (pool de procesos); el resto se parsea desde el archivo en un hilo.
+        En la primera lectura se construye el índice sidecar de registros.
+        """
+        started = time.perf_counter()
+        
+        try:
+            with open(cached_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                if warc_parallel.should_parallelize(content):
+                    indexed, index_rows, stats = await warc_parallel.extract_records_parallel(
+                        content, source, max_records
+                    )
+                else:
+                    indexed, index_rows, stats = await asyncio.to_thread(
+                        self._extract_records, f, source, max_records
+                    )
+        except Exception as e:
+            logger.error(f"Error procesando contenido: {e}")
+            return []
+        
+        return await self._finalize_records(source, indexed, index_rows, stats, started)
+    
+    async def _finalize_records(
+        self,
+        source: str,
+        indexed: List[Tuple[int, ArticleRecord]],
+        index_rows: List[IndexRow],
+        stats: Dict[str, int],
+        started: float
+    ) -> List[ArticleRecord]:
+        """Asignar record_id por posición, acumular métricas y guardar el índice sidecar del WARC"""
         records = []
-        stream = io.BytesIO(content)
+        for i, record in indexed:
+            record.record_id = f"{source}:{i}"
+            records.append(record)
+        
+        stats['bytes_downloaded'] = self._downloaded.pop(source, 0)
+        for key, value in stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+        self.stats['relevant_records'] = self.stats.get('relevant_records', 0) + len(records)
         
         try:
-            for i, record in enumerate(ArchiveIterator(stream)):
-                if i >= max_records:
-                    break
-                
-                if record.rec_type == 'response':
-                    try:
-                        html_content = record.content_stream().read()
-                        soup = BeautifulSoup(html_content, 'html.parser', from_encoding='utf-8')
-                        text = soup.get_text(separator=' ', strip=True)
-                        
-                        url = record.rec_headers.get_header('WARC-Target-URI', '')
-                        
-                        # Filtrar solo noticias colombianas relevantes
-                        if self._is_relevant_news(url, text):
-                            records.append({
-                                'url': url,
-                                'title': soup.title.string[:200] if soup.title else '',
-                                'content': text[:2000],  # Limitar para pruebas
-                                'date': record.rec_headers.get_header('WARC-Date', ''),
-                                'language': self._detect_language(text),
-                                'source_domain': self._extract_domain(url),
-                                'warc_file': source,
-                                'record_id': f"{source}:{i}",
-                                'keywords': self._extract_keywords(text)
-                            })
-                            
-                    except Exception as e:
-                        logger.debug(f"Error registro {i}: {e}")
-                        continue
+            await asyncio.to_thread(self.scheduler.record, source, stats, len(records))
+        except Exception as e:
+            logger.warning(f"No se pudo registrar el rendimiento de {source}: {e}")
+        
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Procesados {len(records)} registros de {source} "
+            f"({len(index_rows)} leídos, {stats.get('skipped_seen', 0)} URLs ya vistas, "
+            f"{stats.get('probe_rejected', 0)} descartadas por prefijo, "
+            f"{self._bytes_per_record(stats):.0f} bytes parseados/respuesta, {elapsed:.2f}s)"
+        )
+        
+        if warc_index.index_enabled():
+            try:
+                index = WarcRecordIndex(source)
+                await asyncio.to_thread(index.write, index_rows, len(index_rows))
+            except Exception as e:
+                logger.warning(f"No se pudo escribir el índice de {source}: {e}")
+        
+        return records
+    
+    def _count_download(self, warc_path: str, size: int) -> None:
+        self._downloaded[warc_path] = self._downloaded.get(warc_path, 0) + size
+    
+    async def _counted_parts(self, parts, warc_path: str):
+        """Contabilizar los bytes de un iterador de partes descargadas"""
+        async for part in parts:
+            self._count_download(warc_path, len(part))
+            yield part
+    
+    async def _cached_parts(self, parts, warc_path: str, size: Optional[int] = None):
+        """
+        Copiar a la cache local (WARC_CACHE_DIR) las partes de una descarga en streaming.
+        El WARC solo se publica en la cache si se descargó completo (y con el tamaño
+        esperado); si el parser para antes (max_records) o la descarga falla, se descarta.
+        """
+        writer = await asyncio.to_thread(warc_index.open_cache_writer, warc_path)
+        if writer is None:
+            async for part in parts:
+                yield part
+            return
+        
+        complete = False
+        try:
+            async for part in parts:
+                await asyncio.to_thread(writer.write, part)
+                yield part
+            complete = size is None or writer.size == size
+        finally:
+            if complete:
+                await asyncio.to_thread(writer.commit)
+            else:
+                await asyncio.to_thread(writer.abort)
+    
+    @staticmethod
+    def _bytes_per_record(stats: Dict[str, int]) -> float:
+        responses = stats.get('responses_parsed', 0)
+        return stats.get('bytes_parsed', 0) / responses if responses else 0.0
+    
+    def ingestion_metrics(self) -> Dict:
+        """Métricas acumuladas de lectura de WARCs de este cliente"""
+        downloaded_gb = self.stats.get('bytes_downloaded', 0) / 1024 ** 3
+        return {
+            **self.stats,
+            'bytes_parsed_per_record': round(self._bytes_per_record(self.stats), 1),
+            'relevant_per_gb_downloaded': (
+                round(self.stats.get('relevant_records', 0) / downloaded_gb, 1) if downloaded_gb else None
+            )
+        }
+    
+    def _extract_records(
+        self,
+        stream,
+        source: str,
+        max_records: int,
+        base_offset: int = 0,
+        skip_seen: bool = True
+    ) -> Tuple[List[Tuple[int, ArticleRecord]], List[IndexRow], Dict[str, int]]:
+        """
+        Iterar registros WARC de un stream y filtrar noticias relevantes
+        
+        Args:
+            stream: stream del WARC (o de un rango de miembros gzip)
+            source: ruta del WARC
+            max_records: máximo de registros a leer
+            base_offset: offset del stream dentro del archivo WARC
+            skip_seen: saltar sin parsear las URLs que ya están en el filtro de URLs vistas
+        
+        Returns:
+            (lista de (posición del registro, artículo), filas del índice de registros leídos, métricas)
+        """
+        records = []
+        index_rows = []
+        stats = {
+            'records_read': 0, 'skipped_seen': 0, 'responses_parsed': 0,
+            'probe_rejected': 0, 'payload_bytes_read': 0, 'bytes_parsed': 0, 'bytes_scanned': 0
+        }
+        seen_urls = self.seen_urls if skip_seen else None
+        iterator = ArchiveIterator(stream)
+        
+        for i, record in enumerate(iterator):
+            if i >= max_records:
+                break
+            stats['records_read'] += 1
+            
+            url = record.rec_headers.get_header('WARC-Target-URI', '')
+            warc_date = record.rec_headers.get_header('WARC-Date', '')
+            relevant = None
+            
+            if record.rec_type in ('response', 'conversion') and seen_urls is not None and url in seen_urls:
+                # URL ya ingerida: no se lee ni se parsea el payload
+                stats['skipped_seen'] += 1
+            elif record.rec_type in ('response', 'conversion'):
+                try:
+                    if record.rec_type == 'response':
+                        relevant, article = self._parse_response(record, url, warc_date, source, stats)
+                    else:
+                        relevant, article = self._parse_conversion(record, url, warc_date, source, stats)
+                    if relevant:
+                        records.append((i, article))
                         
-            logger.info(f"Procesados {len(records)} registros de {source}")
-            return records
+                except Exception as e:
+                    logger.debug(f"Error registro {i}: {e}")
             
-        except Exception as e:
-            logger.error(f"Error procesando contenido: {e}")
+            index_rows.append((
+                i,
+                base_offset + iterator.get_record_offset(),
+                iterator.get_record_length(),
+                record.rec_type,
+                url,
+                self._extract_domain(url) if url else '',
+                warc_date,
+                relevant
+            ))
+            # Bytes comprimidos recorridos hasta el final de este registro
+            stats['bytes_scanned'] = iterator.get_record_offset() + iterator.get_record_length()
+        
+        return records, index_rows, stats
+    
+    def _parse_response(
+        self,
+        record,
+        url: str,
+        warc_date: str,
+        source: str,
+        stats: Dict[str, int]
+    ) -> Tuple[bool, Optional[ArticleRecord]]:
+        """
+        Decidir la relevancia de una respuesta y construir el artículo.
+        Con PROBE_BYTES > 0 primero se lee y parsea solo un prefijo del payload (título,
+        meta description y primeros párrafos). Si el prefijo descarta la respuesta de forma
+        concluyente (_probe_rejects), el resto del payload no se decodifica ni se parsea
+        (ArchiveIterator lo descarta al avanzar); si no, se decide con el texto completo.
+        """
+        content = record.content_stream()
+        stats['responses_parsed'] += 1
+        
+        if PROBE_BYTES > 0:
+            prefix = content.read(PROBE_BYTES)
+            stats['payload_bytes_read'] += len(prefix)
+            stats['bytes_parsed'] += len(prefix)
+            soup, text = self._parse_html(prefix)
+            complete = len(prefix) < PROBE_BYTES
+            
+            if not complete and self._probe_rejects(url, self._probe_text(soup, text)):
+                stats['probe_rejected'] += 1
+                return False, None
+            
+            if complete:
+                html_content = prefix
+            else:
+                rest = content.read()
+                stats['payload_bytes_read'] += len(rest)
+                html_content = prefix + rest
+                stats['bytes_parsed'] += len(html_content)
+                soup, text = self._parse_html(html_content)
+        else:
+            html_content = content.read()
+            stats['payload_bytes_read'] += len(html_content)
+            stats['bytes_parsed'] += len(html_content)
+            soup, text = self._parse_html(html_content)
+        
+        # Filtrar solo noticias colombianas relevantes
+        if not self._is_relevant_news(url, text):
+            return False, None
+        
+        title = soup.title.string.strip() if soup.title and soup.title.string else ''
+        article = ArticleRecord(
+            url=url,
+            title=title[:200],
+            content=text[:2000],  # Extracto; el contenido completo va al almacén
+            date=warc_date,
+            language=self._detect_language(text),
+            source_domain=self._extract_domain(url),
+            warc_file=source,
+            keywords=self._extract_keywords(text)
+        )
+        
+        if self.content_store is not None:
+            try:
+                self._attach_content(article, self.content_store.put(html_content, text, url=url, title=title))
+                stats['content_stored'] = stats.get('content_stored', 0) + 1
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el contenido completo de {url}: {e}")
+        
+        return True, article
+    
+    def _parse_conversion(
+        self,
+        record,
+        url: str,
+        warc_date: str,
+        source: str,
+        stats: Dict[str, int]
+    ) -> Tuple[bool, Optional[ArticleRecord]]:
+        """
+        Registro 'conversion' de un WET: el payload ya es texto plano,
+        así que relevancia, idioma y keywords se calculan sin parsear HTML.
+        """
+        payload = record.content_stream().read()
+        stats['conversions_read'] = stats.get('conversions_read', 0) + 1
+        stats['payload_bytes_read'] += len(payload)
+        
+        text = payload.decode('utf-8', errors='replace').strip()
+        if not self._is_relevant_news(url, text):
+            return False, None
+        
+        # Common Crawl escribe el <title> de la página como primera línea del texto
+        title = text.split('\n', 1)[0].strip()
+        flat_text = ' '.join(text.split())
+        
+        identified = record.rec_headers.get_header('WARC-Identified-Content-Language', '')
+        language = WET_LANGUAGES.get(identified.split(',')[0]) if identified else None
+        
+        article = ArticleRecord(
+            url=url,
+            title=title[:200],
+            content=flat_text[:2000],
+            date=warc_date,
+            language=language or self._detect_language(flat_text),
+            source_domain=self._extract_domain(url),
+            warc_file=source,
+            keywords=self._extract_keywords(flat_text)
+        )
+        
+        if self.content_store is not None:
+            try:
+                self._attach_content(article, self.content_store.put(None, text, url=url, title=title))
+                stats['content_stored'] = stats.get('content_stored', 0) + 1
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el contenido completo de {url}: {e}")
+        
+        return True, article
+    
+    @staticmethod
+    def _attach_content(article: ArticleRecord, stored: Dict[str, str]) -> None:
+        article.content_hash = stored['content_hash']
+        article.content_uri = stored['content_uri']
+    
+    def _parse_html(self, html_content: bytes) -> Tuple[BeautifulSoup, str]:
+        """Parsear HTML y extraer el texto visible"""
+        soup = BeautifulSoup(html_content, 'html.parser', from_encoding='utf-8')
+        return soup, soup.get_text(separator=' ', strip=True)
+    
+    def _probe_text(self, soup: BeautifulSoup, text: str) -> str:
+        """Texto del prefijo para la decisión de relevancia (incluye meta description)"""
+        description = soup.find('meta', attrs={'name': 'description'})
+        if description and description.get('content'):
+            return f"{description['content']} {text}"
+        return text
+    
+    async def reprocess_warc_file(
+        self,
+        warc_path: str,
+        relevant: Optional[bool] = True,
+        domains: Optional[List[str]] = None,
+        concurrency: int = 8
+    ) -> List[ArticleRecord]:
+        """
+        Reprocesar solo los registros candidatos de un WARC ya indexado
+        Lee cada registro con un rango (cache local o HTTP Range) y vuelve a aplicar los filtros.
+        
+        Args:
+            warc_path: ruta del WARC
+            relevant: veredicto previo de los candidatos (None = todas las respuestas)
+            domains: sufijos de dominio a incluir
+            concurrency: lecturas remotas simultáneas
+        """
+        index = WarcRecordIndex(warc_path)
+        rec_type = 'conversion' if self._is_wet_path(warc_path) else 'response'
+        candidates = await asyncio.to_thread(index.candidates, relevant, domains, rec_type)
+        
+        if not candidates:
+            logger.warning(f"Sin candidatos indexados para {warc_path}")
             return []
+        
+        cached_path = warc_index.cached_warc_path(warc_path)
+        if cached_path and os.path.exists(cached_path):
+            chunks = await asyncio.to_thread(self._read_local_ranges, cached_path, candidates)
+        else:
+            chunks = await self._read_remote_ranges(warc_path, candidates, concurrency)
+        
+        records, verdicts = await asyncio.to_thread(self._reparse_records, warc_path, candidates, chunks)
+        await asyncio.to_thread(index.update_verdicts, verdicts)
+        
+        logger.info(f"♻️  Reprocesado {warc_path}: {len(candidates)} candidatos, {len(records)} relevantes")
+        return records
+    
+    def _read_local_ranges(self, path: str, candidates: List[Dict]) -> List[Optional[bytes]]:
+        """Leer registros de un WARC cacheado con seek"""
+        chunks = []
+        with open(path, 'rb') as f:
+            for candidate in candidates:
+                f.seek(candidate['offset'])
+                chunks.append(f.read(candidate['length']))
+        return chunks
+    
+    async def _read_remote_ranges(
+        self,
+        warc_path: str,
+        candidates: List[Dict],
+        concurrency: int
+    ) -> List[Optional[bytes]]:
+        """Leer registros remotos con peticiones HTTP Range concurrentes"""
+        semaphore = asyncio.Semaphore(concurrency)
+        url = f"{self.base_url}/{warc_path}"
+        
+        async def fetch(candidate: Dict) -> Optional[bytes]:
+            start = candidate['offset']
+            end = start + candidate['length'] - 1
+            headers = {
+                'User-Agent': 'CommonCrawl-Research/1.0',
+                'Range': f'bytes={start}-{end}'
+            }
+            async with semaphore:
+                try:
+                    async with self.session.get(url, headers=headers, timeout=60) as response:
+                        if response.status == 206:
+                            return await response.read()
+                        logger.error(f"Error {response.status} leyendo rango {start}-{end} de {warc_path}")
+                except Exception as e:
+                    logger.error(f"Error leyendo rango {start}-{end} de {warc_path}: {e}")
+            return None
+        
+        return await asyncio.gather(*(fetch(c) for c in candidates))
+    
+    def _reparse_records(
+        self,
+        warc_path: str,
+        candidates: List[Dict],
+        chunks: List[Optional[bytes]]
+    ) -> Tuple[List[ArticleRecord], Dict[int, bool]]:
+        """Volver a aplicar los filtros sobre registros leídos por rango"""
+        records = []
+        verdicts = {}
+        
+        for candidate, chunk in zip(candidates, chunks):
+            if not chunk:
+                continue
+            found, _, _ = self._extract_records(
+                io.BytesIO(chunk), warc_path, 1, candidate['offset'], skip_seen=False
+            )
+            verdicts[candidate['offset']] = bool(found)
+            for _, record in found:
+                record.record_id = f"{warc_path}:{candidate['position']}"
+                records.append(record)
+        
+        return records, verdicts
     
     def _is_relevant_news(self, url: str, text: str) -> bool:
         """Filtrar noticias relevantes para Colombia"""
         if not text or len(text) < 100:  # Muy corto, probablemente no es noticia
             return False
         
+        # Devolver True si tiene al menos 2 palabras clave o es dominio .co
+        if self._relevance_keyword_count(text) >= 2:
+            return True
+        
+        # También aceptar si es dominio colombiano
+        return self._is_colombian_url(url)
+    
+    def _probe_rejects(self, url: str, probe_text: str) -> bool:
+        """
+        Descartar por el prefijo solo si es concluyente: hay texto visible suficiente y ni la
+        URL ni ninguna keyword apuntan a Colombia. Con poco texto (prefijo ocupado por <head>),
+        URL colombiana o alguna keyword, la decisión se toma sobre el texto completo.
+        """
+        return (
+            len(probe_text) >= PROBE_MIN_TEXT
+            and not self._is_colombian_url(url)
+            and self._relevance_keyword_count(probe_text) == 0
+        )
+    
+    @staticmethod
+    def _relevance_keyword_count(text: str) -> int:
+        """Cantidad de keywords de relevancia colombiana presentes en el texto"""
         keywords = [
             'colombia', 'colombiano', 'colombiana', 'bogotá', 'medellín', 'cali',
             'colcap', 'bolsa de valores', 'economía', 'petróleo', 'peso colombiano',
             'banco de la república', 'inflación', 'dólar', 'exportación'
         ]
-        
         text_lower = text.lower()
-        
-        # Verificar si contiene palabras clave relevantes
-        keyword_count = sum(1 for kw in keywords if kw in text_lower)
-        
-        # Devolver True si tiene al menos 2 palabras clave o es dominio .co
-        if keyword_count >= 2:
-            return True
-        
-        # También aceptar si es dominio colombiano
-        if '.co' in url.lower() or any(domain in url.lower() for domain in ['eltiempo.com', 'semana.com', 'portafolio.co']):
-            return True
-            
-        return False
+        return sum(1 for kw in keywords if kw in text_lower)
+    
+    @staticmethod
+    def _is_colombian_url(url: str) -> bool:
+        url = url.lower()
+        return '.co' in url or any(domain in url for domain in ['eltiempo.com', 'semana.com', 'portafolio.co'])
     
     def _extract_keywords(self, text: str) -> List[str]:
         """Extraer palabras clave del texto"""
@@ -267,7 +773,7 @@ class CommonCrawlClient:
         end_date: str, 
         max_records: int = 50,  # Reducido para pruebas
         batch_size: int = 20
-    ) -> List[Dict]:
+    ) -> List[ArticleRecord]:
         """
         Buscar noticias en un rango de fechas - VERSIÓN CORREGIDA
         """
@@ -278,8 +784,8 @@ class CommonCrawlClient:
             logger.info("Usando modo MOCK para desarrollo")
             return self._get_mock_news_data(start_date, end_date, max_records)
         
-        # Obtener crawls que cubran el período
-        crawls = self._get_crawls_for_date_range(start_date, end_date)
+        # Obtener crawls que cubran el período (puede descargar collinfo.json si la cache expiró)
+        crawls = await asyncio.to_thread(self._get_crawls_for_date_range, start_date, end_date)
         
         if not crawls:
             logger.warning("No se encontraron crawls para el rango de fechas")
@@ -291,15 +797,17 @@ class CommonCrawlClient:
         for crawl in crawls[:2]:
             logger.info(f"Procesando crawl: {crawl['id']}")
             
-            # Obtener algunos archivos WARC
-            warc_files = await self._get_warc_files_for_crawl(crawl['id'], limit=3)  # Solo 3 archivos
+            # Obtener algunos archivos WARC (o WET en modo texto)
+            warc_files = await self._get_warc_files_for_crawl(crawl['id'], limit=3, kind=self.content_format)  # Solo 3 archivos
             
             if not warc_files:
-                logger.warning(f"No se encontraron archivos WARC para {crawl['id']}")
+                logger.warning(f"No se encontraron archivos {self.content_format.upper()} para {crawl['id']}")
                 continue
             
             for warc_file in warc_files:
                 records = await self.download_warc_file(warc_file, max_records=batch_size)
+                if records and self.content_format == 'wet' and WET_BACKFILL_TITLES:
+                    await self._backfill_titles_from_wat(warc_file, records)
                 all_records.extend(records)
                 
                 logger.info(f"Archivo {warc_file}: {len(records)} registros")
@@ -312,39 +820,23 @@ class CommonCrawlClient:
         return all_records[:max_records]
     
     def _get_crawls_for_date_range(self, start_date: str, end_date: str) -> List[Dict]:
-        """Obtener crawls que cubran el rango de fechas"""
-        # Mapeo simplificado de fechas a crawls
-        crawl_map = {
-            "2024-01": "CC-MAIN-2024-05",
-            "2024-02": "CC-MAIN-2024-05", 
-            "2024-03": "CC-MAIN-2024-05",
-            "2024-04": "CC-MAIN-2024-10",
-            "2024-05": "CC-MAIN-2024-10",
-            "2024-06": "CC-MAIN-2024-10",
-            "2023-12": "CC-MAIN-2023-50",
-            "2023-11": "CC-MAIN-2023-40",
-            "2023-10": "CC-MAIN-2023-40"
-        }
-        
-        # Extraer año-mes de la fecha de inicio
+        """Obtener crawls que cubran el rango de fechas (lookup por intervalos en el catálogo)"""
         try:
-            year_month = start_date[:7]  # "2024-01"
-            if year_month in crawl_map:
-                return [{"id": crawl_map[year_month], "date_range": f"{start_date}_{end_date}"}]
-        except:
-            pass
+            crawls = self.catalog.crawls_for_range(start_date, end_date)
+        except Exception as e:
+            logger.error(f"Error consultando catálogo de crawls: {e}")
+            return []
         
-        # Fallback: usar los crawls más recientes
-        return [
-            {"id": "CC-MAIN-2024-10", "date_range": "2024-05-2024-06"},
-            {"id": "CC-MAIN-2024-05", "date_range": "2024-03-2024-04"}
-        ]
+        return [{"id": c["id"], "date_range": c["date"]} for c in crawls]
     
-    async def _get_warc_files_for_crawl(self, crawl_id: str, limit: int = 5) -> List[str]:
+    async def _get_warc_files_for_crawl(self, crawl_id: str, limit: int = 5, kind: str = "warc") -> List[str]:
         """
         Obtener lista REAL de archivos WARC - VERSIÓN CORREGIDA
+        
+        Args:
+            kind: "warc", "wet" o "wat" (índice {kind}.paths.gz del crawl)
         """
-        index_url = f"{self.base_url}/crawl-data/{crawl_id}/warc.paths.gz"
+        index_url = f"{self.base_url}/crawl-data/{crawl_id}/{kind}.paths.gz"
         
         logger.info(f"📥 Descargando índice: {index_url}")
         
@@ -368,9 +860,8 @@ class CommonCrawlClient:
                             logger.warning("No se encontraron archivos WARC en el índice")
                             return []
                         
-                        # Tomar una muestra aleatoria (pero pequeña para pruebas)
-                        sample_size = min(limit, len(warc_files))
-                        selected = random.sample(warc_files, sample_size)
+                        # Elegir según el rendimiento aprendido por segmento (explorar/explotar)
+                        selected = await asyncio.to_thread(self.scheduler.select, crawl_id, warc_files, limit)
                         
                         logger.info(f"🎯 Seleccionados {len(selected)} archivos WARC")
                         return selected
@@ -379,16 +870,35 @@ class CommonCrawlClient:
                     logger.error(f"❌ Error {response.status} descargando índice")
                     
                     # Fallback: usar archivos de ejemplo conocidos
-                    return self._get_fallback_warc_files(crawl_id, limit)
+                    return self._get_fallback_warc_files(crawl_id, limit, kind)
                     
         except asyncio.TimeoutError:
             logger.error(f"⏱️  Timeout descargando índice para {crawl_id}")
-            return self._get_fallback_warc_files(crawl_id, limit)
+            return self._get_fallback_warc_files(crawl_id, limit, kind)
         except Exception as e:
             logger.error(f"⚠️  Error obteniendo índice: {e}")
-            return self._get_fallback_warc_files(crawl_id, limit)
+            return self._get_fallback_warc_files(crawl_id, limit, kind)
     
-    def _get_fallback_warc_files(self, crawl_id: str, limit: int) -> List[str]:
+    @staticmethod
+    def _is_wet_path(path: str) -> bool:
+        return path.endswith('.warc.wet.gz')
+    
+    @staticmethod
+    def _sibling_path(path: str, kind: str) -> str:
+        """
+        Ruta del archivo hermano de otro tipo en el mismo segmento
+        (ej: .../warc/X.warc.gz -> .../wet/X.warc.wet.gz -> .../wat/X.warc.wat.gz)
+        """
+        for current in ('wet', 'wat'):
+            suffix = f'.warc.{current}.gz'
+            if path.endswith(suffix):
+                path = path[:-len(suffix)].replace(f'/{current}/', '/warc/') + '.warc.gz'
+                break
+        if kind == 'warc':
+            return path
+        return path[:-len('.warc.gz')].replace('/warc/', f'/{kind}/') + f'.warc.{kind}.gz'
+    
+    def _get_fallback_warc_files(self, crawl_id: str, limit: int, kind: str = "warc") -> List[str]:
         """Archivos WARC de fallback si no se puede descargar el índice"""
         # Archivos de ejemplo conocidos (pueden no existir todos)
         fallback_files = {
@@ -402,9 +912,65 @@ class CommonCrawlClient:
             ]
         }
         
-        return fallback_files.get(crawl_id, [])[:limit]
+        return [self._sibling_path(path, kind) for path in fallback_files.get(crawl_id, [])[:limit]]
+    
+    async def _backfill_titles_from_wat(self, wet_path: str, articles: List[ArticleRecord]) -> int:
+        """
+        Completar títulos de artículos WET con el <title> de los metadatos WAT
+        del mismo segmento. El WAT se lee en streaming y se corta al encontrar
+        todas las URLs buscadas (o tras WAT_MAX_RECORDS registros).
+        """
+        wanted = {a.url for a in articles}
+        wat_url = f"{self.base_url}/{self._sibling_path(wet_path, 'wat')}"
+        
+        try:
+            async with self.session.get(wat_url, headers={'User-Agent': 'CommonCrawl-Research/1.0'}, timeout=120) as response:
+                if response.status != 200:
+                    logger.warning(f"No se pudo leer WAT {wat_url}: HTTP {response.status}")
+                    return 0
+                titles = await parse_stream(
+                    response.content.iter_chunked(1024 * 1024),
+                    lambda stream: self._extract_wat_titles(stream, wanted, WAT_MAX_RECORDS)
+                )
+        except Exception as e:
+            logger.warning(f"Error leyendo títulos WAT de {wat_url}: {e}")
+            return 0
+        
+        for article in articles:
+            title = titles.get(article.url)
+            if title:
+                article.title = title[:200]
+        
+        logger.info(f"🏷️  Títulos WAT: {len(titles)}/{len(wanted)} artículos de {wet_path}")
+        return len(titles)
+    
+    def _extract_wat_titles(self, stream, wanted: set, max_records: int) -> Dict[str, str]:
+        """Leer registros 'metadata' de un WAT y devolver {url: título} para las URLs buscadas"""
+        titles = {}
+        for i, record in enumerate(ArchiveIterator(stream)):
+            if i >= max_records or len(titles) >= len(wanted):
+                break
+            if record.rec_type != 'metadata':
+                continue
+            url = record.rec_headers.get_header('WARC-Target-URI', '')
+            if url not in wanted:
+                continue
+            try:
+                envelope = json.loads(record.content_stream().read()).get('Envelope', {})
+                title = (
+                    envelope.get('Payload-Metadata', {})
+                    .get('HTTP-Response-Metadata', {})
+                    .get('HTML-Metadata', {})
+                    .get('Head', {})
+                    .get('Title')
+                )
+                if title:
+                    titles[url] = title.strip()
+            except Exception as e:
+                logger.debug(f"Error registro WAT {url}: {e}")
+        return titles
     
-    def _get_mock_news_data(self, start_date: str, end_date: str, limit: int) -> List[Dict]:
+    def _get_mock_news_data(self, start_date: str, end_date: str, limit: int) -> List[ArticleRecord]:
         """Generar datos mock para desarrollo"""
         logger.info("🛠️  Generando datos MOCK para desarrollo")
         
@@ -439,17 +1005,17 @@ class CommonCrawlClient:
             domain = random.choice(mock_domains)
             title = random.choice(mock_titles)
             
-            mock_articles.append({
-                'url': f"https://{domain}/economia/articulo-{i}-{article_date.strftime('%Y%m%d')}",
-                'title': f"{title} - {article_date.strftime('%d/%m/%Y')}",
-                'content': f"Noticia de prueba sobre economía colombiana. El índice COLCAP mostró un comportamiento positivo durante la jornada. Los analistas del mercado consideran que la economía nacional mantiene una tendencia de crecimiento sostenido. {title.lower()} según los últimos reportes económicos.",
-                'date': article_date.strftime("%Y-%m-%d"),
-                'language': 'es' if '.co' in domain else 'en',
-                'source_domain': domain,
-                'warc_file': 'mock_data_source',
-                'record_id': f"mock_{i}_{article_date.strftime('%Y%m%d')}",
-                'keywords': ['colombia', 'economía', 'colcap', 'mercado', 'finanzas']
-            })
+            mock_articles.append(ArticleRecord(
+                url=f"https://{domain}/economia/articulo-{i}-{article_date.strftime('%Y%m%d')}",
+                title=f"{title} - {article_date.strftime('%d/%m/%Y')}",
+                content=f"Noticia de prueba sobre economía colombiana. El índice COLCAP mostró un comportamiento positivo durante la jornada. Los analistas del mercado consideran que la economía nacional mantiene una tendencia de crecimiento sostenido. {title.lower()} según los últimos reportes económicos.",
+                date=article_date.strftime("%Y-%m-%d"),
+                language='es' if '.co' in domain else 'en',
+                source_domain=domain,
+                warc_file='mock_data_source',
+                record_id=f"mock_{i}_{article_date.strftime('%Y%m%d')}",
+                keywords=['colombia', 'economía', 'colcap', 'mercado', 'finanzas']
+            ))
         
         logger.info(f"🛠️  Generados {len(mock_articles)} artículos MOCK")
         return mock_articles
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+# 'local' (directorio), 's3' (endpoint compatible con S3: MinIO, moto, AWS) u 'off'
+STORE_BACKEND = os.getenv('CONTENT_STORE', 'local').lower()
+STORE_DIR = os.getenv('CONTENT_STORE_DIR', 'data/content-store')
+STORE_BUCKET = os.getenv('CONTENT_STORE_BUCKET', 'news-content')
+STORE_PREFIX = os.getenv('CONTENT_STORE_PREFIX', 'articles')
+STORE_S3_ENDPOINT = os.getenv('CONTENT_STORE_S3_ENDPOINT', '')
+ZSTD_LEVEL = int(os.getenv('CONTENT_STORE_ZSTD_LEVEL', '6'))
+
+
+def content_hash(html: bytes) -> str:
+    """Hash del HTML crudo o del texto (clave del objeto y columna content_hash)"""
+    return hashlib.sha256(html).hexdigest()
+
+
+def _object_key(digest: str) -> str:
+    # Dos niveles de fan-out para no acumular millones de archivos en un directorio
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.json.zst"
+
+
+class ContentStore(ABC):
+    """
+    Almacén de contenido completo direccionado por hash.
+    Cada objeto es un frame zstd con un JSON {url, title, html, text};
+    la BD solo guarda el puntero (content_uri) y un extracto.
+    Los contextos zstd no son thread-safe: se mantiene uno por hilo.
+    """
+
+    scheme = ''
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        if not hasattr(self._local, 'compressor'):
+            self._local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        return self._local.compressor
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        if not hasattr(self._local, 'decompressor'):
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.decompressor
+
+    def put(self, html: Optional[bytes], text: str, url: str = '', title: str = '') -> Dict[str, str]:
+        """
+        Guardar HTML y texto extraído comprimidos (html=None para fuentes de solo texto, ej: WET).
+        Devuelve {'content_hash', 'content_uri'}; si el objeto ya existe no se reescribe.
+        """
+        digest = content_hash(html if html is not None else text.encode('utf-8'))
+        key = _object_key(digest)
+        if not self._exists(key):
+            document = {
+                'url': url,
+                'title': title,
+                'html': html.decode('utf-8', errors='replace') if html is not None else None,
+                'text': text
+            }
+            payload = self._compressor().compress(json.dumps(document, ensure_ascii=False).encode('utf-8'))
+            self._write(key, payload)
+        return {'content_hash': digest, 'content_uri': self.uri(key)}
+
+    def get(self, uri: str) -> Dict[str, str]:
+        """Leer y descomprimir un objeto a partir de su content_uri"""
+        if not uri.startswith(f"{self.scheme}://"):
+            raise ValueError(f"URI de otro almacén: {uri}")
+        payload = self._read(self.key_from_uri(uri))
+        return json.loads(self._decompressor().decompress(payload))
+
+    @abstractmethod
+    def uri(self, key: str) -> str:
+        """content_uri de una clave"""
+
+    @abstractmethod
+    def key_from_uri(self, uri: str) -> str:
+        """Clave de un content_uri de este almacén"""
+
+    @abstractmethod
+    def _exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def _write(self, key: str, payload: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def _read(self, key: str) -> bytes:
+        ...
+
+
+class LocalContentStore(ContentStore):
+    """Almacén en un directorio local (volumen compartido en docker)"""
+
+    scheme = 'file'
+
+    def __init__(self, root: str = STORE_DIR):
+        super().__init__()
+        self.root = os.path.abspath(root)
+
+    def uri(self, key: str) -> str:
+        return f"file://{os.path.join(self.root, key)}"
+
+    def key_from_uri(self, uri: str) -> str:
+        path = uri[len('file://'):]
+        return os.path.relpath(path, self.root)
+
+    def _exists(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.root, key))
+
+    def _write(self, key: str, payload: bytes) -> None:
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _read(self, key: str) -> bytes:
+        with open(os.path.join(self.root, key), 'rb') as f:
+            return f.read()
+
+
+class S3ContentStore(ContentStore):
+    """Almacén en un bucket compatible con S3"""
+
+    scheme = 's3'
+
+    def __init__(self, bucket: str = STORE_BUCKET, prefix: str = STORE_PREFIX, endpoint_url: str = STORE_S3_ENDPOINT):
+        super().__init__()
+        import boto3
+        from botocore.exceptions import ClientError
+        self._client_error = ClientError
+        self.s3 = boto3.client('s3', endpoint_url=endpoint_url or None)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def _full_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._full_key(key)}"
+
+    def key_from_uri(self, uri: str) -> str:
+        full_key = uri[len(f"s3://{self.bucket}/"):]
+        return full_key[len(self.prefix) + 1:] if self.prefix else full_key
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=self._full_key(key))
+            return True
+        except self._client_error:
+            return False
+
+    def _write(self, key: str, payload: bytes) -> None:
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self._full_key(key),
+            Body=payload,
+            ContentType='application/json',
+            ContentEncoding='zstd'
+        )
+
+    def _read(self, key: str) -> bytes:
+        return self.s3.get_object(Bucket=self.bucket, Key=self._full_key(key))['Body'].read()
+
+
+# ===== INSTANCIA COMPARTIDA =====
+
+_store: Optional[ContentStore] = None
+_store_initialized = False
+_store_lock = threading.Lock()
+
+
+def get_content_store() -> Optional[ContentStore]:
+    """Almacén de contenido configurado por entorno (None si está desactivado o no disponible)"""
+    global _store, _store_initialized
+    with _store_lock:
+        if not _store_initialized:
+            _store_initialized = True
+            try:
+                if STORE_BACKEND == 's3':
+                    _store = S3ContentStore()
+                elif STORE_BACKEND == 'local':
+                    _store = LocalContentStore()
+                if _store is not None:
+                    logger.info(f"📦 Almacén de contenido: {STORE_BACKEND}")
+            except Exception as e:
+                logger.error(f"❌ No se pudo inicializar el almacén de contenido ({STORE_BACKEND}): {e}")
+                _store = None
+        return _store
+
+
+def load_content(uri: str) -> Dict[str, str]:
+    """Leer el contenido completo de un artículo desde su content_uri"""
+    store = get_content_store()
+    if store is None:
+        raise RuntimeError("Almacén de contenido desactivado")
+    return store.get(uri)
@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+COLLINFO_URL = os.getenv('COMMON_CRAWL_COLLINFO_URL', 'https://index.commoncrawl.org/collinfo.json')
+CATALOG_FIXTURE = os.getenv(
+    'COMMON_CRAWL_CATALOG_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crawl_catalog_fixture.json')
+)
+CATALOG_TTL_SECONDS = int(os.getenv('CRAWL_CATALOG_TTL_SECONDS', '21600'))  # 6 horas
+
+
+class CrawlCatalog:
+    """
+    Catálogo de crawls de Common Crawl con sus límites temporales.
+    Se carga desde collinfo.json (o un fixture local sin conexión),
+    se cachea con TTL y responde qué crawls se solapan con un rango de fechas.
+    """
+
+    def __init__(
+        self,
+        collinfo_url: str = COLLINFO_URL,
+        fixture_path: Optional[str] = CATALOG_FIXTURE,
+        ttl_seconds: int = CATALOG_TTL_SECONDS,
+        offline: Optional[bool] = None
+    ):
+        self.collinfo_url = collinfo_url
+        self.fixture_path = fixture_path
+        self.ttl_seconds = ttl_seconds
+        if offline is None:
+            offline = os.getenv('CRAWL_CATALOG_OFFLINE', 'false').lower() == 'true'
+        self.offline = offline
+
+        self._lock = threading.Lock()
+        self._crawls: List[Dict] = []
+        self._starts: List[date] = []
+        self._max_ends: List[date] = []
+        self._loaded_at = 0.0
+        self.source = None
+
+    # ===== CARGA Y CACHE =====
+
+    def _is_expired(self) -> bool:
+        return not self._crawls or (time.monotonic() - self._loaded_at) > self.ttl_seconds
+
+    def _fetch_collinfo(self) -> List[Dict]:
+        """Descargar collinfo.json desde el índice de Common Crawl"""
+        response = requests.get(self.collinfo_url, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _load_fixture(self) -> List[Dict]:
+        """Cargar el catálogo desde el fixture local"""
+        with open(self.fixture_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def refresh(self, force: bool = False) -> None:
+        """Recargar el catálogo si el TTL expiró (o si force=True)"""
+        with self._lock:
+            if not force and not self._is_expired():
+                return
+
+            entries, source = None, None
+            if not self.offline:
+                try:
+                    entries, source = self._fetch_collinfo(), "collinfo"
+                except Exception as e:
+                    logger.warning(f"⚠️  No se pudo descargar collinfo.json: {e}, usando fixture")
+
+            if entries is None:
+                try:
+                    entries, source = self._load_fixture(), "fixture"
+                except Exception as e:
+                    logger.error(f"❌ Error cargando fixture de crawls: {e}")
+                    if self._crawls:
+                        # Mantener la versión anterior y reintentar en el próximo TTL
+                        self._loaded_at = time.monotonic()
+                    return
+
+            self._build_index(entries)
+            self._loaded_at = time.monotonic()
+            self.source = source
+            logger.info(f"📚 Catálogo de crawls cargado ({source}): {len(self._crawls)} crawls")
+
+    def _build_index(self, entries: List[Dict]) -> None:
+        """Normalizar entradas y construir el índice de intervalos"""
+        crawls = []
+        for entry in entries:
+            crawl_id = entry.get('id', '')
+            if not crawl_id.startswith('CC-MAIN-'):
+                continue
+            bounds = self._parse_bounds(entry)
+            if not bounds:
+                continue
+            start, end = bounds
+            crawls.append({
+                "id": crawl_id,
+                "name": entry.get('name', crawl_id),
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+                "date": f"{start.isoformat()}_{end.isoformat()}",
+                "_start": start,
+                "_end": end
+            })
+
+        crawls.sort(key=lambda c: c["_start"])
+
+        # max_ends[i] = mayor fecha fin entre crawls[0..i] (monótona, permite bisect)
+        max_ends, current = [], date.min
+        for crawl in crawls:
+            current = max(current, crawl["_end"])
+            max_ends.append(current)
+
+        self._crawls = crawls
+        self._starts = [c["_start"] for c in crawls]
+        self._max_ends = max_ends
+
+    @staticmethod
+    def _parse_bounds(entry: Dict) -> Optional[tuple]:
+        """Obtener (inicio, fin) de una entrada de collinfo.json"""
+        try:
+            if entry.get('from') and entry.get('to'):
+                start = datetime.fromisoformat(entry['from'][:19]).date()
+                end = datetime.fromisoformat(entry['to'][:19]).date()
+                return start, end
+
+            # Crawls antiguos sin from/to: CC-MAIN-YYYY-WW indica la semana ISO de cierre
+            year, week = entry['id'].split('-')[2:4]
+            end = date.fromisocalendar(int(year), int(week), 7)
+            return end - timedelta(days=14), end
+        except Exception:
+            return None
+
+    # ===== CONSULTAS =====
+
+    @staticmethod
+    def _public(crawl: Dict) -> Dict:
+        return {k: v for k, v in crawl.items() if not k.startswith('_')}
+
+    def list_crawls(self) -> List[Dict]:
+        """Listar crawls disponibles (más recientes primero)"""
+        self.refresh()
+        return [self._public(c) for c in reversed(self._crawls)]
+
+    def crawls_for_range(self, start_date: str, end_date: str) -> List[Dict]:
+        """
+        Crawls cuyo intervalo se solapa con [start_date, end_date].
+        Si ninguno se solapa, devuelve el primer crawl posterior al rango
+        (es el que puede contener las páginas publicadas en esas fechas).
+        """
+        self.refresh()
+        if not self._crawls:
+            return []
+
+        start = datetime.strptime(start_date[:10], "%Y-%m-%d").date()
+        end = datetime.strptime(end_date[:10], "%Y-%m-%d").date()
+        if end < start:
+            start, end = end, start
+
+        # Candidatos: empiezan antes del fin del rango y alguno anterior termina después del inicio
+        hi = bisect_right(self._starts, end)
+        lo = bisect_left(self._max_ends, start)
+        overlapping = [
+            self._public(c) for c in self._crawls[lo:hi]
+            if c["_end"] >= start
+        ]
+        if overlapping:
+            overlapping.reverse()  # Más recientes primero
+            return overlapping
+
+        if hi < len(self._crawls):
+            return [self._public(self._crawls[hi])]
+        return [self._public(self._crawls[-1])]
+
+
+_catalog: Optional[CrawlCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> CrawlCatalog:
+    """Instancia compartida del catálogo (una cache por proceso)"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = CrawlCatalog()
+        return _catalog
@@ -1,14 +1,17 @@
 import os
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from datetime import datetime
 
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Integer, Boolean, Float, JSON, Date, Index, text
+from sqlalchemy import create_engine, Column, String, Text, DateTime, Integer, BigInteger, Boolean, Float, JSON, Date, Index, text, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.sql import func
 
+from article_record import ArticleRecord
+
 ENV = os.getenv("ENV", "development")
 
 logger = logging.getLogger(__name__)
@@ -24,16 +27,39 @@ if not DATABASE_URL:
     name = os.getenv('DATABASE_NAME', 'newsdb')
     DATABASE_URL = f'postgresql://{user}:{password}@{host}:{port}/{name}'
 
+# Parámetros por sentencia INSERT (el protocolo de PostgreSQL admite como mucho 32767)
+INSERT_MAX_PARAMS = int(os.getenv('DB_INSERT_MAX_PARAMS', '32767'))
+
+# Tamaño del pool de conexiones (por engine)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '20'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '30'))
+
 engine = create_engine(
     DATABASE_URL,
-    pool_size=20,
-    max_overflow=30,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
     pool_pre_ping=True,
     pool_recycle=3600,
     echo=False  # Cambia a True para ver queries SQL
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine async (asyncpg) para los endpoints: no bloquea el event loop
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or DATABASE_URL.replace(
+    'postgresql+psycopg2://', 'postgresql://'
+).replace('postgresql://', 'postgresql+asyncpg://', 1)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    echo=False
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 Base = declarative_base()
 
 class NewsArticle(Base):
@@ -46,6 +72,7 @@ class NewsArticle(Base):
     title = Column(String(500), nullable=False)
     content = Column(Text, nullable=False)
     content_hash = Column(String(64))
+    content_uri = Column(String(1000))  # Puntero al contenido completo comprimido (content_store)
     date = Column(Date, nullable=False, index=True)
     language = Column(String(10), default='es')
     source_domain = Column(String(255), nullable=False, index=True)
@@ -71,6 +98,21 @@ class ProcessLog(Base):
     error_message = Column(Text)
     parameters = Column(JSON)
 
+class WarcYield(Base):
+    """Rendimiento por WARC: registros relevantes por MB leído (alimenta el scheduler de segmentos)"""
+    __tablename__ = "warc_yields"
+    __table_args__ = {'schema': 'commoncrawl'}
+    
+    warc_path = Column(String(500), primary_key=True)
+    crawl_id = Column(String(50), nullable=False, index=True)
+    segment = Column(String(100), nullable=False, index=True)
+    runs = Column(Integer, default=0)
+    records_read = Column(Integer, default=0)
+    relevant_records = Column(Integer, default=0)
+    bytes_scanned = Column(BigInteger, default=0)  # Bytes comprimidos del WARC recorridos por el parser
+    bytes_downloaded = Column(BigInteger, default=0)  # Bytes bajados de la red (0 si venía de la cache)
+    last_run_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 
 def init_db():
     """Inicializar base de datos de forma segura"""
@@ -79,6 +121,12 @@ def init_db():
             conn.execute(text("CREATE SCHEMA IF NOT EXISTS commoncrawl"))
 
         Base.metadata.create_all(bind=engine)
+
+        # create_all no agrega columnas a tablas existentes
+        with engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE commoncrawl.news_articles ADD COLUMN IF NOT EXISTS content_uri VARCHAR(1000)"
+            ))
         logger.info("Base de datos inicializada correctamente")
 
         if ENV == "development":
@@ -126,32 +174,44 @@ def insert_test_data():
     finally:
         session.close()
 
-def save_articles(articles: List[Dict]) -> int:
+def _article_values(article_data: Union[ArticleRecord, Dict]) -> Dict:
+    """Columnas de news_articles a partir del registro (o dict) del cliente"""
+    return {**ArticleRecord.coerce(article_data).to_db_values(), 'processed': False}
+
+def _article_from_dict(article_data: Union[ArticleRecord, Dict]) -> NewsArticle:
+    """Construir la fila NewsArticle a partir del registro (o dict) del cliente"""
+    return NewsArticle(**_article_values(article_data))
+
+def _article_to_dict(article: NewsArticle) -> Dict:
+    """Representación resumida de un artículo para la API"""
+    return {
+        "id": article.id,
+        "url": article.url,
+        "title": article.title,
+        "content": article.content[:200] + "..." if len(article.content) > 200 else article.content,
+        "date": article.date.isoformat() if article.date else None,
+        "language": article.language,
+        "source_domain": article.source_domain,
+        "keywords": article.keywords,
+        "content_uri": article.content_uri,
+        "processed": article.processed,
+        "created_at": article.created_at.isoformat() if article.created_at else None
+    }
+
+def save_articles(articles: List[ArticleRecord]) -> int:
     """Guardar artículos en la base de datos"""
     session = SessionLocal()
     saved_count = 0
     
     try:
-        for article_data in articles:
+        for article_data in map(ArticleRecord.coerce, articles):
             # Verificar si ya existe por URL
             existing = session.query(NewsArticle).filter_by(
-                url=article_data.get('url', '')
+                url=article_data.url
             ).first()
             
             if not existing:
-                article = NewsArticle(
-                    url=article_data.get('url', ''),
-                    title=article_data.get('title', '')[:500],
-                    content=article_data.get('content', ''),
-                    date=datetime.strptime(article_data.get('date', '2024-01-01'), '%Y-%m-%d').date(),
-                    language=article_data.get('language', 'es'),
-                    source_domain=article_data.get('source_domain', ''),
-                    warc_file=article_data.get('warc_file', ''),
-                    record_id=article_data.get('record_id', ''),
-                    keywords=article_data.get('keywords', []),
-                    processed=False
-                )
-                session.add(article)
+                session.add(_article_from_dict(article_data))
                 saved_count += 1
         
         session.commit()
@@ -190,6 +250,22 @@ def save_articles(articles: List[Dict]) -> int:
     
     return saved_count
 
+def iter_article_urls(batch_size: int = 10000):
+    """Iterar las URLs almacenadas en lotes (para reconstruir el filtro de URLs vistas)"""
+    session = SessionLocal()
+    
+    try:
+        batch = []
+        for (url,) in session.query(NewsArticle.url).yield_per(batch_size):
+            batch.append(url)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        session.close()
+
 def get_articles(
     limit: int = 10, 
     offset: int = 0, 
@@ -224,21 +300,7 @@ def get_articles(
                        .limit(limit)\
                        .all()
         
-        return [
-            {
-                "id": article.id,
-                "url": article.url,
-                "title": article.title,
-                "content": article.content[:200] + "..." if len(article.content) > 200 else article.content,
-                "date": article.date.isoformat() if article.date else None,
-                "language": article.language,
-                "source_domain": article.source_domain,
-                "keywords": article.keywords,
-                "processed": article.processed,
-                "created_at": article.created_at.isoformat() if article.created_at else None
-            }
-            for article in articles
-        ]
+        return [_article_to_dict(article) for article in articles]
         
     finally:
         session.close()
@@ -286,4 +348,267 @@ def check_db_health():
         logger.error(f"Error verificación BD: {e}")
         return False
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+# ===== VERSIONES ASYNC (endpoints) =====
+
+def _articles_query(domain: str = None, keyword: str = None, start_date: str = None, end_date: str = None):
+    """SELECT de artículos con los mismos filtros que get_articles"""
+    query = select(NewsArticle)
+    
+    if domain:
+        query = query.where(NewsArticle.source_domain.ilike(f"%{domain}%"))
+    
+    if keyword:
+        query = query.where(
+            NewsArticle.title.ilike(f"%{keyword}%") | 
+            NewsArticle.content.ilike(f"%{keyword}%")
+        )
+    
+    if start_date:
+        query = query.where(NewsArticle.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
+    
+    if end_date:
+        query = query.where(NewsArticle.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+    
+    return query
+
+async def insert_articles_async(articles: List[ArticleRecord]) -> List[Dict]:
+    """
+    Insertar artículos nuevos con INSERT ... ON CONFLICT (url) DO NOTHING RETURNING, en
+    sentencias de como mucho INSERT_MAX_PARAMS parámetros y todas en la misma transacción.
+    Devuelve [{'id', 'url'}] de las filas realmente insertadas (las URLs existentes se omiten).
+    """
+    values = list({v['url']: v for v in map(_article_values, articles)}.values())
+    
+    async with AsyncSessionLocal() as session:
+        try:
+            inserted = []
+            if values:
+                # Un WARC del backfill puede traer miles de filas: sin partir se supera el
+                # límite de parámetros de PostgreSQL y el lote falla entero
+                rows_per_statement = max(INSERT_MAX_PARAMS // len(values[0]), 1)
+                for start in range(0, len(values), rows_per_statement):
+                    stmt = pg_insert(NewsArticle).values(values[start:start + rows_per_statement])\
+                        .on_conflict_do_nothing(index_elements=[NewsArticle.url])\
+                        .returning(NewsArticle.id, NewsArticle.url)
+                    result = await session.execute(stmt)
+                    inserted.extend({"id": row.id, "url": row.url} for row in result)
+            
+            # Log del proceso en la misma transacción
+            session.add(ProcessLog(
+                process_name="data_acquisition",
+                status="success",
+                records_processed=len(inserted),
+                end_time=datetime.now(),
+                parameters={"source": "common_crawl"}
+            ))
+            await session.commit()
+            logger.info(f"Guardados {len(inserted)} artículos nuevos")
+            return inserted
+            
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error guardando artículos: {e}")
+            
+            # Log de error
+            try:
+                session.add(ProcessLog(
+                    process_name="data_acquisition",
+                    status="failed",
+                    error_message=str(e)[:500],
+                    end_time=datetime.now()
+                ))
+                await session.commit()
+            except Exception:
+                pass
+            raise
+
+async def save_articles_async(articles: List[ArticleRecord]) -> int:
+    """Guardar artículos sin bloquear el event loop (devuelve cuántos eran nuevos)"""
+    return len(await insert_articles_async(articles))
+
+async def get_articles_async(
+    limit: int = 10, 
+    offset: int = 0, 
+    domain: str = None, 
+    keyword: str = None,
+    start_date: str = None,
+    end_date: str = None
+) -> List[Dict]:
+    """Obtener artículos de la base de datos (async)"""
+    query = _articles_query(domain, keyword, start_date, end_date)\
+        .order_by(NewsArticle.date.desc())\
+        .offset(offset)\
+        .limit(limit)
+    
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(query)
+        return [_article_to_dict(article) for article in result.scalars().all()]
+
+async def count_articles_async() -> int:
+    """Total de artículos almacenados (async)"""
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(select(func.count(NewsArticle.id)))
+
+async def get_article_content_uri_async(article_id: int) -> Optional[Dict]:
+    """Obtener el puntero al contenido completo de un artículo (async)"""
+    async with AsyncSessionLocal() as session:
+        row = (await session.execute(
+            select(NewsArticle.id, NewsArticle.url, NewsArticle.content_uri)
+            .where(NewsArticle.id == article_id)
+        )).first()
+        if row is None:
+            return None
+        return {"id": row.id, "url": row.url, "content_uri": row.content_uri}
+
+async def get_stats_async() -> Dict:
+    """Obtener estadísticas de la base de datos (async)"""
+    async with AsyncSessionLocal() as session:
+        total_articles = await session.scalar(select(func.count(NewsArticle.id)))
+        
+        articles_by_domain = await session.execute(
+            select(NewsArticle.source_domain, func.count(NewsArticle.id))
+            .group_by(NewsArticle.source_domain)
+        )
+        
+        articles_by_language = await session.execute(
+            select(NewsArticle.language, func.count(NewsArticle.id))
+            .group_by(NewsArticle.language)
+        )
+        
+        latest_created_at = await session.scalar(select(func.max(NewsArticle.created_at)))
+        
+        return {
+            "total_articles": total_articles,
+            "articles_by_domain": {domain: count for domain, count in articles_by_domain.all()},
+            "articles_by_language": {lang: count for lang, count in articles_by_language.all()},
+            "latest_article_date": latest_created_at.isoformat() if latest_created_at else None,
+            "database_url": DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else DATABASE_URL
+        }
+
+async def check_db_health_async() -> bool:
+    """Verificar salud de la base de datos (async)"""
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"Error verificación BD: {e}")
+        return False
+
+def record_warc_yield(
+    warc_path: str,
+    crawl_id: str,
+    segment: str,
+    records_read: int,
+    relevant_records: int,
+    bytes_scanned: int,
+    bytes_downloaded: int
+):
+    """Acumular el rendimiento de una lectura de WARC (upsert por warc_path)"""
+    stmt = pg_insert(WarcYield).values(
+        warc_path=warc_path,
+        crawl_id=crawl_id,
+        segment=segment,
+        runs=1,
+        records_read=records_read,
+        relevant_records=relevant_records,
+        bytes_scanned=bytes_scanned,
+        bytes_downloaded=bytes_downloaded
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WarcYield.warc_path],
+        set_={
+            'runs': WarcYield.runs + 1,
+            'records_read': WarcYield.records_read + stmt.excluded.records_read,
+            'relevant_records': WarcYield.relevant_records + stmt.excluded.relevant_records,
+            'bytes_scanned': WarcYield.bytes_scanned + stmt.excluded.bytes_scanned,
+            'bytes_downloaded': WarcYield.bytes_downloaded + stmt.excluded.bytes_downloaded,
+            'last_run_at': func.now()
+        }
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt)
+
+def get_segment_yields(crawl_id: str) -> Dict[str, Dict]:
+    """Rendimiento agregado por segmento de un crawl: {segment: {warcs, relevant_records, bytes_scanned}}"""
+    session = SessionLocal()
+    
+    try:
+        rows = session.query(
+            WarcYield.segment,
+            func.count(WarcYield.warc_path),
+            func.sum(WarcYield.relevant_records),
+            func.sum(WarcYield.bytes_scanned)
+        ).filter(WarcYield.crawl_id == crawl_id).group_by(WarcYield.segment).all()
+        return {
+            segment: {"warcs": warcs, "relevant_records": int(relevant or 0), "bytes_scanned": int(scanned or 0)}
+            for segment, warcs, relevant, scanned in rows
+        }
+    finally:
+        session.close()
+
+def get_scanned_warcs(crawl_id: str) -> set:
+    """Rutas de WARCs del crawl que ya se leyeron al menos una vez"""
+    session = SessionLocal()
+    
+    try:
+        return {path for (path,) in session.query(WarcYield.warc_path).filter(WarcYield.crawl_id == crawl_id)}
+    finally:
+        session.close()
+
+def get_global_yield() -> Dict:
+    """Rendimiento medio de todos los WARCs registrados (prior del scheduler)"""
+    session = SessionLocal()
+    
+    try:
+        relevant, scanned = session.query(
+            func.sum(WarcYield.relevant_records), func.sum(WarcYield.bytes_scanned)
+        ).one()
+        return {"relevant_records": int(relevant or 0), "bytes_scanned": int(scanned or 0)}
+    finally:
+        session.close()
+
+async def get_yield_summary_async(top_segments: int = 5) -> Dict:
+    """Totales de rendimiento de la ingesta y segmentos más productivos (async, para /info)"""
+    async with AsyncSessionLocal() as session:
+        totals = (await session.execute(
+            select(
+                func.count(WarcYield.warc_path),
+                func.sum(WarcYield.records_read),
+                func.sum(WarcYield.relevant_records),
+                func.sum(WarcYield.bytes_scanned),
+                func.sum(WarcYield.bytes_downloaded)
+            )
+        )).one()
+        
+        relevant_sum = func.sum(WarcYield.relevant_records)
+        scanned_sum = func.sum(WarcYield.bytes_scanned)
+        best = await session.execute(
+            select(WarcYield.crawl_id, WarcYield.segment, func.count(WarcYield.warc_path), relevant_sum, scanned_sum)
+            .group_by(WarcYield.crawl_id, WarcYield.segment)
+            .having(scanned_sum > 0)
+            .order_by((relevant_sum * 1.0 / scanned_sum).desc())
+            .limit(top_segments)
+        )
+        
+        warcs, records_read, relevant, scanned, downloaded = (int(v or 0) for v in totals)
+        return {
+            "warcs_scanned": warcs,
+            "records_read": records_read,
+            "relevant_records": relevant,
+            "gb_scanned": round(scanned / 1024 ** 3, 3),
+            "gb_downloaded": round(downloaded / 1024 ** 3, 3),
+            "relevant_per_gb_downloaded": round(relevant / (downloaded / 1024 ** 3), 1) if downloaded else None,
+            "relevant_per_gb_scanned": round(relevant / (scanned / 1024 ** 3), 1) if scanned else None,
+            "top_segments": [
+                {
+                    "crawl_id": crawl_id,
+                    "segment": segment,
+                    "warcs": count,
+                    "relevant_per_mb": round(int(seg_relevant or 0) / (int(seg_scanned) / 1024 ** 2), 3)
+                }
+                for crawl_id, segment, count, seg_relevant, seg_scanned in best.all()
+            ]
+        }
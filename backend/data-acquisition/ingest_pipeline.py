@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import seen_urls
+from article_record import ArticleRecord
+from database import insert_articles_async
+from processing_queue import ProcessingQueuePublisher, get_publisher
+
+logger = logging.getLogger(__name__)
+
+# Concurrencia (workers) por etapa
+STAGE_WORKERS = {
+    'plan': 1,
+    'download': int(os.getenv('INGEST_DOWNLOAD_WORKERS', '3')),
+    'dedupe': 1,
+    'save': 1,
+    'enqueue': int(os.getenv('INGEST_ENQUEUE_WORKERS', '1')),
+}
+# Capacidad de la cola de entrada de cada etapa. Ninguna cola transporta WARCs:
+# cada worker de download parsea su WARC mientras llega, con memoria acotada a
+# ~WARC_DOWNLOAD_SEGMENTS * WARC_SEGMENT_SIZE (o S3_CONCURRENCY * S3_PART_SIZE).
+STAGE_QUEUE_SIZE = {
+    'plan': 1,
+    'download': int(os.getenv('INGEST_PLAN_QUEUE_SIZE', '16')),
+    'dedupe': int(os.getenv('INGEST_ARTICLE_QUEUE_SIZE', '500')),
+    'save': int(os.getenv('INGEST_ARTICLE_QUEUE_SIZE', '500')),
+    'enqueue': int(os.getenv('INGEST_BATCH_QUEUE_SIZE', '10')),
+}
+SAVE_BATCH_SIZE = int(os.getenv('INGEST_SAVE_BATCH_SIZE', '100'))
+SAVE_FLUSH_SECONDS = float(os.getenv('INGEST_SAVE_FLUSH_SECONDS', '2'))
+MAX_CRAWLS = int(os.getenv('INGEST_MAX_CRAWLS', '2'))
+WARC_FILES_PER_CRAWL = int(os.getenv('MAX_WARC_FILES', '3'))
+RECORDS_PER_FILE = int(os.getenv('MAX_RECORDS_PER_FILE', '20'))
+
+_END = object()
+
+
+class Stage:
+    """
+    Etapa del pipeline: N workers consumen una cola acotada y emiten a la cola
+    de la etapa siguiente. Si esa cola está llena, el put bloquea (backpressure)
+    y el tiempo bloqueado se contabiliza aparte del tiempo de trabajo.
+
+    Con batch_size > 0 los items se agrupan (por tamaño o por flush_seconds)
+    antes de llamar al handler.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], AsyncIterator[Any]],
+        workers: int,
+        queue_size: int,
+        batch_size: int = 0,
+        flush_seconds: float = 0.0
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(workers, 1)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(queue_size, 1))
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    async def _handle(self, item: Any, downstream: Optional['Stage']) -> None:
+        started = time.perf_counter()
+        blocked = 0.0
+        try:
+            async for output in self.handler(item):
+                if downstream is not None:
+                    put_started = time.perf_counter()
+                    await downstream.queue.put(output)
+                    blocked += time.perf_counter() - put_started
+                self.emitted += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ Etapa {self.name}: {e}")
+        finally:
+            self.processed += 1
+            self.blocked_seconds += blocked
+            self.busy_seconds += time.perf_counter() - started - blocked
+
+    async def _worker(self, downstream: Optional['Stage']) -> None:
+        while True:
+            item = await self.queue.get()
+            if item is _END:
+                return
+            await self._handle(item, downstream)
+
+    async def _batch_worker(self, downstream: Optional['Stage']) -> None:
+        batch: List[Any] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+
+            if item is not None and item is not _END:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+
+            if batch and (item is None or item is _END or len(batch) >= self.batch_size):
+                await self._handle(batch, downstream)
+                batch, deadline = [], None
+
+            if item is _END:
+                return
+
+    async def run(self, downstream: Optional['Stage']) -> None:
+        """Ejecutar los workers y, al terminar, propagar el fin a la etapa siguiente"""
+        self.started_at = time.perf_counter()
+        worker = self._batch_worker if self.batch_size > 0 else self._worker
+        try:
+            await asyncio.gather(*(worker(downstream) for _ in range(self.workers)))
+        finally:
+            self.finished_at = time.perf_counter()
+        if downstream is not None:
+            for _ in range(downstream.workers):
+                await downstream.queue.put(_END)
+
+    def snapshot(self) -> Dict:
+        end = self.finished_at or time.perf_counter()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "errors": self.errors,
+            "rate_per_second": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "blocked_seconds": round(self.blocked_seconds, 2),
+            "running": self.started_at is not None and self.finished_at is None
+        }
+
+
+class IngestPipeline:
+    """
+    Pipeline de ingesta por etapas conectadas con colas asyncio acotadas:
+    plan -> download -> dedupe -> save -> enqueue
+
+    - plan: crawls del rango de fechas y rutas de WARCs
+    - download: descarga en streaming (HTTP, rangos o S3) con descompresión, parseo y filtro
+      de relevancia sobre las partes a medida que llegan; los WARCs de la cache local se
+      parsean en paralelo por miembros gzip (pool de procesos) sobre un mmap
+    - dedupe: URLs repetidas en el job y límite de artículos
+    - save: INSERT por lotes (SAVE_BATCH_SIZE o SAVE_FLUSH_SECONDS)
+    - enqueue: IDs insertados a la cola del text-processor (un script Lua por lote, idempotente)
+
+    La etapa más lenta llena su cola de entrada y frena a las anteriores.
+    """
+
+    def __init__(
+        self,
+        client,
+        job_id: str,
+        start_date: str,
+        end_date: str,
+        limit: int,
+        publisher: Optional[ProcessingQueuePublisher] = None,
+        on_progress: Optional[Callable[['IngestPipeline'], None]] = None
+    ):
+        self.client = client
+        self.job_id = job_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.limit = limit
+        self.publisher = publisher or get_publisher()
+        self.on_progress = on_progress
+        self.stop_event = asyncio.Event()
+        self.accepted_urls: set = set()
+        self.articles_saved = 0
+        self.articles_enqueued = 0
+        self.sample: List[Dict] = []
+        self.started = time.perf_counter()
+
+        self.stages = [
+            Stage('plan', self._plan, STAGE_WORKERS['plan'], STAGE_QUEUE_SIZE['plan']),
+            Stage('download', self._download, STAGE_WORKERS['download'], STAGE_QUEUE_SIZE['download']),
+            Stage('dedupe', self._dedupe, STAGE_WORKERS['dedupe'], STAGE_QUEUE_SIZE['dedupe']),
+            Stage(
+                'save', self._save, STAGE_WORKERS['save'], STAGE_QUEUE_SIZE['save'],
+                batch_size=SAVE_BATCH_SIZE, flush_seconds=SAVE_FLUSH_SECONDS
+            ),
+            Stage('enqueue', self._enqueue, STAGE_WORKERS['enqueue'], STAGE_QUEUE_SIZE['enqueue']),
+        ]
+
+    # ===== ETAPAS =====
+
+    async def _plan(self, _request) -> AsyncIterator[str]:
+        crawls = await asyncio.to_thread(self.client._get_crawls_for_date_range, self.start_date, self.end_date)
+        for crawl in crawls[:MAX_CRAWLS]:
+            warc_files = await self.client._get_warc_files_for_crawl(
+                crawl['id'], limit=WARC_FILES_PER_CRAWL, kind=self.client.content_format
+            )
+            for warc_file in warc_files:
+                if self.stop_event.is_set():
+                    return
+                yield warc_file
+
+    async def _download(self, warc_path: str) -> AsyncIterator[ArticleRecord]:
+        if self.stop_event.is_set():
+            return
+        articles = await self.client.download_warc_file(warc_path, RECORDS_PER_FILE)
+        for article in articles:
+            yield article
+        self._progress()
+
+    async def _dedupe(self, article: ArticleRecord) -> AsyncIterator[ArticleRecord]:
+        url = article.url
+        if not url or url in self.accepted_urls or len(self.accepted_urls) >= self.limit:
+            return
+        self.accepted_urls.add(url)
+        if len(self.accepted_urls) >= self.limit:
+            logger.info(f"✓ Job {self.job_id}: alcanzado límite de {self.limit} artículos")
+            self.stop_event.set()
+        yield article
+
+    async def _save(self, batch: List[ArticleRecord]) -> AsyncIterator[List[int]]:
+        inserted = await insert_articles_async(batch)
+        await asyncio.to_thread(seen_urls.remember_urls, [a.url for a in batch])
+        self.articles_saved += len(inserted)
+        self.sample.extend(a.to_dict() for a in batch[:max(3 - len(self.sample), 0)])
+        self._progress()
+        if inserted:
+            yield [row['id'] for row in inserted]
+
+    async def _enqueue(self, article_ids: List[int]) -> AsyncIterator[None]:
+        self.articles_enqueued += await self.publisher.publish(article_ids, self.job_id)
+        yield None
+
+    # ===== EJECUCIÓN =====
+
+    def _progress(self) -> None:
+        if self.on_progress:
+            self.on_progress(self)
+
+    def snapshot(self) -> Dict:
+        """Profundidad de colas y tasas por etapa (para /status/{job_id})"""
+        return {
+            "stages": {stage.name: stage.snapshot() for stage in self.stages},
+            "articles_accepted": len(self.accepted_urls),
+            "articles_saved": self.articles_saved,
+            "articles_enqueued": self.articles_enqueued,
+            "elapsed_seconds": round(time.perf_counter() - self.started, 2),
+            "ingestion_stats": self.client.ingestion_metrics()
+        }
+
+    async def run(self) -> Dict:
+        """Ejecutar todas las etapas hasta vaciar el pipeline"""
+        self.started = time.perf_counter()
+        downstream = self.stages[1:] + [None]
+        tasks = [
+            asyncio.create_task(stage.run(nxt))
+            for stage, nxt in zip(self.stages, downstream)
+        ]
+        try:
+            await self.stages[0].queue.put({"start_date": self.start_date, "end_date": self.end_date})
+            await self.stages[0].queue.put(_END)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        summary = self.snapshot()
+        logger.info(
+            f"🏁 Pipeline {self.job_id}: {self.articles_saved} guardados, "
+            f"{self.articles_enqueued} encolados en {summary['elapsed_seconds']}s"
+        )
+        return summary
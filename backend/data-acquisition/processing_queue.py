@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+# Mismo stream que consume el text-processor (queue_client.RedisQueue.TASK_QUEUE, carril normal)
+TASK_QUEUE = os.getenv('TEXT_PROCESSOR_TASK_QUEUE', 'tasks:text_processor:stream')
+QUEUE_REDIS_URL = os.getenv('TEXT_PROCESSOR_REDIS_URL', os.getenv('REDIS_URL', ''))
+# Vigencia de las claves de idempotencia (un artículo no se reencola mientras exista su clave)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('TEXT_PROCESSOR_IDEMPOTENCY_TTL', str(7 * 24 * 3600)))
+
+# KEYS[1] = stream, KEYS[2..n] = claves de idempotencia; ARGV[1] = TTL, ARGV[2..n] = tareas.
+# Todo el lote se encola en una sola llamada atómica; solo se hace XADD de las tareas
+# cuya clave de idempotencia no existía (campo 'task' con el JSON, como RedisQueue.enqueue_task).
+_ENQUEUE_ONCE_SCRIPT = """
+local pushed = 0
+for i = 2, #KEYS do
+    if redis.call('SET', KEYS[i], '1', 'NX', 'EX', ARGV[1]) then
+        redis.call('XADD', KEYS[1], '*', 'task', ARGV[i])
+        pushed = pushed + 1
+    end
+end
+return pushed
+"""
+
+
+def idempotency_key(article_id: int, queue: str = TASK_QUEUE) -> str:
+    return f"{queue}:enqueued:{article_id}"
+
+
+class ProcessingQueuePublisher:
+    """
+    Publica los IDs de artículos recién guardados en la cola del text-processor,
+    con el mismo formato de tarea que RedisQueue.enqueue_task.
+    Cada lote es una sola operación (script Lua) con clave de idempotencia por artículo.
+    Sin REDIS_URL configurado queda desactivado.
+    """
+
+    def __init__(self, redis_url: str = QUEUE_REDIS_URL, queue: str = TASK_QUEUE):
+        self.redis_url = redis_url
+        self.queue = queue
+        self.client: Optional[redis.Redis] = None
+        self._enqueue_once = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.redis_url)
+
+    async def connect(self):
+        if self.enabled and self.client is None:
+            self.client = redis.from_url(self.redis_url, encoding="utf-8", decode_responses=True)
+            self._enqueue_once = self.client.register_script(_ENQUEUE_ONCE_SCRIPT)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+            self._enqueue_once = None
+
+    async def publish(self, article_ids: List[int], job_id: str) -> int:
+        """Encolar un lote de artículos; devuelve cuántos se encolaron (los ya encolados se omiten)"""
+        if not self.enabled or not article_ids:
+            return 0
+        await self.connect()
+
+        now = datetime.utcnow().isoformat()
+        keys = [idempotency_key(article_id, self.queue) for article_id in article_ids]
+        tasks = [
+            json.dumps({
+                "job_id": job_id,
+                "article_id": article_id,
+                "idempotency_key": key,
+                "priority": 0,
+                "created_at": now,
+                "enqueued_at": now
+            })
+            for article_id, key in zip(article_ids, keys)
+        ]
+
+        pushed = await self._enqueue_once(keys=[self.queue, *keys], args=[IDEMPOTENCY_TTL_SECONDS, *tasks])
+        if pushed < len(tasks):
+            logger.debug(f"{len(tasks) - pushed} artículos ya estaban encolados")
+        logger.info(f"📤 {pushed} artículos encolados en {self.queue} (job {job_id})")
+        return pushed
+
+
+# ===== INSTANCIA COMPARTIDA =====
+
+_publisher: Optional[ProcessingQueuePublisher] = None
+
+
+def get_publisher() -> ProcessingQueuePublisher:
+    """Publicador compartido (una conexión Redis por proceso)"""
+    global _publisher
+    if _publisher is None:
+        _publisher = ProcessingQueuePublisher()
+    return _publisher
+
+
+async def close_publisher():
+    if _publisher is not None:
+        await _publisher.close()
@@ -0,0 +1,154 @@
+import asyncio
+import io
+import logging
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, List, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+def split_ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    """Dividir [0, size) en rangos inclusivos (inicio, fin) de part_size bytes"""
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+
+async def iter_ranges_in_order(
+    fetch_range: Callable[[int, int], Awaitable[bytes]],
+    size: int,
+    part_size: int = DEFAULT_PART_SIZE,
+    window: int = 4
+) -> AsyncIterator[bytes]:
+    """
+    Descargar un objeto por rangos concurrentes y entregar las partes en orden.
+    Como máximo `window` partes están en vuelo/pendientes de entregar a la vez,
+    lo que acota la memoria a ~window * part_size.
+    """
+    ranges = iter(split_ranges(size, part_size))
+    pending = deque()
+
+    def schedule_next() -> None:
+        next_range = next(ranges, None)
+        if next_range is not None:
+            pending.append(asyncio.create_task(fetch_range(*next_range)))
+
+    try:
+        for _ in range(max(window, 1)):
+            schedule_next()
+        while pending:
+            chunk = await pending.popleft()
+            schedule_next()
+            yield chunk
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def with_retries(
+    operation: Callable[[], Awaitable[T]],
+    retries: int = 3,
+    backoff: float = 0.5,
+    description: str = "operación"
+) -> T:
+    """Reintentar una operación asíncrona con backoff exponencial"""
+    for attempt in range(retries + 1):
+        try:
+            return await operation()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            logger.warning(f"⚠️  Falló {description} (intento {attempt + 1}/{retries + 1}): {e}. Reintentando en {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+class AsyncQueueReader(io.RawIOBase):
+    """
+    Stream síncrono (para warcio) alimentado desde una asyncio.Queue.
+    Se lee desde un hilo; cada parte se obtiene del event loop con run_coroutine_threadsafe.
+    None en la cola marca fin de stream; una excepción se propaga al lector.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._queue = queue
+        self._loop = loop
+        self._buffer = memoryview(b'')
+        self._eof = False
+        self._error = None
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            if self._error is not None:
+                # El error se repite en cada lectura para que el parser no lo trate como fin de archivo
+                raise self._error
+            if self._eof:
+                return 0
+            chunk = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+            if chunk is None:
+                self._eof = True
+                return 0
+            if isinstance(chunk, BaseException):
+                self._error = chunk
+                raise chunk
+            self._buffer = memoryview(chunk)
+
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        self.bytes_read += n
+        return n
+
+
+async def parse_stream(
+    chunks: AsyncIterator[bytes],
+    parse_fn: Callable[[io.BufferedReader], T],
+    queue_size: int = 4
+) -> T:
+    """
+    Alimentar un parser síncrono (ejecutado en un hilo) con partes asíncronas en orden.
+    Si el parser termina antes (ej: max_records), se cancela la descarga restante.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(queue_size, 1))
+    reader = io.BufferedReader(AsyncQueueReader(queue, loop), buffer_size=256 * 1024)
+
+    async def pump() -> None:
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+            await queue.put(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+
+    parse_task = asyncio.ensure_future(asyncio.to_thread(parse_fn, reader))
+    pump_task = asyncio.ensure_future(pump())
+
+    try:
+        await asyncio.wait({parse_task, pump_task}, return_when=asyncio.FIRST_COMPLETED)
+        if parse_task.done():
+            pump_task.cancel()
+        return await parse_task
+    finally:
+        if not pump_task.done():
+            pump_task.cancel()
+        if not parse_task.done():
+            # Desbloquear al lector si quedó esperando datos
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(asyncio.CancelledError())
+        await asyncio.gather(pump_task, return_exceptions=True)
+        aclose = getattr(chunks, 'aclose', None)
+        if aclose:
+            await aclose()
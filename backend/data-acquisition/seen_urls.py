@@ -0,0 +1,405 @@
+import fcntl
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 'file' (local, respaldado en archivo), 'redis' (compartido entre réplicas) u 'off'
+FILTER_BACKEND = os.getenv('SEEN_URL_FILTER', 'file').lower()
+FILTER_PATH = os.getenv('SEEN_URL_FILTER_PATH', 'data/seen-urls.bloom')
+FILTER_REDIS_URL = os.getenv('SEEN_URL_FILTER_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+FILTER_REDIS_PREFIX = os.getenv('SEEN_URL_FILTER_PREFIX', 'seen_urls')
+FILTER_CAPACITY = int(os.getenv('SEEN_URL_FILTER_CAPACITY', '1000000'))
+FILTER_ERROR_RATE = float(os.getenv('SEEN_URL_FILTER_ERROR_RATE', '0.001'))
+FILTER_REFRESH_SECONDS = float(os.getenv('SEEN_URL_FILTER_REFRESH_SECONDS', '60'))
+
+GROWTH = 2          # Cada nueva capa duplica la capacidad
+TIGHTENING = 0.5    # ... y reduce a la mitad su tasa de falsos positivos
+
+
+def _slice_params(index: int, capacity: int, error_rate: float):
+    """Parámetros (capacidad, bits, hashes) de la capa `index`; deterministas para poder crecer en paralelo"""
+    cap = capacity * (GROWTH ** index)
+    err = error_rate * (1 - TIGHTENING) * (TIGHTENING ** index)
+    bits = max(8, int(math.ceil(-cap * math.log(err) / (math.log(2) ** 2))))
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, int(round(bits / cap * math.log(2))))
+    return cap, bits, hashes
+
+
+def _hash_pair(url: str):
+    digest = hashlib.blake2b(url.encode('utf-8', 'ignore'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomSlice:
+    """Capa de Bloom filter de tamaño fijo (double hashing sobre blake2b)"""
+
+    __slots__ = ('capacity', 'num_bits', 'num_hashes', 'bits', 'count')
+
+    def __init__(self, capacity: int, num_bits: int, num_hashes: int, bits: Optional[bytearray] = None, count: int = 0):
+        self.capacity = capacity
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray(num_bits // 8)
+        self.count = count
+
+    def positions(self, url: str) -> List[int]:
+        h1, h2 = _hash_pair(url)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def contains_positions(self, positions: List[int]) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def set_positions(self, positions: List[int]) -> None:
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter escalable de URLs ya ingeridas.
+    Cuando la capa activa se llena se agrega otra más grande y más estricta,
+    manteniendo la tasa de falsos positivos total por debajo de error_rate.
+    """
+
+    def __init__(self, capacity: int = FILTER_CAPACITY, error_rate: float = FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.slices: List[BloomSlice] = []
+        self._lock = threading.RLock()
+
+    def _new_slice(self) -> BloomSlice:
+        cap, bits, hashes = _slice_params(len(self.slices), self.capacity, self.error_rate)
+        return BloomSlice(cap, bits, hashes)
+
+    def __contains__(self, url: str) -> bool:
+        if not url:
+            return False
+        self.maybe_refresh()
+        return self._contains(url)
+
+    def _contains(self, url: str) -> bool:
+        return any(s.contains_positions(s.positions(url)) for s in self.slices)
+
+    def add_many(self, urls: Iterable[str]) -> int:
+        """Agregar URLs; devuelve cuántas eran nuevas"""
+        added = 0
+        with self._lock:
+            for url in urls:
+                if not url or self._contains(url):
+                    continue
+                if not self.slices or self.slices[-1].full:
+                    self.slices.append(self._new_slice())
+                active = self.slices[-1]
+                positions = active.positions(url)
+                active.set_positions(positions)
+                active.count += 1
+                self._on_positions_set(len(self.slices) - 1, positions)
+                added += 1
+        return added
+
+    def _on_positions_set(self, slice_index: int, positions: List[int]) -> None:
+        """Hook para backends que replican los bits fuera del proceso"""
+
+    def add(self, url: str) -> bool:
+        return self.add_many([url]) == 1
+
+    def swap(self, slices: List[BloomSlice]) -> None:
+        """Reemplazar de una vez todas las capas (al terminar una reconstrucción)"""
+        with self._lock:
+            self.slices = slices
+
+    def maybe_refresh(self) -> None:
+        """Recargar el estado compartido (no-op en memoria)"""
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "slices": len(self.slices),
+            "items": sum(s.count for s in self.slices),
+            "capacity": sum(s.capacity for s in self.slices),
+            "memory_bytes": sum(len(s.bits) for s in self.slices),
+            "error_rate": self.error_rate
+        }
+
+
+class FileBloomFilter(ScalableBloomFilter):
+    """Variante local respaldada en archivo (cabecera JSON + bitmaps de cada capa)"""
+
+    def __init__(self, path: str = FILTER_PATH, refresh_seconds: float = FILTER_REFRESH_SECONDS, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._loaded_mtime = None
+        self._checked_at = 0.0
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with self._lock, open(self.path, 'rb') as f:
+            header = json.loads(f.readline())
+            slices = []
+            for meta in header['slices']:
+                bits = bytearray(f.read(meta['num_bits'] // 8))
+                slices.append(BloomSlice(meta['capacity'], meta['num_bits'], meta['num_hashes'], bits, meta['count']))
+            self.capacity = header.get('capacity', self.capacity)
+            self.error_rate = header.get('error_rate', self.error_rate)
+            self.slices = slices
+            self._loaded_mtime = os.path.getmtime(self.path)
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            header = {
+                "capacity": self.capacity,
+                "error_rate": self.error_rate,
+                "slices": [
+                    {"capacity": s.capacity, "num_bits": s.num_bits, "num_hashes": s.num_hashes, "count": s.count}
+                    for s in self.slices
+                ]
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps(header).encode() + b'\n')
+                for s in self.slices:
+                    f.write(s.bits)
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.path.getmtime(self.path)
+
+    def maybe_refresh(self) -> None:
+        """Recargar si otro proceso actualizó el archivo"""
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        try:
+            if os.path.exists(self.path) and os.path.getmtime(self.path) != self._loaded_mtime:
+                self.load()
+        except Exception as e:
+            logger.warning(f"No se pudo recargar el filtro de URLs: {e}")
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock exclusivo entre procesos (flock sobre <ruta>.lock) para leer-modificar-guardar"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock, open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def add_many(self, urls: Iterable[str]) -> int:
+        # Recargar, agregar y guardar bajo el lock de archivo: otro proceso no puede
+        # guardar entre la recarga y el os.replace y perder las URLs de este lote
+        with self._file_lock():
+            self._checked_at = 0.0
+            self.maybe_refresh()
+            added = super().add_many(urls)
+            if added:
+                self.save()
+        return added
+
+    def swap(self, slices: List[BloomSlice]) -> None:
+        with self._file_lock():
+            super().swap(slices)
+            self.save()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": "file", "path": self.path}
+
+
+class RedisBloomFilter(ScalableBloomFilter):
+    """
+    Variante compartida entre jobs y réplicas respaldada en Redis.
+    Las consultas usan una copia local de los bitmaps (refrescada periódicamente con GET);
+    las inserciones escriben los bits con SETBIT en un pipeline por lote.
+    """
+
+    def __init__(
+        self,
+        redis_url: str = FILTER_REDIS_URL,
+        prefix: str = FILTER_REDIS_PREFIX,
+        refresh_seconds: float = FILTER_REFRESH_SECONDS,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        import redis
+        self.client = redis.Redis.from_url(redis_url)
+        self.prefix = prefix
+        self.refresh_seconds = refresh_seconds
+        self._checked_at = 0.0
+        self._pending_bits = []
+        self.load()
+
+    def _slice_key(self, index: int) -> str:
+        return f"{self.prefix}:slice:{index}"
+
+    @property
+    def _counts_key(self) -> str:
+        return f"{self.prefix}:counts"
+
+    def load(self) -> None:
+        with self._lock:
+            counts = {int(k): int(v) for k, v in self.client.hgetall(self._counts_key).items()}
+            if not counts:
+                self.slices = []
+                return
+            pipe = self.client.pipeline(transaction=False)
+            for index in range(max(counts) + 1):
+                pipe.get(self._slice_key(index))
+            bitmaps = pipe.execute()
+
+            slices = []
+            for index, raw in enumerate(bitmaps):
+                cap, bits, hashes = _slice_params(index, self.capacity, self.error_rate)
+                data = bytearray(bits // 8)
+                if raw:
+                    # Redis numera los bits desde el más significativo de cada byte
+                    data[:len(raw)] = bytes(_REVERSED_BITS[b] for b in raw[:len(data)])
+                slices.append(BloomSlice(cap, bits, hashes, data, counts.get(index, 0)))
+            self.slices = slices
+
+    def maybe_refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        try:
+            self.load()
+        except Exception as e:
+            logger.warning(f"No se pudo refrescar el filtro de URLs desde Redis: {e}")
+
+    def _on_positions_set(self, slice_index: int, positions: List[int]) -> None:
+        self._pending_bits.append((slice_index, positions))
+
+    def add_many(self, urls: Iterable[str]) -> int:
+        with self._lock:
+            self._pending_bits = []
+            added = super().add_many(urls)
+            if not added:
+                return 0
+
+            # Un solo pipeline por lote: SETBIT de cada posición + contadores por capa
+            pipe = self.client.pipeline(transaction=False)
+            new_per_slice = {}
+            for index, positions in self._pending_bits:
+                key = self._slice_key(index)
+                for p in positions:
+                    pipe.setbit(key, p, 1)
+                new_per_slice[index] = new_per_slice.get(index, 0) + 1
+            for index, count in new_per_slice.items():
+                pipe.hincrby(self._counts_key, index, count)
+            pipe.execute()
+            self._pending_bits = []
+            return added
+
+    def swap(self, slices: List[BloomSlice]) -> None:
+        """
+        Subir las capas nuevas a claves temporales y publicarlas con RENAME en una
+        transacción: las réplicas ven el filtro anterior o el nuevo, nunca uno vacío.
+        """
+        with self._lock:
+            staging = f"{self.prefix}:rebuild"
+            pipe = self.client.pipeline(transaction=False)
+            for index, bloom_slice in enumerate(slices):
+                # Redis numera los bits desde el más significativo de cada byte
+                pipe.set(f"{staging}:slice:{index}", bytes(_REVERSED_BITS[b] for b in bloom_slice.bits))
+            pipe.delete(f"{staging}:counts")
+            if slices:
+                pipe.hset(f"{staging}:counts", mapping={index: s.count for index, s in enumerate(slices)})
+            pipe.execute()
+
+            stale = {
+                key.decode() if isinstance(key, bytes) else key
+                for key in self.client.scan_iter(f"{self.prefix}:slice:*")
+            } - {self._slice_key(index) for index in range(len(slices))}
+            pipe = self.client.pipeline(transaction=True)
+            if stale:
+                pipe.delete(*stale)
+            for index in range(len(slices)):
+                pipe.rename(f"{staging}:slice:{index}", self._slice_key(index))
+            if slices:
+                pipe.rename(f"{staging}:counts", self._counts_key)
+            else:
+                pipe.delete(self._counts_key)
+            pipe.execute()
+            super().swap(slices)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": "redis", "prefix": self.prefix}
+
+
+_REVERSED_BITS = bytes(int(f"{b:08b}"[::-1], 2) for b in range(256))
+
+
+# ===== INSTANCIA COMPARTIDA =====
+
+_filter: Optional[ScalableBloomFilter] = None
+_filter_initialized = False
+_filter_lock = threading.Lock()
+
+
+def get_seen_filter() -> Optional[ScalableBloomFilter]:
+    """Filtro de URLs vistas configurado por entorno (None si está desactivado o no disponible)"""
+    global _filter, _filter_initialized
+    with _filter_lock:
+        if not _filter_initialized:
+            _filter_initialized = True
+            try:
+                if FILTER_BACKEND == 'redis':
+                    _filter = RedisBloomFilter()
+                elif FILTER_BACKEND == 'file':
+                    _filter = FileBloomFilter()
+                if _filter is not None:
+                    logger.info(f"🌸 Filtro de URLs vistas: {_filter.stats()}")
+            except Exception as e:
+                logger.error(f"❌ No se pudo inicializar el filtro de URLs vistas ({FILTER_BACKEND}): {e}")
+                _filter = None
+        return _filter
+
+
+def remember_urls(urls: Iterable[str]) -> int:
+    """Registrar URLs ingeridas en el filtro compartido"""
+    seen_filter = get_seen_filter()
+    if seen_filter is None:
+        return 0
+    try:
+        return seen_filter.add_many(urls)
+    except Exception as e:
+        logger.warning(f"No se pudieron registrar URLs en el filtro: {e}")
+        return 0
+
+
+def rebuild(url_batches: Iterable[List[str]]) -> dict:
+    """Reconstruir el filtro desde cero con las URLs almacenadas (por lotes)"""
+    seen_filter = get_seen_filter()
+    if seen_filter is None:
+        return {"status": "disabled"}
+
+    started = time.perf_counter()
+    # Se construye aparte y se publica al final: mientras tanto las consultas siguen
+    # usando el filtro anterior en lugar de uno vacío
+    fresh = ScalableBloomFilter(capacity=seen_filter.capacity, error_rate=seen_filter.error_rate)
+    total = 0
+    for batch in url_batches:
+        total += fresh.add_many(batch)
+    seen_filter.swap(fresh.slices)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"🌸 Filtro de URLs reconstruido: {total} URLs en {elapsed:.1f}s")
+    return {"status": "rebuilt", "urls": total, "seconds": round(elapsed, 2), **seen_filter.stats()}
@@ -0,0 +1,134 @@
+import logging
+import os
+import random
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from database import get_global_yield, get_scanned_warcs, get_segment_yields, record_warc_yield
+
+logger = logging.getLogger(__name__)
+
+# 'bandit' (explorar/explotar por rendimiento de segmento) o 'random' (muestra uniforme)
+SCHEDULER_POLICY = os.getenv('WARC_SCHEDULER_POLICY', 'bandit').lower()
+# Peso del prior en MB: cuántos MB observados "vale" el rendimiento global en cada segmento
+PRIOR_MB = float(os.getenv('WARC_SCHEDULER_PRIOR_MB', '200'))
+# Rendimiento inicial (relevantes por MB) mientras no haya historial
+DEFAULT_PRIOR_RATE = float(os.getenv('WARC_SCHEDULER_PRIOR_RATE', '0.05'))
+
+_PATH_RE = re.compile(r'crawl-data/(?P<crawl>[^/]+)/segments/(?P<segment>[^/]+)/')
+
+MB = 1024 * 1024
+
+
+def parse_warc_path(path: str) -> Tuple[str, str]:
+    """(crawl_id, segmento) a partir de la ruta de un WARC/WET/WAT"""
+    match = _PATH_RE.search(path)
+    if not match:
+        return '', ''
+    return match.group('crawl'), match.group('segment')
+
+
+class SegmentScheduler:
+    """
+    Elige qué WARCs leer de un crawl aprendiendo qué segmentos producen más noticias relevantes.
+
+    Cada segmento es un brazo de un bandit con rendimiento desconocido (relevantes por MB).
+    Se usa Thompson sampling con posterior Gamma-Poisson: prior centrado en el rendimiento
+    global con peso PRIOR_MB, actualizado con los relevantes y MB leídos del segmento.
+    Los segmentos sin historial tienen posterior ancha y se exploran; los productivos se explotan.
+    Dentro del segmento elegido se toma un WARC aún no leído al azar.
+    """
+
+    def __init__(self, policy: str = SCHEDULER_POLICY, prior_mb: float = PRIOR_MB):
+        self.policy = policy
+        self.prior_mb = prior_mb
+
+    def select(self, crawl_id: str, candidates: List[str], limit: int) -> List[str]:
+        """Elegir hasta `limit` rutas entre las del índice del crawl"""
+        limit = min(limit, len(candidates))
+        if self.policy != 'bandit' or limit <= 0:
+            return random.sample(candidates, limit)
+
+        try:
+            segment_yields = get_segment_yields(crawl_id)
+            scanned = get_scanned_warcs(crawl_id)
+            prior_rate = self._prior_rate()
+        except Exception as e:
+            logger.warning(f"⚠️  Sin historial de rendimiento ({e}), usando muestra aleatoria")
+            return random.sample(candidates, limit)
+
+        return self.choose(candidates, limit, segment_yields, scanned, prior_rate)
+
+    def choose(
+        self,
+        candidates: List[str],
+        limit: int,
+        segment_yields: Dict[str, Dict],
+        scanned: set,
+        prior_rate: float
+    ) -> List[str]:
+        """Thompson sampling sobre segmentos con los WARCs pendientes de cada uno"""
+        pending: Dict[str, List[str]] = defaultdict(list)
+        for path in candidates:
+            if path not in scanned:
+                pending[parse_warc_path(path)[1]].append(path)
+        if not pending:
+            # Todo el crawl ya fue leído: se vuelve a muestrear sin restricción
+            return random.sample(candidates, limit)
+
+        # alpha > 0 aunque el historial global no tenga relevantes
+        alpha0 = max(prior_rate * self.prior_mb, 0.5)
+        selected = []
+        draws = {}
+        while len(selected) < limit and pending:
+            for segment in pending:
+                history = segment_yields.get(segment, {})
+                alpha = alpha0 + history.get('relevant_records', 0)
+                beta = self.prior_mb + history.get('bytes_scanned', 0) / MB
+                draws[segment] = random.gammavariate(alpha, 1.0 / beta)
+            best = max(pending, key=draws.__getitem__)
+            paths = pending[best]
+            selected.append(paths.pop(random.randrange(len(paths))))
+            if not paths:
+                del pending[best]
+
+        explored = sum(1 for p in selected if parse_warc_path(p)[1] not in segment_yields)
+        logger.info(
+            f"🎰 Scheduler: {len(selected)} archivos de {len({parse_warc_path(p)[1] for p in selected})} segmentos "
+            f"({explored} de segmentos sin historial, prior {prior_rate:.3f} relevantes/MB)"
+        )
+        return selected
+
+    def record(self, warc_path: str, stats: Dict[str, int], relevant_records: int) -> None:
+        """Registrar el rendimiento de una lectura de WARC"""
+        crawl_id, segment = parse_warc_path(warc_path)
+        if not crawl_id:
+            return
+        record_warc_yield(
+            warc_path,
+            crawl_id,
+            segment,
+            records_read=stats.get('records_read', 0),
+            relevant_records=relevant_records,
+            bytes_scanned=stats.get('bytes_scanned', 0),
+            bytes_downloaded=stats.get('bytes_downloaded', 0)
+        )
+
+    def _prior_rate(self) -> float:
+        totals = get_global_yield()
+        if totals['bytes_scanned'] < self.prior_mb * MB:
+            return DEFAULT_PRIOR_RATE
+        return totals['relevant_records'] / (totals['bytes_scanned'] / MB)
+
+
+# ===== INSTANCIA COMPARTIDA =====
+
+_scheduler: Optional[SegmentScheduler] = None
+
+
+def get_scheduler() -> SegmentScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = SegmentScheduler()
+    return _scheduler
@@ -0,0 +1,61 @@
+"""insert_articles_async: lotes por encima del límite de parámetros de PostgreSQL"""
+
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+import database
+from article_record import ArticleRecord
+
+
+class RecordingSession:
+    """Sesión async que compila cada sentencia para asyncpg y devuelve sus URLs como insertadas"""
+
+    def __init__(self):
+        self.param_counts = []
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        params = stmt.compile(dialect=postgresql.asyncpg.dialect()).params
+        self.param_counts.append(len(params))
+        urls = [value for key, value in params.items() if key.startswith('url_m')]
+        return [SimpleNamespace(id=i, url=url) for i, url in enumerate(urls)]
+
+    def add(self, obj):
+        pass
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        pass
+
+
+def test_insert_splits_statements_under_param_limit(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(database, 'AsyncSessionLocal', lambda: session)
+    articles = [ArticleRecord(url=f"https://example.co/{i}", title=f"t{i}") for i in range(6000)]
+
+    inserted = asyncio.run(database.insert_articles_async(articles))
+
+    assert len(session.param_counts) > 1
+    assert max(session.param_counts) <= 32767
+    assert sorted(row['url'] for row in inserted) == sorted(a.url for a in articles)
+    assert session.committed
+
+
+def test_insert_deduplicates_urls_in_batch(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(database, 'AsyncSessionLocal', lambda: session)
+    articles = [ArticleRecord(url="https://example.co/a"), ArticleRecord(url="https://example.co/a")]
+
+    inserted = asyncio.run(database.insert_articles_async(articles))
+
+    assert [row['url'] for row in inserted] == ["https://example.co/a"]
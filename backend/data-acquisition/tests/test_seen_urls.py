@@ -0,0 +1,76 @@
+"""Bloom filter de URLs vistas: dimensionamiento de capas, falsos positivos y backends"""
+
+import math
+
+import fakeredis
+import pytest
+import redis
+
+import seen_urls
+from seen_urls import FileBloomFilter, RedisBloomFilter, ScalableBloomFilter, _slice_params
+
+
+def _urls(prefix, n):
+    return [f"https://{prefix}.com.co/noticia/{i}" for i in range(n)]
+
+
+@pytest.mark.parametrize('capacity, error_rate', [(1000, 0.01), (1_000_000, 0.001)])
+def test_slice_sizing_keeps_total_error_rate_under_target(capacity, error_rate):
+    total = 0.0
+    for index in range(12):
+        cap, bits, hashes = _slice_params(index, capacity, error_rate)
+        assert cap == capacity * seen_urls.GROWTH ** index
+        assert bits % 8 == 0
+        # Tasa de falsos positivos de la capa llena, con sus bits y hashes reales
+        slice_error = (1 - math.exp(-hashes * cap / bits)) ** hashes
+        target = error_rate * (1 - seen_urls.TIGHTENING) * seen_urls.TIGHTENING ** index
+        assert slice_error <= target * 1.05
+        total += slice_error
+    assert total <= error_rate * 1.05
+
+
+def test_filter_grows_without_false_negatives_and_bounded_false_positives():
+    bloom = ScalableBloomFilter(capacity=2000, error_rate=0.01)
+    seen = _urls('vista', 7000)
+    # Las URLs nuevas que el filtro ya da por vistas son falsos positivos
+    assert bloom.add_many(seen) >= 7000 * (1 - 0.01)
+    # 2000 + 4000 + 8000
+    assert [s.capacity for s in bloom.slices] == [2000, 4000, 8000]
+    assert all(url in bloom for url in seen)
+    assert bloom.add_many(seen[:100]) == 0
+
+    unseen = _urls('nueva', 20000)
+    false_positives = sum(url in bloom for url in unseen)
+    assert false_positives / len(unseen) <= 0.01
+
+
+def test_file_filter_persists_and_rebuild_swaps(tmp_path):
+    path = str(tmp_path / 'seen.bloom')
+    bloom = FileBloomFilter(path=path, refresh_seconds=0, capacity=100, error_rate=0.01)
+    bloom.add_many(_urls('a', 150))
+
+    other = FileBloomFilter(path=path, refresh_seconds=0, capacity=100, error_rate=0.01)
+    assert all(url in other for url in _urls('a', 150))
+    assert other.stats()['items'] == 150
+
+    fresh = ScalableBloomFilter(capacity=100, error_rate=0.01)
+    fresh.add_many(_urls('b', 10))
+    other.swap(fresh.slices)
+    assert _urls('b', 1)[0] in bloom
+    assert bloom.stats()['items'] == 10
+
+
+def test_redis_filter_is_shared_between_replicas(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, 'from_url', classmethod(lambda cls, url: fakeredis.FakeRedis(server=server)))
+    first = RedisBloomFilter(refresh_seconds=0, capacity=100, error_rate=0.01, prefix='test')
+    second = RedisBloomFilter(refresh_seconds=0, capacity=100, error_rate=0.01, prefix='test')
+
+    assert first.add_many(_urls('a', 150)) == 150
+    assert all(url in second for url in _urls('a', 150))
+
+    fresh = ScalableBloomFilter(capacity=100, error_rate=0.01)
+    fresh.add_many(_urls('b', 10))
+    second.swap(fresh.slices)
+    assert _urls('b', 1)[0] in first
+    assert first.stats()['items'] == 10
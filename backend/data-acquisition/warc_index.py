@@ -0,0 +1,204 @@
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+from typing import List, Dict, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Directorio de índices sidecar ('' para desactivar)
+INDEX_DIR = os.getenv('WARC_INDEX_DIR', 'data/warc-index')
+# Directorio opcional para cachear WARCs descargados (desactivado por defecto)
+CACHE_DIR = os.getenv('WARC_CACHE_DIR', '')
+
+# (posición del registro, offset, length, rec_type, target_uri, domain, warc_date, relevant)
+IndexRow = Tuple[int, int, int, str, str, str, str, Optional[bool]]
+
+
+def _safe_name(warc_path: str) -> str:
+    """Nombre de archivo plano a partir de la ruta del WARC"""
+    return re.sub(r'[^A-Za-z0-9._-]', '_', warc_path.strip('/'))
+
+
+def index_enabled() -> bool:
+    return bool(INDEX_DIR)
+
+
+# ===== CACHE LOCAL DE WARCs =====
+
+def cached_warc_path(warc_path: str) -> Optional[str]:
+    """Ruta local del WARC cacheado (None si la cache está desactivada)"""
+    if not CACHE_DIR:
+        return None
+    return os.path.join(CACHE_DIR, _safe_name(warc_path))
+
+
+class WarcCacheWriter:
+    """
+    Escritura incremental de un WARC descargado por partes (streaming o rangos).
+    Las partes se agregan a un archivo .part temporal y el archivo solo se publica con commit()
+    si se recibió el objeto completo; una descarga cortada (error o max_records)
+    se descarta con abort() para no dejar WARCs truncados en la cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Nombre temporal único: dos descargas simultáneas del mismo WARC no se pisan
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> None:
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        logger.debug(f"💾 WARC cacheado: {self.path}")
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def open_cache_writer(warc_path: str) -> Optional[WarcCacheWriter]:
+    """Writer incremental para cachear un WARC (None si la cache está desactivada o ya lo tiene)"""
+    path = cached_warc_path(warc_path)
+    if not path or os.path.exists(path):
+        return None
+    return WarcCacheWriter(path)
+
+
+# ===== ÍNDICE DE REGISTROS =====
+
+class WarcRecordIndex:
+    """
+    Índice sidecar (SQLite) de los registros de un archivo WARC.
+    Guarda offset, longitud, tipo, URI, dominio, WARC-Date y el veredicto
+    de relevancia de cada registro para poder releer solo los candidatos
+    con lecturas por rango (cache local o HTTP Range).
+    """
+
+    def __init__(self, warc_path: str, index_dir: str = INDEX_DIR):
+        self.warc_path = warc_path
+        self.db_path = os.path.join(index_dir, f"{_safe_name(warc_path)}.idx.sqlite")
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                offset INTEGER PRIMARY KEY,
+                position INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                rec_type TEXT NOT NULL,
+                target_uri TEXT,
+                domain TEXT,
+                warc_date TEXT,
+                relevant INTEGER
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_records_domain ON records(domain)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return conn
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def records_indexed(self) -> int:
+        """Número de registros (desde el inicio del archivo) cubiertos por el índice"""
+        if not self.exists():
+            return 0
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'records_indexed'").fetchone()
+            return int(row[0]) if row else 0
+        finally:
+            conn.close()
+
+    def write(self, rows: Iterable[IndexRow], records_indexed: int) -> None:
+        """Guardar filas del índice (se ignora si ya cubre al menos la misma cantidad de registros)"""
+        if records_indexed <= self.records_indexed():
+            return
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO records "
+                    "(position, offset, length, rec_type, target_uri, domain, warc_date, relevant) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (p, o, l, t, u, d, w, None if r is None else int(r))
+                        for p, o, l, t, u, d, w, r in rows
+                    )
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('records_indexed', ?)",
+                    (str(records_indexed),)
+                )
+            logger.info(f"🗂️  Índice {self.warc_path}: {records_indexed} registros")
+        finally:
+            conn.close()
+
+    def candidates(
+        self,
+        relevant: Optional[bool] = True,
+        domains: Optional[List[str]] = None,
+        rec_type: str = 'response'
+    ) -> List[Dict]:
+        """
+        Registros candidatos para reprocesar
+
+        Args:
+            relevant: filtrar por veredicto previo (None = todos)
+            domains: sufijos de dominio a incluir (ej: ['.co', 'eltiempo.com'])
+            rec_type: tipo de registro WARC
+        """
+        if not self.exists():
+            return []
+
+        query = (
+            "SELECT position, offset, length, target_uri, domain, warc_date, relevant "
+            "FROM records WHERE rec_type = ?"
+        )
+        params: list = [rec_type]
+        if relevant is not None:
+            query += " AND relevant = ?"
+            params.append(int(relevant))
+        if domains:
+            query += " AND (" + " OR ".join("domain LIKE ?" for _ in domains) + ")"
+            params.extend(f"%{d}" for d in domains)
+        query += " ORDER BY offset"
+
+        conn = self._connect()
+        try:
+            return [
+                {
+                    "position": p, "offset": o, "length": l, "target_uri": u,
+                    "domain": d, "warc_date": w, "relevant": r
+                }
+                for p, o, l, u, d, w, r in conn.execute(query, params)
+            ]
+        finally:
+            conn.close()
+
+    def update_verdicts(self, verdicts: Dict[int, bool]) -> None:
+        """Actualizar el veredicto de relevancia tras un reprocesamiento"""
+        if not verdicts:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE records SET relevant = ? WHERE offset = ?",
+                    ((int(v), o) for o, v in verdicts.items())
+                )
+        finally:
+            conn.close()
@@ -0,0 +1,158 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Optional
+
+from article_record import ArticleRecord
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b\x08'
+PARSE_WORKERS = int(os.getenv('WARC_PARSE_WORKERS', str(os.cpu_count() or 1)))
+PARALLEL_MIN_BYTES = int(os.getenv('WARC_PARALLEL_MIN_BYTES', str(8 * 1024 * 1024)))
+MIN_RANGE_BYTES = 1024 * 1024
+# Tope por rango: acota lo que cada tarea copia a memoria en WARCs grandes
+MAX_RANGE_BYTES = int(os.getenv('WARC_MAX_RANGE_BYTES', str(32 * 1024 * 1024)))
+RANGES_PER_WORKER = 4
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Cliente "liviano" por proceso worker (sin sesión HTTP ni S3)
+_worker_client = None
+
+
+# ===== ESCANEO DE MIEMBROS GZIP =====
+
+def _is_warc_member_start(data: bytes, pos: int) -> bool:
+    """Verificar que en pos empieza un miembro gzip cuyo contenido es un registro WARC"""
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    try:
+        head = decompressor.decompress(data[pos:pos + 4096], 8)
+    except zlib.error:
+        return False
+    return head.startswith(b'WARC/')
+
+
+def scan_member_ranges(data: bytes, parts: int) -> List[Tuple[int, int]]:
+    """
+    Dividir un WARC multi-miembro en rangos [inicio, fin) alineados a miembros gzip.
+    Cada rango contiene registros completos y puede descomprimirse de forma independiente.
+    Los candidatos (magic gzip) se validan descomprimiendo unos bytes: un falso
+    positivo dentro de datos comprimidos no produce una cabecera 'WARC/'.
+    """
+    size = len(data)
+    if parts <= 1 or size == 0 or not _is_warc_member_start(data, 0):
+        return [(0, size)]
+
+    target = max(size // parts, MIN_RANGE_BYTES)
+    starts = [0]
+    pos = target
+    while pos < size:
+        pos = data.find(GZIP_MAGIC, pos)
+        if pos == -1:
+            break
+        if _is_warc_member_start(data, pos):
+            starts.append(pos)
+            pos += target
+        else:
+            pos += 1
+
+    return list(zip(starts, starts[1:] + [size]))
+
+
+# ===== POOL DE PROCESOS =====
+
+def _init_worker():
+    """Inicializar el proceso worker con un cliente reutilizable"""
+    global _worker_client
+    from commoncrawl_client import CommonCrawlClient
+    _worker_client = CommonCrawlClient(mode="http")
+
+
+def _parse_range(chunk: bytes, source: str, max_records: int, base_offset: int) -> Tuple[List[Tuple[int, ArticleRecord]], List[tuple], Dict[str, int]]:
+    """Descomprimir y parsear un rango de miembros (se ejecuta en el worker)"""
+    return _worker_client._extract_records(io.BytesIO(chunk), source, max_records, base_offset)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Pool de procesos compartido (se crea bajo demanda)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            logger.info(f"⚙️  Pool de parseo WARC iniciado con {PARSE_WORKERS} procesos")
+        return _pool
+
+
+def shutdown_pool():
+    """Cerrar el pool de procesos"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def should_parallelize(content: bytes) -> bool:
+    return PARSE_WORKERS > 1 and len(content) >= PARALLEL_MIN_BYTES
+
+
+async def extract_records_parallel(
+    content: bytes,
+    source: str,
+    max_records: int
+) -> Tuple[List[Tuple[int, ArticleRecord]], List[tuple], Dict[str, int]]:
+    """
+    Parsear un WARC en paralelo por rangos de miembros.
+    Devuelve los registros con su posición global (orden del archivo), las filas del índice y métricas.
+    Los rangos se consumen en orden; cuando se alcanza max_records se cancelan los pendientes.
+    `content` puede ser un mmap del WARC cacheado: solo se copian a memoria los rangos
+    en vuelo (como máximo PARSE_WORKERS * 2 a la vez).
+    """
+    parts = max(PARSE_WORKERS * RANGES_PER_WORKER, -(-len(content) // MAX_RANGE_BYTES))
+    ranges = scan_member_ranges(content, parts)
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+
+    pending_ranges = iter(ranges)
+    futures = deque()
+
+    def submit_next() -> None:
+        next_range = next(pending_ranges, None)
+        if next_range is not None:
+            start, end = next_range
+            futures.append(loop.run_in_executor(pool, _parse_range, content[start:end], source, max_records, start))
+
+    records: List[Tuple[int, ArticleRecord]] = []
+    index_rows: List[tuple] = []
+    stats: Dict[str, int] = {}
+    try:
+        for _ in range(PARSE_WORKERS * 2):
+            submit_next()
+        while futures:
+            range_records, range_rows, range_stats = await futures.popleft()
+            submit_next()
+            seen = len(index_rows)
+            records.extend((seen + i, record) for i, record in range_records)
+            index_rows.extend((seen + row[0],) + tuple(row[1:]) for row in range_rows)
+            for key, value in range_stats.items():
+                stats[key] = stats.get(key, 0) + value
+            if len(index_rows) >= max_records:
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+
+    logger.debug(f"{source}: {len(ranges)} rangos de miembros, {len(index_rows)} registros vistos")
+    return [(i, r) for i, r in records if i < max_records], index_rows[:max_records], stats
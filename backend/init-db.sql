@@ -11,6 +11,7 @@ CREATE TABLE IF NOT EXISTS commoncrawl.news_articles (
     title VARCHAR(500) NOT NULL,
     content TEXT NOT NULL,
     content_hash VARCHAR(64),  -- ¡COLUMNA AGREGADA!
+    content_uri VARCHAR(1000),  -- Puntero al contenido completo (zstd) en el almacén de contenido
     date DATE NOT NULL,
     language VARCHAR(10) DEFAULT 'es',
     source_domain VARCHAR(255) NOT NULL,
@@ -35,6 +36,19 @@ CREATE TABLE IF NOT EXISTS commoncrawl.process_logs (
     parameters JSONB
 );
 
+-- Rendimiento por WARC (registros relevantes por MB) para el scheduler de segmentos
+CREATE TABLE IF NOT EXISTS commoncrawl.warc_yields (
+    warc_path VARCHAR(500) PRIMARY KEY,
+    crawl_id VARCHAR(50) NOT NULL,
+    segment VARCHAR(100) NOT NULL,
+    runs INTEGER DEFAULT 0,
+    records_read INTEGER DEFAULT 0,
+    relevant_records INTEGER DEFAULT 0,
+    bytes_scanned BIGINT DEFAULT 0,
+    bytes_downloaded BIGINT DEFAULT 0,
+    last_run_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Tabla para estadísticas
 CREATE TABLE IF NOT EXISTS commoncrawl.stats (
     id SERIAL PRIMARY KEY,
@@ -84,6 +98,7 @@ CREATE INDEX IF NOT EXISTS idx_articles_date ON commoncrawl.news_articles(date);
 CREATE INDEX IF NOT EXISTS idx_articles_domain ON commoncrawl.news_articles(source_domain);
 CREATE INDEX IF NOT EXISTS idx_articles_language ON commoncrawl.news_articles(language);
 CREATE INDEX IF NOT EXISTS idx_articles_processed ON commoncrawl.news_articles(processed);
+CREATE INDEX IF NOT EXISTS idx_warc_yields_crawl_segment ON commoncrawl.warc_yields(crawl_id, segment);
 
 -- Verificar creación
 SELECT '✅ Base de datos Common Crawl inicializada correctamente' as message;
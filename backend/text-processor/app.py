@@ -11,6 +11,7 @@ Características:
 - Extracción de keywords económicas
 - Análisis de sentimiento básico
 - Integración con Redis para distribución de tareas
+- Léxicos versionados con recarga en caliente (endpoint o Redis pub/sub)
 - Health checks y métricas
 
 Autor: Equipo News2Market
@@ -28,13 +29,17 @@ from contextlib import asynccontextmanager
 import asyncio
 import uuid
 import socket
+import time
 
 # Importar módulos del servicio
-from processor import TextProcessor
+import content_client
+import lexicon as lexicon_store
+import processor_pool
+from article_record import ArticleRecord
 from database import (
-    SessionLocal,
-    ProcessedArticle,
     save_processed_article,
+    save_processed_articles,
+    get_source_articles,
     get_unprocessed_articles,
     get_processing_stats,
     init_db,
@@ -49,14 +54,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Instancia global del procesador de texto
-text_processor = TextProcessor()
+# El procesamiento de texto corre en el pool de procesos (un TextProcessor por proceso)
 redis_queue = None
+# Tarea del worker loop (se detiene antes de cerrar Redis)
+worker_task: Optional[asyncio.Task] = None
 
 # ID único del worker
 WORKER_ID = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
 WORKER_HEARTBEAT_KEY = "workers:active"
 WORKER_TTL = 30  # Segundos
+# Tareas arrendadas por iteración del worker (1 = una tarea a la vez; por defecto, las
+# que ocupan todos los procesos del pool)
+WORKER_BATCH_SIZE = int(os.getenv('BATCH_SIZE', str(processor_pool.default_batch_size())))
+MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
+# Lotes cargados por adelantado mientras se procesa el actual
+PREFETCH_BATCHES = int(os.getenv('PREFETCH_BATCHES', '1'))
+# Última versión de léxico activada con /lexicon/reload (la adoptan los pods que arrancan después)
+LEXICON_ACTIVE_KEY = f"{lexicon_store.LEXICON_CHANNEL}:active"
 
 # Estado del worker
 worker_state = {
@@ -65,13 +79,21 @@ worker_state = {
     "articles_processed": 0,
     "last_processed_at": None,
     "errors": 0,
-    "started_at": None
+    "started_at": None,
+    "batches_processed": 0,
+    "processing_seconds": 0.0,
+    "last_batch_articles_per_second": 0.0
 }
 
+def articles_per_second() -> float:
+    """Throughput acumulado del worker (artículos / segundo de procesamiento de lotes)"""
+    seconds = worker_state["processing_seconds"]
+    return round(worker_state["articles_processed"] / seconds, 2) if seconds else 0.0
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle manager para inicialización y limpieza"""
-    global redis_queue
+    global redis_queue, worker_task
     
     # Startup
     logger.info("🚀 Iniciando Text Processor Service...")
@@ -81,17 +103,28 @@ async def lifespan(app: FastAPI):
         init_db()
         logger.info("✅ Base de datos inicializada")
         
+        # Arrancar el pool de procesamiento (un TextProcessor caliente por proceso)
+        try:
+            await asyncio.to_thread(processor_pool.warm_up)
+            logger.info(f"✅ Pool de procesamiento listo ({processor_pool.POOL_WORKERS} procesos)")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo precalentar el pool de procesamiento: {e}")
+        
         # Inicializar Redis
         redis_host = os.getenv('REDIS_HOST', 'localhost')
         redis_port = os.getenv('REDIS_PORT', '6379')
         redis_url = os.getenv('REDIS_URL', f'redis://{redis_host}:{redis_port}/0')
-        redis_queue = RedisQueue(redis_url)
+        redis_queue = RedisQueue(redis_url, consumer=WORKER_ID)
         await redis_queue.connect()
         logger.info("✅ Conexión a Redis establecida")
         
+        # Adoptar la versión de léxico anunciada por otros pods y escuchar recargas
+        await adopt_announced_lexicon()
+        asyncio.create_task(lexicon_listener())
+        
         # Iniciar worker en background
         if os.getenv('AUTO_START_WORKER', 'true').lower() == 'true':
-            asyncio.create_task(worker_loop())
+            worker_task = asyncio.create_task(worker_loop())
             asyncio.create_task(heartbeat_loop())
             logger.info("✅ Worker iniciado automáticamente")
         
@@ -102,8 +135,14 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("👋 Apagando Text Processor Service...")
+    # Detener worker y prefetch (devuelven lo no procesado a la cola) antes de cerrar Redis
+    worker_state["is_running"] = False
+    if worker_task:
+        await asyncio.gather(worker_task, return_exceptions=True)
     if redis_queue:
         await redis_queue.disconnect()
+    processor_pool.shutdown_pool()
+    content_client.close()
 
 # Inicializar FastAPI
 app = FastAPI(
@@ -143,6 +182,8 @@ class ArticleOutput(BaseModel):
     economic_keywords: Dict[str, int]
     sentiment_score: float
     entities: List[str]
+    entity_counts: Dict[str, int] = Field(default_factory=dict, description="Menciones por id canónico de entidad")
+    lexicon_version: Optional[str] = Field(None, description="Versión del léxico usada")
     processing_time_ms: float
 
 class BatchProcessRequest(BaseModel):
@@ -157,6 +198,15 @@ class WorkerStatus(BaseModel):
     last_processed_at: Optional[str]
     errors: int
     uptime_seconds: float
+    batch_size: int = 1
+    batches_processed: int = 0
+    articles_per_second: float = 0.0
+    cache_hit_ratio: float = 0.0
+    lexicon_version: Optional[str] = None
+
+class LexiconReloadRequest(BaseModel):
+    """Solicitud de recarga del léxico"""
+    version: Optional[str] = Field(None, description="Versión a activar (vacío = lexicons/CURRENT)")
 
 # ==================== ENDPOINTS ====================
 
@@ -178,7 +228,9 @@ async def root():
             {"method": "GET", "path": "/worker/status", "description": "Estado del worker"},
             {"method": "POST", "path": "/worker/start", "description": "Iniciar worker"},
             {"method": "POST", "path": "/worker/stop", "description": "Detener worker"},
-            {"method": "GET", "path": "/stats", "description": "Estadísticas de procesamiento"}
+            {"method": "GET", "path": "/stats", "description": "Estadísticas de procesamiento"},
+            {"method": "GET", "path": "/lexicon", "description": "Versión de léxico activa y disponibles"},
+            {"method": "POST", "path": "/lexicon/reload", "description": "Recargar el léxico en todos los pods"}
         ]
     }
 
@@ -233,8 +285,8 @@ async def process_article(article: ArticleInput):
         logger.info(f"📝 Procesando artículo {article.article_id}")
         start_time = datetime.now()
         
-        # Procesar el artículo
-        result = text_processor.process_article(
+        # Procesar el artículo en el pool de procesos
+        result = await processor_pool.process_article(
             title=article.title,
             content=article.content,
             url=article.url
@@ -244,13 +296,16 @@ async def process_article(article: ArticleInput):
         processing_time = (datetime.now() - start_time).total_seconds() * 1000
         
         # Guardar en base de datos
-        save_processed_article(
+        await asyncio.to_thread(
+            save_processed_article,
             article_id=article.article_id,
             cleaned_content=result['cleaned_content'],
             word_count=result['word_count'],
             economic_keywords=result['economic_keywords'],
             sentiment_score=result['sentiment_score'],
-            entities=result['entities']
+            entities=result['entities'],
+            processing_time_ms=processing_time,
+            lexicon_version=result.get('lexicon_version')
         )
         
         # Actualizar métricas
@@ -266,6 +321,8 @@ async def process_article(article: ArticleInput):
             economic_keywords=result['economic_keywords'],
             sentiment_score=result['sentiment_score'],
             entities=result['entities'],
+            entity_counts=result['entity_counts'],
+            lexicon_version=result.get('lexicon_version'),
             processing_time_ms=processing_time
         )
         
@@ -292,17 +349,15 @@ async def process_batch(request: BatchProcessRequest, background_tasks: Backgrou
         
         job_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
-        # Encolar cada artículo
-        enqueued = 0
-        for article_id in request.article_ids:
-            task = {
-                "job_id": job_id,
-                "article_id": article_id,
-                "priority": request.priority,
-                "created_at": datetime.now().isoformat()
-            }
-            await redis_queue.enqueue_task(task)
-            enqueued += 1
+        # Encolar el lote completo en un solo round trip
+        created_at = datetime.now().isoformat()
+        enqueued = await redis_queue.enqueue_tasks(
+            [
+                {"job_id": job_id, "article_id": article_id, "created_at": created_at}
+                for article_id in request.article_ids
+            ],
+            priority=request.priority or 0
+        )
         
         logger.info(f"📦 Lote {job_id}: {enqueued} artículos encolados")
         
@@ -325,16 +380,22 @@ async def get_worker_status():
         articles_processed=worker_state["articles_processed"],
         last_processed_at=worker_state["last_processed_at"],
         errors=worker_state["errors"],
-        uptime_seconds=0.0  # TODO: Implementar tracking de uptime
+        uptime_seconds=0.0,  # TODO: Implementar tracking de uptime
+        batch_size=WORKER_BATCH_SIZE,
+        batches_processed=worker_state["batches_processed"],
+        articles_per_second=articles_per_second(),
+        cache_hit_ratio=processor_pool.cache_stats()["hit_ratio"],
+        lexicon_version=processor_pool.lexicon_version()
     )
 
 @app.post("/worker/start")
 async def start_worker():
     """Iniciar el worker manualmente"""
+    global worker_task
     if worker_state["is_running"]:
         return {"message": "Worker ya está en ejecución", "status": "running"}
     
-    asyncio.create_task(worker_loop())
+    worker_task = asyncio.create_task(worker_loop())
     return {"message": "Worker iniciado", "status": "started"}
 
 @app.post("/worker/stop")
@@ -353,7 +414,12 @@ async def get_stats():
             "worker_stats": {
                 "articles_processed_session": worker_state["articles_processed"],
                 "errors_session": worker_state["errors"],
-                "last_processed_at": worker_state["last_processed_at"]
+                "last_processed_at": worker_state["last_processed_at"],
+                "batch_size": WORKER_BATCH_SIZE,
+                "articles_per_second": articles_per_second(),
+                "last_batch_articles_per_second": worker_state["last_batch_articles_per_second"],
+                "result_cache": processor_pool.cache_stats(),
+                "lexicon_version": processor_pool.lexicon_version()
             },
             "timestamp": datetime.now().isoformat()
         }
@@ -391,6 +457,91 @@ async def get_active_workers():
         logger.error(f"Error obteniendo workers activos: {e}")
         return {"active_workers": 0, "workers": []}
 
+@app.get("/lexicon")
+async def get_lexicon():
+    """Versión de léxico activa y versiones disponibles en LEXICON_DIR"""
+    return {
+        "lexicon_version": processor_pool.lexicon_version(),
+        "available_versions": lexicon_store.available_versions(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/lexicon/reload")
+async def reload_lexicon(request: Optional[LexiconReloadRequest] = None):
+    """
+    Activar una versión del léxico sin reiniciar workers y anunciarla a los demás pods
+    por LEXICON_CHANNEL. Los procesos del pool la cargan con su siguiente tarea.
+    """
+    requested = request.version if request else None
+    try:
+        version = await asyncio.to_thread(processor_pool.reload_lexicon, requested)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Léxico no encontrado: {requested or 'CURRENT'}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Error recargando léxico: {e}")
+        raise HTTPException(status_code=500, detail=f"Error recargando léxico: {str(e)}")
+    
+    pods_notified = 0
+    if redis_queue and redis_queue.client:
+        try:
+            await redis_queue.client.set(LEXICON_ACTIVE_KEY, version)
+            pods_notified = await redis_queue.client.publish(lexicon_store.LEXICON_CHANNEL, version)
+        except Exception as e:
+            logger.warning(f"⚠️ Léxico {version} activo solo en este pod: {e}")
+    
+    return {
+        "status": "reloaded",
+        "lexicon_version": version,
+        "pods_notified": pods_notified,
+        "timestamp": datetime.now().isoformat()
+    }
+
+# ==================== LÉXICO ====================
+
+async def apply_lexicon(version: str):
+    """Activar una versión anunciada por otro pod (si es distinta de la actual)"""
+    if version == processor_pool.lexicon_version():
+        return
+    try:
+        await asyncio.to_thread(processor_pool.reload_lexicon, version)
+    except Exception as e:
+        logger.error(f"❌ No se pudo activar el léxico {version} anunciado: {e}")
+
+async def adopt_announced_lexicon():
+    """Al arrancar, usar la última versión anunciada en Redis en lugar de lexicons/CURRENT"""
+    try:
+        version = await redis_queue.client.get(LEXICON_ACTIVE_KEY)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo leer la versión de léxico anunciada: {e}")
+        return
+    if version:
+        await apply_lexicon(version)
+
+async def lexicon_listener():
+    """Escuchar en LEXICON_CHANNEL las recargas de léxico hechas en cualquier pod"""
+    while True:
+        pubsub = None
+        try:
+            pubsub = redis_queue.client.pubsub()
+            await pubsub.subscribe(lexicon_store.LEXICON_CHANNEL)
+            logger.info(f"📚 Escuchando recargas de léxico en {lexicon_store.LEXICON_CHANNEL}")
+            async for message in pubsub.listen():
+                if message.get('type') == 'message':
+                    await apply_lexicon(message['data'])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error en el canal de léxicos: {e}")
+            await asyncio.sleep(5)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
 # ==================== WORKER LOOP ====================
 
 async def heartbeat_loop():
@@ -410,7 +561,9 @@ async def heartbeat_loop():
                     "last_heartbeat": datetime.now().isoformat(),
                     "started_at": worker_state.get("started_at") or datetime.now().isoformat(),
                     "is_running": worker_state["is_running"],
-                    "errors": worker_state["errors"]
+                    "errors": worker_state["errors"],
+                    "articles_per_second": articles_per_second(),
+                    "lexicon_version": processor_pool.lexicon_version()
                 }
                 
                 # Registrar en Redis con TTL
@@ -430,85 +583,120 @@ async def heartbeat_loop():
         # Enviar heartbeat cada 10 segundos
         await asyncio.sleep(10)
 
+async def process_task_batch(tasks: List[Dict[str, Any]], articles: Optional[List[ArticleRecord]] = None):
+    """
+    Procesar un lote de tareas con sus artículos ya cargados (prefetch) y escribir
+    resultados y flag processed en una sola transacción. Si el prefetch no pudo
+    cargar los artículos se cargan aquí con una sola consulta.
+    """
+    started = time.perf_counter()
+    article_ids = task_article_ids(tasks)
+    # Tareas aún arrendadas (las de artículos inexistentes se confirman como fallidas)
+    leased = tasks
+    
+    try:
+        if articles is None:
+            articles = await asyncio.to_thread(get_source_articles, article_ids)
+        
+        found = {article.article_id for article in articles}
+        for task in tasks:
+            if task.get('article_id') not in found:
+                await redis_queue.mark_failed(task, "Artículo no encontrado en news_articles")
+        leased = [task for task in tasks if task.get('article_id') in found]
+        
+        # processing_time_ms lo mide TextProcessor por artículo
+        results = await processor_pool.batch_process(articles)
+        
+        await asyncio.to_thread(save_processed_articles, results)
+        await redis_queue.mark_completed_batch(
+            leased,
+            [{"article_id": r['article_id'], "word_count": r['word_count']} for r in results]
+        )
+        
+        elapsed = time.perf_counter() - started
+        worker_state["articles_processed"] += len(results)
+        worker_state["batches_processed"] += 1
+        worker_state["processing_seconds"] += elapsed
+        worker_state["last_batch_articles_per_second"] = round(len(results) / elapsed, 2) if elapsed else 0.0
+        worker_state["last_processed_at"] = datetime.now().isoformat()
+        
+        logger.info(f"✅ Lote de {len(results)} artículos procesado en {elapsed * 1000:.0f}ms")
+        
+    except Exception as e:
+        logger.error(f"❌ Error procesando lote de {len(tasks)} tareas: {e}")
+        worker_state["errors"] += 1
+        # Reencolar las tareas arrendadas que no superaron el máximo de reintentos
+        retry = []
+        for task in leased:
+            task['retry_count'] = task.get('retry_count', 0) + 1
+            if task['retry_count'] < MAX_RETRIES:
+                retry.append(task)
+            else:
+                await redis_queue.mark_failed(task, str(e))
+        if retry:
+            await redis_queue.requeue_tasks(retry)
+
+def task_article_ids(tasks: List[Dict[str, Any]]) -> List[int]:
+    return list(dict.fromkeys(t['article_id'] for t in tasks if t.get('article_id') is not None))
+
+async def prefetch_batches(buffer: asyncio.Queue):
+    """
+    Arrendar el siguiente lote y cargar sus artículos mientras el worker procesa el actual.
+    El buffer acotado (PREFETCH_BATCHES) frena el arriendo si el procesamiento va más lento.
+    """
+    while worker_state["is_running"]:
+        tasks = await redis_queue.dequeue_batch(WORKER_BATCH_SIZE, timeout=5)
+        if not tasks:
+            # No hay tareas, esperar un poco
+            await asyncio.sleep(1)
+            continue
+        
+        try:
+            articles = await asyncio.to_thread(get_source_articles, task_article_ids(tasks))
+        except Exception as e:
+            logger.warning(f"⚠️ Prefetch de artículos falló, se reintentará al procesar: {e}")
+            articles = None
+        await buffer.put((tasks, articles))
+
 async def worker_loop():
     """
-    Loop principal del worker que consume tareas de la cola Redis
-    y procesa artículos de forma continua
+    Loop principal del worker: consume lotes de hasta BATCH_SIZE tareas ya cargados
+    por prefetch_batches y los procesa de forma continua
     """
     worker_state["is_running"] = True
     worker_state["started_at"] = datetime.now().isoformat()
-    logger.info(f"🔄 Worker loop iniciado: {WORKER_ID}")
+    logger.info(f"🔄 Worker loop iniciado: {WORKER_ID} (lotes de {WORKER_BATCH_SIZE}, prefetch {PREFETCH_BATCHES})")
     
-    consecutive_errors = 0
-    max_consecutive_errors = 5
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=max(PREFETCH_BATCHES, 1))
+    prefetcher = asyncio.create_task(prefetch_batches(buffer))
     
-    while worker_state["is_running"]:
-        try:
-            # Intentar obtener tarea de la cola
-            task = await redis_queue.dequeue_task(timeout=5)
-            
-            if task:
-                consecutive_errors = 0  # Resetear contador de errores
-                
-                article_id = task.get('article_id')
-                logger.info(f"🔍 Worker procesando artículo {article_id}")
-                
-                try:
-                    # Obtener artículo de la base de datos
-                    db = SessionLocal()
-                    article = db.query(ProcessedArticle).filter(
-                        ProcessedArticle.article_id == article_id
-                    ).first()
-                    
-                    if article and not article.processed_at:
-                        # Procesar artículo
-                        # (Aquí se debería obtener el contenido original de raw_articles)
-                        # Por ahora simulamos procesamiento
-                        result = text_processor.process_article(
-                            title="Sample",
-                            content="Sample content",
-                            url="http://example.com"
-                        )
-                        
-                        # Guardar resultado
-                        save_processed_article(
-                            article_id=article_id,
-                            cleaned_content=result['cleaned_content'],
-                            word_count=result['word_count'],
-                            economic_keywords=result['economic_keywords'],
-                            sentiment_score=result['sentiment_score'],
-                            entities=result['entities']
-                        )
-                        
-                        worker_state["articles_processed"] += 1
-                        worker_state["last_processed_at"] = datetime.now().isoformat()
-                        
-                        logger.info(f"✅ Artículo {article_id} procesado correctamente")
-                    
-                    db.close()
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error procesando tarea: {e}")
+    try:
+        while worker_state["is_running"]:
+            if prefetcher.done():
+                # El prefetch terminó con un error: reiniciarlo tras una pausa
+                if not prefetcher.cancelled() and prefetcher.exception():
+                    logger.error(f"❌ Error en prefetch: {prefetcher.exception()}")
                     worker_state["errors"] += 1
-                    # Reencolar la tarea con prioridad menor
-                    task['retry_count'] = task.get('retry_count', 0) + 1
-                    if task['retry_count'] < 3:
-                        await redis_queue.enqueue_task(task)
-            else:
-                # No hay tareas, esperar un poco
-                await asyncio.sleep(1)
-                
-        except Exception as e:
-            consecutive_errors += 1
-            logger.error(f"❌ Error en worker loop: {e}")
-            worker_state["errors"] += 1
+                    await asyncio.sleep(2)
+                prefetcher = asyncio.create_task(prefetch_batches(buffer))
             
-            if consecutive_errors >= max_consecutive_errors:
-                logger.error(f"⚠️ Demasiados errores consecutivos ({consecutive_errors}). Pausando worker...")
-                await asyncio.sleep(10)
-                consecutive_errors = 0
-            else:
-                await asyncio.sleep(2)
+            try:
+                tasks, articles = await asyncio.wait_for(buffer.get(), timeout=5)
+            except asyncio.TimeoutError:
+                continue
+            
+            logger.info(f"🔍 Worker procesando lote de {len(tasks)} artículos")
+            await process_task_batch(tasks, articles)
+    finally:
+        prefetcher.cancel()
+        await asyncio.gather(prefetcher, return_exceptions=True)
+        # Devolver a la cola los lotes arrendados que no se llegaron a procesar
+        pending = []
+        while not buffer.empty():
+            pending.extend(buffer.get_nowait()[0])
+        if pending:
+            await redis_queue.requeue_tasks(pending)
+            logger.info(f"↩️ {len(pending)} tareas prefetch devueltas a la cola")
     
     logger.info("🛑 Worker loop detenido")
 
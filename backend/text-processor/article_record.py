@@ -0,0 +1,138 @@
+"""
+Registro compacto de artículo - News2Market
+
+Representación con __slots__ de un artículo en los loops de ingesta (data-acquisition)
+y de procesamiento (text-processor). Sin __dict__ por instancia, cada registro ocupa
+una fracción de lo que ocupa un dict con las mismas claves, lo que importa cuando un
+job mantiene decenas de miles de artículos en memoria.
+
+Este archivo es idéntico en data-acquisition y text-processor: mantener ambas copias iguales.
+
+Formatos:
+- to_db_values(): columnas de commoncrawl.news_articles
+- to_row() / from_row(): lista posicional para colas y mensajes (JSON sin nombres de clave)
+- to_dict() / coerce(): dict para la API y compatibilidad con código que aún usa dicts
+"""
+
+import json
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+
+DEFAULT_DATE = '2024-01-01'
+
+
+@dataclass(slots=True)
+class ArticleRecord:
+    """Artículo extraído de Common Crawl (o leído de news_articles)"""
+
+    url: str
+    title: str = ''
+    content: str = ''
+    date: str = ''  # WARC-Date ('2024-02-15T21:57:48Z') o fecha ISO
+    language: str = 'es'
+    source_domain: str = ''
+    warc_file: str = ''
+    record_id: str = ''
+    keywords: List[str] = field(default_factory=list)
+    content_hash: Optional[str] = None
+    content_uri: Optional[str] = None
+    article_id: Optional[int] = None  # ID en news_articles una vez insertado
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ArticleRecord':
+        return cls(**{name: data[name] for name in _FIELD_NAMES if data.get(name) is not None})
+
+    @classmethod
+    def coerce(cls, article: Union['ArticleRecord', Dict[str, Any]]) -> 'ArticleRecord':
+        """Aceptar un registro o un dict (datos mock, payloads de la API)"""
+        return article if isinstance(article, cls) else cls.from_dict(article)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in _FIELD_NAMES}
+
+    def to_row(self) -> list:
+        """Valores en el orden de los campos (formato compacto para colas)"""
+        return [getattr(self, name) for name in _FIELD_NAMES]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'ArticleRecord':
+        return cls(*row)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_row(), ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, payload: Union[str, bytes]) -> 'ArticleRecord':
+        return cls.from_row(json.loads(payload))
+
+    def parsed_date(self) -> date:
+        if isinstance(self.date, date):
+            return self.date
+        return datetime.strptime((self.date or DEFAULT_DATE)[:10], '%Y-%m-%d').date()
+
+    def to_db_values(self) -> Dict[str, Any]:
+        """Columnas de commoncrawl.news_articles"""
+        return {
+            'url': self.url,
+            'title': self.title[:500],
+            'content': self.content,
+            'content_hash': self.content_hash,
+            'content_uri': self.content_uri,
+            # WARC-Date viene como '2024-02-15T21:57:48Z': solo se guarda la fecha
+            'date': self.parsed_date(),
+            'language': self.language,
+            'source_domain': self.source_domain,
+            'warc_file': self.warc_file,
+            'record_id': self.record_id,
+            'keywords': self.keywords
+        }
+
+
+_FIELD_NAMES = tuple(f.name for f in fields(ArticleRecord))
+
+
+# ==================== BENCHMARK ====================
+
+if __name__ == "__main__":
+    # Memoria por artículo: dict vs ArticleRecord (python article_record.py [n])
+    import gc
+    import sys
+    import tracemalloc
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    def sample_values(i: int) -> Dict[str, Any]:
+        # Los strings se comparten entre variantes: se mide el contenedor, no el texto
+        return {
+            'url': urls[i],
+            'title': 'Dólar cierra al alza frente al peso colombiano',
+            'content': 'El índice COLCAP ...',
+            'date': '2024-02-15T21:57:48Z',
+            'language': 'es',
+            'source_domain': 'eltiempo.com',
+            'warc_file': 'crawl-data/CC-MAIN-2024-10/segments/1707947425256.96/warc/x.warc.gz',
+            'record_id': record_ids[i],
+            'keywords': keywords[i]
+        }
+
+    urls = [f"https://eltiempo.com/economia/{i}" for i in range(n)]
+    record_ids = [f"x.warc.gz:{i}" for i in range(n)]
+    keywords = [['dólar', 'peso'] for _ in range(n)]
+
+    def measure(build) -> float:
+        gc.collect()
+        tracemalloc.start()
+        items = [build(i) for i in range(n)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del items
+        return current / n
+
+    per_dict = measure(lambda i: {**sample_values(i), 'content_hash': None, 'content_uri': None})
+    per_record = measure(lambda i: ArticleRecord(**sample_values(i)))
+
+    print(f"{n} artículos")
+    print(f"dict:          {per_dict:7.1f} bytes/artículo ({per_dict * n / 1024 ** 2:.1f} MB)")
+    print(f"ArticleRecord: {per_record:7.1f} bytes/artículo ({per_record * n / 1024 ** 2:.1f} MB)")
+    print(f"ahorro:        {1 - per_record / per_dict:.0%}")
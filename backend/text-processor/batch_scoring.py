@@ -0,0 +1,162 @@
+"""
+Batch Scoring - News2Market
+
+Puntuación vectorizada de un lote de artículos ya tokenizados. Cada token se mapea a un
+id de un vocabulario fijo (keywords económicas + palabras de sentimiento) y el lote se
+convierte en una matriz dispersa documento-término; los conteos positivos/negativos salen
+de productos matriz-vector y las keywords de las celdas de la matriz.
+
+El resultado es idéntico al de TextProcessor.extract_economic_keywords/calculate_sentiment:
+- keywords de una palabra en orden de primera aparición (el mismo que el trie)
+- en los documentos donde una frase puede coincidir (su primer y segundo token aparecen)
+  el trie resuelve la coincidencia más larga a partir de los conteos de la matriz
+
+Autor: Equipo News2Market
+Versión: 1.0.0
+"""
+
+from itertools import chain
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from phrase_matcher import PhraseMatcher
+
+
+class BatchScorer:
+    """Vocabulario fijo y vectores de pesos para puntuar lotes con matrices dispersas"""
+
+    def __init__(self, matcher: PhraseMatcher, positive_words: Iterable[str], negative_words: Iterable[str]):
+        self.matcher = matcher
+        unigrams = matcher.unigrams
+        pairs = matcher.phrase_pairs()
+        positive_words, negative_words = set(positive_words), set(negative_words)
+
+        terms = sorted(set(unigrams) | {token for pair in pairs for token in pair} | positive_words | negative_words)
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self._terms = np.array(terms, dtype=object)
+
+        self._positive = np.array([term in positive_words for term in terms], dtype=np.int64)
+        self._negative = np.array([term in negative_words for term in terms], dtype=np.int64)
+        self._is_keyword = np.array([term in unigrams for term in terms], dtype=bool)
+        self._keyword_names = np.array([unigrams.get(term) for term in terms], dtype=object)
+        # Tokens que el trie necesita contados para resolver frases
+        phrase_tokens = {token for pair in pairs for token in pair}
+        self._is_counted = np.array([term in unigrams or term in phrase_tokens for term in terms], dtype=bool)
+        self._pairs = np.array(
+            [(self.vocabulary[start], self.vocabulary[second]) for start, second in pairs], dtype=np.int64
+        ).reshape(-1, 2)
+
+    def document_term_matrix(self, token_lists: List[List[str]]):
+        """
+        Matriz documento-término del lote
+
+        Returns:
+            (matriz CSR n x V, documento, término, primera aparición y conteo de cada celda no nula)
+        """
+        n = len(token_lists)
+        size = len(self.vocabulary)
+
+        # Solo los tokens del vocabulario, en orden (filter corre en C: un lookup por token)
+        in_vocabulary = self.vocabulary.__contains__
+        kept = [list(filter(in_vocabulary, tokens)) for tokens in token_lists]
+        lengths = np.fromiter(map(len, kept), dtype=np.int64, count=n)
+        flat = list(chain.from_iterable(kept))
+        term = np.fromiter(map(self.vocabulary.__getitem__, flat), dtype=np.int64, count=len(flat))
+        doc = np.repeat(np.arange(n, dtype=np.int64), lengths)
+
+        # Una celda por (documento, término): conteo y posición de la primera aparición
+        cells, first, counts = np.unique(doc * size + term, return_index=True, return_counts=True)
+        cell_doc, cell_term = np.divmod(cells, size)
+        matrix = csr_matrix((counts, (cell_doc, cell_term)), shape=(n, size))
+        return matrix, cell_doc, cell_term, first, counts
+
+    def score(self, token_lists: List[List[str]]) -> List[Tuple[Dict[str, int], int, int]]:
+        """
+        Puntuar un lote de documentos tokenizados
+
+        Returns:
+            List[Tuple[Dict[str, int], int, int]]: (conteo de keywords, palabras positivas,
+            palabras negativas) por documento
+        """
+        n = len(token_lists)
+        matrix, cell_doc, cell_term, first, counts = self.document_term_matrix(token_lists)
+
+        positive = matrix @ self._positive
+        negative = matrix @ self._negative
+
+        # Documentos donde alguna frase puede coincidir: primer y segundo token presentes
+        has_phrase = np.zeros(n, dtype=bool)
+        if len(self._pairs):
+            present = (matrix[:, self._pairs[:, 0]] > 0).multiply(matrix[:, self._pairs[:, 1]] > 0)
+            has_phrase = np.asarray(present.sum(axis=1)).ravel() > 0
+
+        # Celdas útiles de cada documento, en orden de primera aparición: keywords de una palabra
+        # si no hay frases posibles; si las hay, los tokens que el trie necesita para resolverlas
+        phrase_cell = has_phrase[cell_doc]
+        keep = np.where(phrase_cell, self._is_counted[cell_term], self._is_keyword[cell_term])
+        cell_doc, cell_term, first, counts, phrase_cell = (
+            cell_doc[keep], cell_term[keep], first[keep], counts[keep], phrase_cell[keep]
+        )
+        order = np.lexsort((first, cell_doc))
+        cell_doc, cell_term, counts, phrase_cell = cell_doc[order], cell_term[order], counts[order], phrase_cell[order]
+        keys = np.where(phrase_cell, self._terms[cell_term], self._keyword_names[cell_term]).tolist()
+        counts = counts.tolist()
+        bounds = np.searchsorted(cell_doc, np.arange(n + 1)).tolist()
+
+        keywords: List[Dict[str, int]] = []
+        for d in range(n):
+            doc_counts = dict(zip(keys[bounds[d]:bounds[d + 1]], counts[bounds[d]:bounds[d + 1]]))
+            if has_phrase[d]:
+                # El trie recorre solo las posiciones de inicio de frase
+                doc_counts = self.matcher.resolve(token_lists[d], doc_counts)
+            keywords.append(doc_counts)
+
+        return list(zip(keywords, positive.tolist(), negative.tolist()))
+
+
+# ==================== BENCHMARK ====================
+
+if __name__ == "__main__":
+    # Camino escalar vs matriz dispersa sobre un lote de artículos tokenizados (python batch_scoring.py [n])
+    import random
+    import sys
+    import time
+
+    from processor import TextProcessor
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    processor = TextProcessor()
+    random.seed(7)
+    filler = [f"palabra{i}" for i in range(5000)]
+    lexicon = (
+        [k.lower() for k in processor.lexicon.economic_keywords]
+        + sorted(processor.positive_words) + sorted(processor.negative_words)
+    )
+    documents = [
+        processor.tokenize(processor.normalize_text(" ".join(
+            random.choice(lexicon) if random.random() < 0.08 else random.choice(filler)
+            for _ in range(random.randint(200, 1200))
+        )))
+        for _ in range(n)
+    ]
+
+    started = time.perf_counter()
+    scalar = [(processor.extract_economic_keywords(tokens), processor.calculate_sentiment(tokens)) for tokens in documents]
+    scalar_seconds = time.perf_counter() - started
+
+    from processor import rank_keywords, sentiment_from_counts
+    started = time.perf_counter()
+    vectorized = [
+        (rank_keywords(keywords), sentiment_from_counts(pos, neg))
+        for keywords, pos, neg in processor.batch_scorer.score(documents)
+    ]
+    vectorized_seconds = time.perf_counter() - started
+
+    tokens = sum(map(len, documents))
+    print(f"{n} artículos, {tokens} tokens")
+    print(f"escalar:   {scalar_seconds * 1000:8.1f} ms ({n / scalar_seconds:,.0f} art/s)")
+    print(f"matricial: {vectorized_seconds * 1000:8.1f} ms ({n / vectorized_seconds:,.0f} art/s)")
+    print(f"idénticos: {scalar == vectorized} (orden de keywords: "
+          f"{all(list(a[0]) == list(b[0]) for a, b in zip(scalar, vectorized))})")
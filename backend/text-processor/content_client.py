@@ -0,0 +1,82 @@
+"""
+Content Client - News2Market
+
+Lectura del contenido completo de los artículos desde data-acquisition.
+commoncrawl.news_articles.content guarda solo un extracto; el texto completo vive en el
+almacén de contenido de data-acquisition (directorio local o S3), al que este servicio no
+tiene acceso directo. Se lee con GET /articles/{id}/content, en paralelo dentro de cada lote.
+
+Autor: Equipo News2Market
+Versión: 1.0.0
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Vacío = procesar solo el extracto guardado en la BD
+DATA_SERVICE_URL = os.getenv('DATA_SERVICE_URL', 'http://data-acquisition:8001').rstrip('/')
+CONTENT_FETCH_TIMEOUT = float(os.getenv('CONTENT_FETCH_TIMEOUT', '10'))
+# Peticiones simultáneas por lote
+CONTENT_FETCH_CONCURRENCY = int(os.getenv('CONTENT_FETCH_CONCURRENCY', '8'))
+
+_client: Optional[httpx.Client] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _get_client() -> httpx.Client:
+    global _client, _executor
+    with _lock:
+        if _client is None:
+            _client = httpx.Client(
+                base_url=DATA_SERVICE_URL,
+                timeout=CONTENT_FETCH_TIMEOUT,
+                limits=httpx.Limits(max_connections=CONTENT_FETCH_CONCURRENCY)
+            )
+            _executor = ThreadPoolExecutor(max_workers=CONTENT_FETCH_CONCURRENCY, thread_name_prefix='content')
+        return _client
+
+
+def _fetch_text(article_id: int) -> Optional[str]:
+    try:
+        response = _get_client().get(f"/articles/{article_id}/content")
+        response.raise_for_status()
+        return response.json().get('text')
+    except Exception as e:
+        logger.warning(f"⚠️ Sin contenido completo para el artículo {article_id}, se usa el extracto: {e}")
+        return None
+
+
+def fetch_texts(article_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Texto completo de varios artículos (bloqueante)
+
+    Args:
+        article_ids: IDs con content_uri en commoncrawl.news_articles
+
+    Returns:
+        Dict[int, str]: {article_id: texto}; los que fallan se omiten (el llamador usa el extracto)
+    """
+    article_ids = list(article_ids)
+    if not article_ids or not DATA_SERVICE_URL:
+        return {}
+    _get_client()
+    texts = _executor.map(_fetch_text, article_ids)
+    return {article_id: text for article_id, text in zip(article_ids, texts) if text}
+
+
+def close():
+    """Cerrar el cliente HTTP y sus hilos"""
+    global _client, _executor
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _executor.shutdown(wait=False)
+            _client = _executor = None
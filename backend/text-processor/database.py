@@ -8,13 +8,17 @@ Autor: Equipo News2Market
 Versión: 1.0.0
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, JSON, Boolean, text
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, Date, DateTime, JSON, Boolean, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import os
 import logging
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Any
+
+import content_client
+from article_record import ArticleRecord
 
 logger = logging.getLogger(__name__)
 
@@ -29,14 +33,26 @@ if not DATABASE_URL:
     name = os.getenv('DATABASE_NAME', 'newsdb')
     DATABASE_URL = f'postgresql://{user}:{password}@{host}:{port}/{name}'
 
+# Tamaño del pool de conexiones
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+
 # Crear engine
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=10, max_overflow=20)
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=3600
+)
 
 # Crear session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base para modelos
 Base = declarative_base()
+# Tablas de otros servicios (solo lectura/actualización, init_db no las crea)
+SourceBase = declarative_base()
 
 # ==================== MODELOS ====================
 
@@ -51,6 +67,7 @@ class ProcessedArticle(Base):
     economic_keywords = Column(JSON)  # {"keyword": count}
     sentiment_score = Column(Float)
     entities = Column(JSON)  # Lista de entidades
+    lexicon_version = Column(String(32), nullable=True)  # Versión del léxico usada
     processed_at = Column(DateTime, default=datetime.utcnow)
     processing_time_ms = Column(Float, nullable=True)
     error_message = Column(Text, nullable=True)
@@ -65,16 +82,38 @@ class ProcessedArticle(Base):
             "economic_keywords": self.economic_keywords,
             "sentiment_score": self.sentiment_score,
             "entities": self.entities,
+            "lexicon_version": self.lexicon_version,
             "processed_at": self.processed_at.isoformat() if self.processed_at else None,
             "processing_time_ms": self.processing_time_ms
         }
 
+class SourceArticle(SourceBase):
+    """Artículo original guardado por data-acquisition (commoncrawl.news_articles)"""
+    __tablename__ = "news_articles"
+    __table_args__ = {'schema': 'commoncrawl'}
+    
+    id = Column(Integer, primary_key=True)
+    url = Column(String(1000), nullable=False)
+    title = Column(String(500), nullable=False)
+    content = Column(Text, nullable=False)  # Extracto; el texto completo está en content_uri
+    content_uri = Column(String(1000))
+    date = Column(Date)
+    language = Column(String(10))
+    source_domain = Column(String(255))
+    processed = Column(Boolean, default=False)
+
 # ==================== FUNCIONES DE BASE DE DATOS ====================
 
 def init_db():
     """Inicializar base de datos y crear tablas"""
     try:
         Base.metadata.create_all(bind=engine)
+        
+        # create_all no agrega columnas a tablas existentes
+        with engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE processed_articles ADD COLUMN IF NOT EXISTS lexicon_version VARCHAR(32)"
+            ))
         logger.info("✅ Tablas de base de datos creadas/verificadas")
     except Exception as e:
         logger.error(f"❌ Error inicializando base de datos: {e}")
@@ -98,10 +137,11 @@ def save_processed_article(
     economic_keywords: Dict[str, int],
     sentiment_score: float,
     entities: List[str],
-    processing_time_ms: Optional[float] = None
-) -> Optional[ProcessedArticle]:
+    processing_time_ms: Optional[float] = None,
+    lexicon_version: Optional[str] = None
+) -> bool:
     """
-    Guardar o actualizar artículo procesado
+    Guardar o actualizar artículo procesado (upsert de un solo artículo con save_processed_articles)
     
     Args:
         article_id: ID del artículo original
@@ -111,52 +151,126 @@ def save_processed_article(
         sentiment_score: Score de sentimiento
         entities: Lista de entidades
         processing_time_ms: Tiempo de procesamiento en ms
+        lexicon_version: Versión del léxico usada
+        
+    Returns:
+        bool: True si se guardó, False si falla
+    """
+    try:
+        save_processed_articles([{
+            'article_id': article_id,
+            'cleaned_content': cleaned_content,
+            'word_count': word_count,
+            'economic_keywords': economic_keywords,
+            'sentiment_score': sentiment_score,
+            'entities': entities,
+            'processing_time_ms': processing_time_ms,
+            'lexicon_version': lexicon_version
+        }])
+        return True
+    except Exception:
+        return False
+
+def get_source_articles(article_ids: List[int]) -> List[ArticleRecord]:
+    """
+    Cargar título, contenido y URL de varios artículos originales en una sola consulta.
+    news_articles.content es solo un extracto: el texto completo se lee de content_uri
+    (vía data-acquisition) y el extracto queda como respaldo si no hay URI o falla la lectura.
+    
+    Args:
+        article_ids: IDs en commoncrawl.news_articles
         
     Returns:
-        ProcessedArticle: Objeto guardado o None si falla
+        List[ArticleRecord]: Artículos encontrados (los IDs inexistentes se omiten)
     """
+    if not article_ids:
+        return []
+    
     db = SessionLocal()
     try:
-        # Verificar si ya existe
-        existing = db.query(ProcessedArticle).filter(
-            ProcessedArticle.article_id == article_id
-        ).first()
+        rows = db.query(
+            SourceArticle.id, SourceArticle.url, SourceArticle.title, SourceArticle.content,
+            SourceArticle.content_uri, SourceArticle.date, SourceArticle.language, SourceArticle.source_domain
+        ).filter(SourceArticle.id.in_(article_ids)).all()
+    finally:
+        db.close()
+    
+    # Fuera de la sesión: no retener una conexión del pool durante las peticiones HTTP
+    full_texts = content_client.fetch_texts(row.id for row in rows if row.content_uri)
+    
+    return [
+        ArticleRecord(
+            url=row.url,
+            title=row.title or '',
+            content=full_texts.get(row.id) or row.content or '',
+            date=row.date.isoformat() if row.date else '',
+            language=row.language or 'es',
+            source_domain=row.source_domain or '',
+            content_uri=row.content_uri,
+            article_id=row.id
+        )
+        for row in rows
+    ]
+
+def save_processed_articles(results: List[Dict[str, Any]]) -> int:
+    """
+    Guardar o actualizar un lote de artículos procesados con un único
+    INSERT ... ON CONFLICT (article_id) DO UPDATE, y marcar processed = true en
+    commoncrawl.news_articles, todo en una transacción con una conexión del pool.
+    
+    Args:
+        results: Resultados de TextProcessor con 'article_id' (y opcionalmente 'processing_time_ms')
         
-        if existing:
-            # Actualizar
-            existing.cleaned_content = cleaned_content
-            existing.word_count = word_count
-            existing.economic_keywords = economic_keywords
-            existing.sentiment_score = sentiment_score
-            existing.entities = entities
-            existing.processed_at = datetime.utcnow()
-            existing.processing_time_ms = processing_time_ms
-            logger.info(f"📝 Artículo {article_id} actualizado")
-        else:
-            # Crear nuevo
-            new_article = ProcessedArticle(
-                article_id=article_id,
-                cleaned_content=cleaned_content,
-                word_count=word_count,
-                economic_keywords=economic_keywords,
-                sentiment_score=sentiment_score,
-                entities=entities,
-                processing_time_ms=processing_time_ms
+    Returns:
+        int: Número de artículos guardados
+    """
+    if not results:
+        return 0
+    
+    now = datetime.utcnow()
+    # Un INSERT ... ON CONFLICT no puede tocar dos veces la misma fila: gana el último resultado
+    rows = {
+        result['article_id']: {
+            'article_id': result['article_id'],
+            'cleaned_content': result['cleaned_content'],
+            'word_count': result['word_count'],
+            'economic_keywords': result['economic_keywords'],
+            'sentiment_score': result['sentiment_score'],
+            'entities': result['entities'],
+            'processed_at': now,
+            'processing_time_ms': result.get('processing_time_ms'),
+            'error_message': result.get('error'),
+            'lexicon_version': result.get('lexicon_version')
+        }
+        for result in results
+    }
+    
+    stmt = pg_insert(ProcessedArticle).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProcessedArticle.article_id],
+        set_={
+            column: stmt.excluded[column]
+            for column in (
+                'cleaned_content', 'word_count', 'economic_keywords', 'sentiment_score',
+                'entities', 'processed_at', 'processing_time_ms', 'error_message', 'lexicon_version'
             )
-            db.add(new_article)
-            logger.info(f"✅ Artículo {article_id} guardado")
-            existing = new_article
-        
-        db.commit()
-        db.refresh(existing)
-        return existing
+        }
+    )
+    
+    try:
+        with engine.begin() as conn:
+            conn.execute(stmt)
+            conn.execute(
+                update(SourceArticle)
+                .where(SourceArticle.id.in_(list(rows)))
+                .values(processed=True)
+            )
+        logger.info(f"✅ Lote de {len(rows)} artículos procesados guardado")
+        return len(rows)
         
     except Exception as e:
-        logger.error(f"❌ Error guardando artículo {article_id}: {e}")
-        db.rollback()
-        return None
-    finally:
-        db.close()
+        logger.error(f"❌ Error guardando lote de artículos procesados: {e}")
+        raise
 
 def get_unprocessed_articles(limit: int = 100) -> List[int]:
     """
@@ -0,0 +1,87 @@
+"""
+Gazetteer - News2Market
+
+Extracción de entidades por diccionario: emisores del COLCAP (con sus nemotécnicos),
+bancos, ministerios, instituciones y regiones de Colombia, cada una con sus alias.
+
+Los alias se compilan una vez, con el mismo tokenizador que el texto (minúsculas, sin
+stopwords), en un trie de tokens (PhraseMatcher). La búsqueda es una pasada lineal sobre
+los tokens del artículo con la coincidencia más larga desde la izquierda: "Banco de
+Bogotá" cuenta como el emisor y no como la región "Bogotá". Cada alias se registra
+también sin tildes ("Bogota", "Medellin") porque así llega una parte del texto.
+
+El resultado son ids canónicos ("issuer:ECOPETROL", "region:ANTIOQUIA") con su conteo.
+Los alias viven en la sección "entities" de cada léxico versionado (lexicons/*.json).
+
+Autor: Equipo News2Market
+Versión: 1.0.0
+"""
+
+import unicodedata
+from typing import Callable, Dict, Iterable, List
+
+from phrase_matcher import PhraseMatcher
+
+
+def strip_accents(text: str) -> str:
+    """Quitar tildes y diéresis ("Bogotá" -> "Bogota")"""
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c))
+
+
+class Gazetteer:
+    """Alias de entidades compilados una vez en un trie de tokens"""
+
+    __slots__ = ('_matcher', '_entity_ids')
+
+    def __init__(self, entities: Dict[str, Iterable[str]], tokenize: Callable[[str], List[str]]):
+        """
+        Args:
+            entities: {id canónico: alias}
+            tokenize: Función texto -> tokens (la misma normalización que se aplica al artículo)
+
+        Raises:
+            ValueError: Si un alias (ya tokenizado) corresponde a dos entidades
+        """
+        phrases: Dict[str, List[str]] = {}
+        # Alias tokenizado -> id canónico
+        self._entity_ids: Dict[str, str] = {}
+        for entity_id, aliases in entities.items():
+            for alias in aliases:
+                for variant in dict.fromkeys((alias, strip_accents(alias))):
+                    tokens = tokenize(variant)
+                    if not tokens:
+                        continue
+                    key = ' '.join(tokens)
+                    owner = self._entity_ids.setdefault(key, entity_id)
+                    if owner != entity_id:
+                        raise ValueError(f"Alias ambiguo '{alias}': {owner} y {entity_id}")
+                    phrases[key] = tokens
+        self._matcher = PhraseMatcher(phrases)
+
+    def count(self, tokens: List[str]) -> Dict[str, int]:
+        """
+        Contar entidades en una lista de tokens (una pasada, la más larga desde la izquierda)
+
+        Returns:
+            Dict[str, int]: {id canónico: menciones}
+        """
+        counts: Dict[str, int] = {}
+        for alias, n in self._matcher.count(tokens).items():
+            entity_id = self._entity_ids[alias]
+            counts[entity_id] = counts.get(entity_id, 0) + n
+        return counts
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    from processor import TextProcessor
+
+    processor = TextProcessor()
+    text = (
+        "El Banco de la República subió las tasas. Ecopetrol y PFBCOLOM cayeron en la BVC, "
+        "mientras el Banco de Bogotá y el Grupo Energía Bogotá ganaron. El Ministerio de Hacienda "
+        "y Credito Publico habló en Medellin; en Bogotá y Valle del Cauca el DANE reportó empleo."
+    )
+    tokens = processor.tokenize(processor.normalize_text(text))
+    print(processor.entity_gazetteer.count(tokens))
@@ -0,0 +1,223 @@
+"""
+Lexicon - News2Market
+
+Léxicos versionados de TextProcessor: keywords económicas, stopwords, palabras de
+sentimiento y alias de entidades. Cada versión es un archivo lexicons/<versión>.json;
+lexicons/CURRENT (o LEXICON_VERSION) indica la versión activa.
+
+Cada versión se compila una vez (trie de keywords, vocabulario de BatchScorer, trie del
+gazetteer) en un artefacto lexicons/<versión>.pkl que los workers cargan con pickle al
+arrancar o al recargar, sin volver a compilar. El artefacto guarda el hash del JSON de
+origen: si el JSON cambió (o el formato del artefacto), se recompila y se reescribe.
+
+    python lexicon.py compile [versión ...]   # compilar artefactos (todas las versiones por defecto)
+
+Autor: Equipo News2Market
+Versión: 1.0.0
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import tempfile
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEXICON_DIR = os.getenv('LEXICON_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons'))
+# Vacío = la versión indicada en LEXICON_DIR/CURRENT
+LEXICON_VERSION = os.getenv('LEXICON_VERSION', '')
+# Canal de Redis por el que se anuncia la versión activa a todos los pods
+LEXICON_CHANNEL = os.getenv('LEXICON_CHANNEL', 'text_processor:lexicon')
+
+# Versiones válidas como nombre de archivo ("1.0.0", "2024-06-colcap")
+_VERSION_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+# Cambiarlo cuando cambie la estructura de lo compilado (PhraseMatcher, BatchScorer, Gazetteer)
+ARTIFACT_FORMAT = 3
+
+
+class Lexicon:
+    """Listas de palabras de una versión del léxico y sus estructuras compiladas"""
+
+    __slots__ = (
+        'version', 'checksum', 'economic_keywords', 'stopwords', 'positive_words', 'negative_words',
+        'keyword_matcher', 'batch_scorer', 'entity_gazetteer'
+    )
+
+    def __init__(self, version: str, checksum: str, economic_keywords: List[str], stopwords: FrozenSet[str],
+                 positive_words: FrozenSet[str], negative_words: FrozenSet[str],
+                 keyword_matcher, batch_scorer, entity_gazetteer):
+        self.version = version
+        self.checksum = checksum
+        self.economic_keywords = economic_keywords
+        self.stopwords = stopwords
+        self.positive_words = positive_words
+        self.negative_words = negative_words
+        self.keyword_matcher = keyword_matcher
+        self.batch_scorer = batch_scorer
+        self.entity_gazetteer = entity_gazetteer
+
+
+# ===== ARCHIVOS =====
+
+def source_path(version: str, lexicon_dir: str = LEXICON_DIR) -> str:
+    return os.path.join(lexicon_dir, f"{version}.json")
+
+
+def artifact_path(version: str, lexicon_dir: str = LEXICON_DIR) -> str:
+    return os.path.join(lexicon_dir, f"{version}.pkl")
+
+
+def current_version(lexicon_dir: str = LEXICON_DIR) -> str:
+    """Versión activa: LEXICON_VERSION o el contenido de LEXICON_DIR/CURRENT"""
+    if LEXICON_VERSION:
+        return LEXICON_VERSION
+    with open(os.path.join(lexicon_dir, 'CURRENT'), encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def available_versions(lexicon_dir: str = LEXICON_DIR) -> List[str]:
+    """Versiones con archivo JSON en el directorio de léxicos"""
+    return sorted(
+        os.path.basename(path)[:-len('.json')]
+        for path in glob.glob(os.path.join(lexicon_dir, '*.json'))
+    )
+
+
+def read_source(version: str, lexicon_dir: str = LEXICON_DIR) -> Tuple[Dict[str, Any], str]:
+    """
+    Leer el JSON de una versión
+
+    Returns:
+        (contenido, sha256 del archivo)
+
+    Raises:
+        ValueError: Si la versión no es un nombre válido o no coincide con la declarada en el archivo
+    """
+    if not _VERSION_PATTERN.match(version) or '..' in version:
+        raise ValueError(f"Versión de léxico inválida: {version!r}")
+    with open(source_path(version, lexicon_dir), 'rb') as f:
+        raw = f.read()
+    source = json.loads(raw)
+    if source.get('version') != version:
+        raise ValueError(f"El léxico {source_path(version, lexicon_dir)} declara la versión {source.get('version')!r}")
+    return source, hashlib.sha256(raw).hexdigest()
+
+
+# ===== COMPILACIÓN =====
+
+def compile_lexicon(source: Dict[str, Any], checksum: str) -> Lexicon:
+    """Compilar tries y vocabulario de una versión con la misma normalización que el texto"""
+    from batch_scoring import BatchScorer
+    from gazetteer import Gazetteer
+    from phrase_matcher import PhraseMatcher
+    from processor import normalize_text, tokenize
+
+    stopwords = frozenset(source['stopwords'])
+    positive_words = frozenset(source['positive_words'])
+    negative_words = frozenset(source['negative_words'])
+
+    def tokenize_term(term: str) -> List[str]:
+        return tokenize(normalize_text(term), stopwords)
+
+    keyword_matcher = PhraseMatcher.compile(source['economic_keywords'], tokenize_term)
+    return Lexicon(
+        version=source['version'],
+        checksum=checksum,
+        economic_keywords=list(source['economic_keywords']),
+        stopwords=stopwords,
+        positive_words=positive_words,
+        negative_words=negative_words,
+        keyword_matcher=keyword_matcher,
+        batch_scorer=BatchScorer(keyword_matcher, positive_words, negative_words),
+        entity_gazetteer=Gazetteer(source.get('entities', {}), tokenize_term)
+    )
+
+
+def save_artifact(lexicon: Lexicon, path: str):
+    """Escribir el artefacto de forma atómica (archivo temporal + rename)"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'format': ARTIFACT_FORMAT, 'lexicon': lexicon}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _read_artifact(path: str, checksum: str) -> Optional[Lexicon]:
+    try:
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Artefacto de léxico ilegible {path}: {e}")
+        return None
+    if artifact.get('format') != ARTIFACT_FORMAT or artifact['lexicon'].checksum != checksum:
+        return None
+    return artifact['lexicon']
+
+
+def load(version: Optional[str] = None, lexicon_dir: str = LEXICON_DIR) -> Lexicon:
+    """
+    Cargar una versión del léxico desde su artefacto compilado (o compilarla si falta o está desactualizado)
+
+    Args:
+        version: Versión a cargar (None = current_version())
+
+    Returns:
+        Lexicon: Léxico listo para TextProcessor
+    """
+    version = version or current_version(lexicon_dir)
+    source, checksum = read_source(version, lexicon_dir)
+    path = artifact_path(version, lexicon_dir)
+
+    lexicon = _read_artifact(path, checksum)
+    if lexicon is not None:
+        logger.debug(f"📚 Léxico {version} cargado desde {path}")
+        return lexicon
+
+    lexicon = compile_lexicon(source, checksum)
+    try:
+        save_artifact(lexicon, path)
+        logger.info(f"📚 Léxico {version} compilado en {path}")
+    except OSError as e:
+        # Directorio de solo lectura: se usa lo compilado en memoria
+        logger.warning(f"⚠️ No se pudo guardar el artefacto del léxico {version}: {e}")
+    return lexicon
+
+
+# ==================== CLI ====================
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Usar el módulo importado (no __main__) para que el artefacto referencie lexicon.Lexicon
+    from lexicon import artifact_path, available_versions, compile_lexicon, load, read_source, save_artifact
+
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'compile':
+        print("Uso: python lexicon.py compile [versión ...]")
+        sys.exit(1)
+
+    for version in sys.argv[2:] or available_versions():
+        source, checksum = read_source(version)
+        started = time.perf_counter()
+        lexicon = compile_lexicon(source, checksum)
+        compile_ms = (time.perf_counter() - started) * 1000
+        save_artifact(lexicon, artifact_path(version))
+
+        started = time.perf_counter()
+        load(version)
+        load_ms = (time.perf_counter() - started) * 1000
+        print(f"✅ {version}: compilado en {compile_ms:.1f} ms, carga del artefacto {load_ms:.1f} ms "
+              f"({os.path.getsize(artifact_path(version)):,} bytes)")
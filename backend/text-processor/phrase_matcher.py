@@ -0,0 +1,271 @@
+"""
+Phrase Matcher - News2Market
+
+Trie de tokens para contar keywords de una o varias palabras ("tasa de cambio",
+"política económica") en una sola pasada lineal sobre los tokens normalizados.
+
+Las frases se compilan con el mismo tokenizador que el texto, así que las stopwords
+que el tokenizador elimina ("de") también desaparecen de la frase y la frase coincide
+sobre el flujo de tokens ya filtrado. Si dos keywords se solapan gana la más larga
+(coincidencia más larga desde la izquierda) y sus tokens no se vuelven a contar.
+
+count() cuenta los tokens con el mismo lookup en un set por token que el conteo de
+palabras sueltas; si ningún inicio de frase aparece (la mayoría de los artículos) ese
+conteo ya es el resultado. Solo si aparece alguno se resuelven las frases:
+- frases independientes (ninguna contiene a otra ni se solapa con otra, como las keywords
+  económicas): cada frase se cuenta con str.count sobre los tokens unidos, en C
+- si no (alias del gazetteer: "ministerio hacienda" y "ministerio hacienda crédito
+  público"), se recorre el trie desde cada posición de inicio de frase
+
+resolve() parte de conteos de tokens ya hechos (la matriz documento-término de
+BatchScorer) y resuelve las frases igual.
+
+Autor: Equipo News2Market
+Versión: 1.0.0
+"""
+
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Clave de un nodo del trie que guarda la keyword que termina en ese nodo
+_TERMINAL = None
+
+
+def _independent(phrases: List[Tuple[str, ...]]) -> bool:
+    """
+    True si ninguna frase contiene a otra ni un final de una es el comienzo de otra (o de sí
+    misma): sus apariciones nunca se solapan y contarlas por separado equivale al trie
+    """
+    for a in phrases:
+        for b in phrases:
+            if a != b and any(b[i:i + len(a)] == a for i in range(len(b) - len(a) + 1)):
+                return False
+            if any(a[k:] == b[:len(a) - k] for k in range(max(1, len(a) - len(b) + 1), len(a))):
+                return False
+    return True
+
+
+class PhraseMatcher:
+    """Trie de tokens compilado una vez a partir de una lista de keywords"""
+
+    __slots__ = ('_unigrams', '_starts', '_start_tokens', '_keys', '_plain', '_phrase_tokens', '_patterns')
+
+    def __init__(self, phrases: Dict[str, List[str]]):
+        """
+        Args:
+            phrases: {keyword: tokens de la keyword}
+        """
+        root: Dict = {}
+        for keyword, tokens in phrases.items():
+            if not tokens:
+                continue
+            node = root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_TERMINAL] = keyword
+
+        # Token -> keyword de una palabra
+        self._unigrams: Dict[str, str] = {
+            token: node[_TERMINAL] for token, node in root.items() if _TERMINAL in node
+        }
+        # Token -> nodo del trie, para los tokens que pueden iniciar una frase
+        self._starts: Dict[str, Dict] = {
+            token: node for token, node in root.items() if len(node) > (_TERMINAL in node)
+        }
+        self._start_tokens: FrozenSet[str] = frozenset(self._starts)
+        # Tokens que count() cuenta: keywords de una palabra e inicios de frase
+        self._keys: FrozenSet[str] = frozenset(self._unigrams) | self._start_tokens
+        # Cada keyword de una palabra es su propio token: los conteos sin frases ya son el resultado
+        self._plain = all(token == keyword for token, keyword in self._unigrams.items())
+        # Frase -> tokens (los que consume al coincidir); con tokens repetidos gana la última, como en el trie
+        by_tokens = {tuple(tokens): keyword for keyword, tokens in phrases.items() if len(tokens) > 1}
+        self._phrase_tokens: Dict[str, Tuple[str, ...]] = {keyword: tokens for tokens, keyword in by_tokens.items()}
+        # Frases independientes: inicio -> ((frase, patrón para str.count), ...); None = recorrer el trie
+        self._patterns: Optional[Dict[str, Tuple[Tuple[str, str], ...]]] = None
+        if _independent(list(by_tokens)):
+            self._patterns = {}
+            for keyword, tokens in self._phrase_tokens.items():
+                # Tokens separados por dos espacios y patrón con uno a cada lado: dos apariciones
+                # seguidas no comparten el espacio y str.count las cuenta a las dos
+                pattern = ' ' + '  '.join(tokens) + ' '
+                self._patterns[tokens[0]] = self._patterns.get(tokens[0], ()) + ((keyword, pattern),)
+
+    @classmethod
+    def compile(cls, keywords: Iterable[str], tokenize: Callable[[str], List[str]]) -> 'PhraseMatcher':
+        """
+        Compilar keywords con el tokenizador del texto
+
+        Args:
+            keywords: Keywords de una o varias palabras
+            tokenize: Función texto -> tokens (la misma normalización que se aplica al artículo)
+        """
+        return cls({keyword.lower(): tokenize(keyword) for keyword in keywords})
+
+    @property
+    def unigrams(self) -> Dict[str, str]:
+        """Token -> keyword de una palabra"""
+        return self._unigrams
+
+    def phrase_pairs(self) -> List[Tuple[str, str]]:
+        """(primer token, segundo token) de cada frase: una frase solo puede coincidir si ambos aparecen"""
+        return [
+            (start, second)
+            for start, node in self._starts.items()
+            for second in node if second is not _TERMINAL
+        ]
+
+    def count(self, tokens: List[str]) -> Dict[str, int]:
+        """
+        Contar keywords en una lista de tokens (la más larga desde la izquierda)
+
+        Returns:
+            Dict[str, int]: {keyword: ocurrencias}
+        """
+        keys = self._keys
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            if token in keys:
+                counts[token] = counts.get(token, 0) + 1
+
+        if self._start_tokens.isdisjoint(counts):
+            # Ninguna frase puede coincidir
+            if self._plain:
+                return counts
+            unigrams = self._unigrams
+            return {unigrams[token]: n for token, n in counts.items()}
+        return self._resolve(tokens, counts, [token for token in self._starts if token in counts])
+
+    def resolve(self, tokens: List[str], counts: Dict[str, int]) -> Dict[str, int]:
+        """
+        Keywords a partir de los conteos de tokens ya hechos (p. ej. una matriz documento-término)
+
+        Args:
+            tokens: Tokens del documento (solo se recorren si alguna frase puede coincidir)
+            counts: {token: ocurrencias} en orden de primera aparición; debe incluir al menos
+                    los primeros y segundos tokens de las keywords (se modifica)
+
+        Returns:
+            Dict[str, int]: {keyword: ocurrencias}
+        """
+        # Inicios de frase presentes con al menos un segundo token posible también presente
+        starts = [
+            token for token, node in self._starts.items()
+            if token in counts and any(second in counts for second in node if second is not _TERMINAL)
+        ]
+        return self._resolve(tokens, counts, starts)
+
+    def _resolve(self, tokens: List[str], counts: Dict[str, int], starts: List[str]) -> Dict[str, int]:
+        phrases: Dict[str, int] = {}
+        if starts:
+            if self._patterns is not None:
+                self._count_phrases(tokens, counts, starts, phrases)
+            else:
+                self._match_phrases(tokens, counts, frozenset(starts), phrases)
+
+        unigrams = self._unigrams
+        result = {unigrams[token]: n for token, n in counts.items() if n > 0 and token in unigrams}
+        for keyword, n in phrases.items():
+            result[keyword] = result.get(keyword, 0) + n
+        return result
+
+    def _count_phrases(self, tokens: List[str], counts: Dict[str, int], starts: List[str],
+                       phrases: Dict[str, int]):
+        """Contar frases independientes con str.count y descontar los tokens que consumen"""
+        text = ' ' + '  '.join(tokens) + ' '
+        # (posición de la primera aparición, frase, ocurrencias): las frases quedan en ese orden
+        found = []
+        for start in starts:
+            for keyword, pattern in self._patterns[start]:
+                first = text.find(pattern)
+                if first < 0:
+                    continue
+                n = text.count(pattern, first)
+                found.append((first, keyword, n))
+                for token in self._phrase_tokens[keyword]:
+                    if token in counts:
+                        counts[token] -= n
+        for _, keyword, n in sorted(found):
+            phrases[keyword] = n
+
+    def _match_phrases(self, tokens: List[str], counts: Dict[str, int], starts: FrozenSet[str],
+                       phrases: Dict[str, int]):
+        """Recorrer el trie desde cada inicio de frase y descontar los tokens que consume cada frase"""
+        positions = []
+        for token in starts:
+            i = -1
+            for _ in range(counts[token]):
+                i = tokens.index(token, i + 1)
+                positions.append(i)
+        positions.sort()
+
+        n = len(tokens)
+        next_free = 0
+        for i in positions:
+            if i < next_free:
+                # Inicio ya consumido por una frase anterior
+                continue
+
+            node = self._starts[tokens[i]]
+            match: Optional[str] = None
+            end = i + 1
+            j = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _TERMINAL in node:
+                    match, end = node[_TERMINAL], j
+
+            if match is not None:
+                phrases[match] = phrases.get(match, 0) + 1
+                for token in tokens[i:end]:
+                    if token in counts:
+                        counts[token] -= 1
+                next_free = end
+
+
+# ==================== BENCHMARK ====================
+
+if __name__ == "__main__":
+    # Conteo con frases vs lookup por token en un set (python phrase_matcher.py)
+    import timeit
+
+    from processor import TextProcessor
+
+    processor = TextProcessor()
+    texts = {
+        # Una keyword cada dos tokens y tres frases por oración (peor caso para el trie)
+        "denso": (
+            "El Banco de la República mantuvo la tasa de cambio y la política económica sin cambios; "
+            "el dólar y el COLCAP subieron mientras la inflación y el desempleo bajaron. "
+        ) * 200,
+        # Artículo típico: keywords y frases dispersas entre texto general
+        "típico": (
+            "Según el informe publicado este martes por la entidad, los analistas consultados esperan "
+            "que el comportamiento de los precios continúe durante las próximas semanas en varias "
+            "ciudades del país, aunque advierten sobre la incertidumbre externa. " * 4
+            + "El Banco de la República mantuvo la tasa de cambio; el dólar y la inflación bajaron. "
+        ) * 40,
+        # Sin inicios de frase: el caso más común
+        "sin frases": (
+            "Los analistas del mercado esperan que el gobierno presente la reforma antes de fin de año, "
+            "según fuentes oficiales consultadas esta semana sobre el dólar y la inflación. "
+        ) * 30,
+    }
+    keyword_set = processor.economic_keywords
+    matcher = processor.keyword_matcher
+
+    def per_token_set(tokens: List[str]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            if token in keyword_set:
+                counts[token] = counts.get(token, 0) + 1
+        return counts
+
+    for label, text in texts.items():
+        tokens = processor.tokenize(processor.normalize_text(text))
+        print(f"{label} ({len(tokens)} tokens)")
+        for name, func in (("set por token", per_token_set), ("con frases", matcher.count)):
+            elapsed = min(timeit.repeat(lambda: func(tokens), number=100, repeat=7)) / 100
+            result = func(tokens)
+            print(f"  {name:15s} {elapsed * 1e6:8.1f} µs/artículo -> {dict(list(result.items())[:6])}")
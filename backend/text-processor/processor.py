@@ -10,7 +10,7 @@ Características:
 - Normalización de texto
 - Extracción de keywords económicas colombianas
 - Análisis de sentimiento básico
-- Extracción de entidades nombradas
+- Extracción de entidades por diccionario (emisores COLCAP, bancos, ministerios, regiones)
 - Conteo de palabras y métricas
 
 Autor: Equipo News2Market
@@ -19,100 +19,94 @@ Versión: 1.0.0
 
 from bs4 import BeautifulSoup
 import re
-from typing import Dict, List, Tuple, Any
+from typing import AbstractSet, Dict, List, Tuple, Any, Optional, Union
 from collections import Counter
+from contextlib import nullcontext
 import logging
+import os
+import time
+
+import lexicon as lexicon_store
+from article_record import ArticleRecord
+from lexicon import Lexicon
+from result_cache import ResultCache
 
 logger = logging.getLogger(__name__)
 
-# Palabras clave económicas relevantes para Colombia y COLCAP
-ECONOMIC_KEYWORDS = [
-    # Mercado bursátil
-    "colcap", "bolsa", "acciones", "bursátil", "mercado", "índice",
-    "inversión", "inversionistas", "cotización", "valorización",
-    
-    # Economía general
-    "economía", "económico", "pib", "crecimiento", "desarrollo",
-    "producción", "productividad", "competitividad",
-    
-    # Finanzas
-    "banco", "bancos", "bancario", "financiero", "crédito", "préstamo",
-    "tasa", "tasas", "interés", "financiamiento",
-    
-    # Comercio
-    "comercio", "exportación", "exportaciones", "importación", "importaciones",
-    "balanza", "déficit", "superávit", "aranceles",
-    
-    # Moneda
-    "dólar", "dólares", "peso", "pesos", "divisa", "divisas",
-    "devaluación", "revaluación", "cambio", "tasa de cambio",
-    
-    # Inflación y precios
-    "inflación", "deflación", "precios", "IPC", "costo", "costos",
-    "encarecimiento", "abaratamiento",
-    
-    # Empleo
-    "empleo", "desempleo", "trabajo", "empleos", "desocupación",
-    "ocupación", "laboral", "salario", "salarios",
-    
-    # Sectores
-    "petróleo", "petrolero", "energía", "minería", "agricultura",
-    "industria", "servicios", "construcción", "turismo",
-    
-    # Gobierno y política económica
-    "impuesto", "impuestos", "tributario", "fiscal", "presupuesto",
-    "gasto", "reforma", "política económica",
-    
-    # Crisis y recuperación
-    "crisis", "recesión", "recuperación", "reactivación", "estabilidad",
-    "volatilidad", "riesgo", "incertidumbre"
-]
+# Versión del algoritmo de procesamiento (parte de la clave de la caché de resultados):
+# cambiarla al modificar limpieza, tokenización o el formato del resultado. Los cambios de
+# keywords, stopwords, sentimiento o entidades son versiones del léxico (lexicons/*.json),
+# que también forman parte de la clave
+PROCESSOR_VERSION = "1.3.0"
 
-# Stopwords en español (palabras comunes a ignorar)
-SPANISH_STOPWORDS = {
-    "el", "la", "de", "que", "y", "a", "en", "un", "ser", "se", "no", "haber",
-    "por", "con", "su", "para", "como", "estar", "tener", "le", "lo", "todo",
-    "pero", "más", "hacer", "o", "poder", "decir", "este", "ir", "otro", "ese",
-    "si", "me", "ya", "ver", "porque", "dar", "cuando", "él", "muy", "sin",
-    "vez", "mucho", "saber", "qué", "sobre", "mi", "alguno", "mismo", "yo",
-    "también", "hasta", "año", "dos", "querer", "entre", "así", "primero",
-    "desde", "grande", "eso", "ni", "nos", "llegar", "pasar", "tiempo", "ella",
-    "sí", "día", "uno", "bien", "poco", "deber", "entonces", "poner", "cosa",
-    "tanto", "hombre", "parecer", "nuestro", "tan", "donde", "ahora", "parte",
-    "después", "vida", "quedar", "siempre", "creer", "hablar", "llevar", "dejar",
-    "nada", "cada", "seguir", "menos", "nuevo", "encontrar", "algo", "solo",
-    "decir", "puede", "fue", "han", "son", "sus", "les", "una", "las", "del",
-    "los", "al", "está", "ha", "hay", "fueron", "era", "sean", "son", "sobre"
-}
+# Artículos mínimos por lote para puntuar con la matriz documento-término (processor_pool
+# no parte los lotes por debajo de este tamaño; el lote del worker es BATCH_SIZE)
+VECTORIZED_BATCH_MIN = int(os.getenv('VECTORIZED_BATCH_MIN', '64'))
 
-# Palabras positivas y negativas para análisis de sentimiento básico
-POSITIVE_WORDS = {
-    "crecimiento", "recuperación", "éxito", "ganancia", "beneficio", "aumento",
-    "mejora", "optimismo", "positivo", "favorable", "ventaja", "fortaleza",
-    "prosperidad", "avance", "progreso", "subida", "alza", "expansión",
-    "superávit", "rentabilidad", "eficiencia", "competitivo", "innovación"
-}
+# Entidades distintas por artículo
+MAX_ENTITIES = 20
 
-NEGATIVE_WORDS = {
-    "crisis", "caída", "pérdida", "déficit", "recesión", "desplome", "baja",
-    "declive", "retroceso", "negativo", "desfavorable", "riesgo", "incertidumbre",
-    "volatilidad", "desempleo", "inflación", "devaluación", "colapso", "quiebra",
-    "bancarrota", "deterioro", "debilidad", "contracción", "reducción"
-}
+# ==================== NORMALIZACIÓN ====================
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin URLs, emails ni caracteres especiales (se mantienen acentos y ñ)"""
+    # Convertir a minúsculas
+    text = text.lower()
+    
+    # Eliminar URLs
+    text = re.sub(r'http\S+|www\S+', '', text)
+    
+    # Eliminar emails
+    text = re.sub(r'\S+@\S+', '', text)
+    
+    # Eliminar caracteres especiales pero mantener acentos y ñ
+    text = re.sub(r'[^a-záéíóúüñ\s]', ' ', text)
+    
+    # Eliminar espacios múltiples
+    text = re.sub(r'\s+', ' ', text)
+    
+    return text.strip()
+
+def tokenize(text: str, stopwords: AbstractSet[str]) -> List[str]:
+    """Dividir texto normalizado en tokens de 3+ caracteres que no sean stopwords"""
+    # Dividir por espacios
+    tokens = text.split()
+    
+    # Filtrar palabras muy cortas (menos de 3 caracteres)
+    tokens = [token for token in tokens if len(token) >= 3]
+    
+    # Filtrar stopwords
+    tokens = [token for token in tokens if token not in stopwords]
+    
+    return tokens
 
 class TextProcessor:
     """
     Clase para procesamiento avanzado de texto de artículos de noticias
     """
     
-    def __init__(self):
-        """Inicializar el procesador de texto"""
-        self.economic_keywords = set(ECONOMIC_KEYWORDS)
-        self.stopwords = SPANISH_STOPWORDS
-        self.positive_words = POSITIVE_WORDS
-        self.negative_words = NEGATIVE_WORDS
+    def __init__(self, cache: Optional[ResultCache] = None, lexicon: Optional[Lexicon] = None):
+        """
+        Inicializar el procesador de texto
         
-        logger.info("✅ TextProcessor inicializado")
+        Args:
+            cache: Caché de resultados por contenido (None = sin caché)
+            lexicon: Léxico ya compilado (None = cargar la versión activa de lexicons/)
+        """
+        self.cache = cache
+        self.lexicon = lexicon if lexicon is not None else lexicon_store.load()
+        self.economic_keywords = set(self.lexicon.economic_keywords)
+        self.stopwords = self.lexicon.stopwords
+        self.positive_words = self.lexicon.positive_words
+        self.negative_words = self.lexicon.negative_words
+        # Trie de keywords de una o varias palabras, compilado con la misma normalización que el texto
+        self.keyword_matcher = self.lexicon.keyword_matcher
+        # Vocabulario fijo (keywords + sentimiento) para puntuar lotes con matrices dispersas
+        self.batch_scorer = self.lexicon.batch_scorer
+        # Alias de entidades compilados en un trie de tokens (ids canónicos)
+        self.entity_gazetteer = self.lexicon.entity_gazetteer
+        
+        logger.info(f"✅ TextProcessor inicializado (léxico {self.lexicon.version})")
     
     def clean_html(self, html_content: str) -> str:
         """
@@ -157,22 +151,7 @@ class TextProcessor:
         Returns:
             str: Texto normalizado
         """
-        # Convertir a minúsculas
-        text = text.lower()
-        
-        # Eliminar URLs
-        text = re.sub(r'http\S+|www\S+', '', text)
-        
-        # Eliminar emails
-        text = re.sub(r'\S+@\S+', '', text)
-        
-        # Eliminar caracteres especiales pero mantener acentos y ñ
-        text = re.sub(r'[^a-záéíóúüñ\s]', ' ', text)
-        
-        # Eliminar espacios múltiples
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        return normalize_text(text)
     
     def tokenize(self, text: str) -> List[str]:
         """
@@ -184,20 +163,11 @@ class TextProcessor:
         Returns:
             List[str]: Lista de palabras (tokens)
         """
-        # Dividir por espacios
-        tokens = text.split()
-        
-        # Filtrar palabras muy cortas (menos de 3 caracteres)
-        tokens = [token for token in tokens if len(token) >= 3]
-        
-        # Filtrar stopwords
-        tokens = [token for token in tokens if token not in self.stopwords]
-        
-        return tokens
+        return tokenize(text, self.stopwords)
     
     def extract_economic_keywords(self, tokens: List[str]) -> Dict[str, int]:
         """
-        Extraer y contar keywords económicas del texto
+        Extraer y contar keywords económicas del texto (palabras y frases como "tasa de cambio")
         
         Args:
             tokens: Lista de tokens del texto
@@ -205,17 +175,8 @@ class TextProcessor:
         Returns:
             Dict[str, int]: Diccionario con keywords y sus frecuencias
         """
-        # Contar ocurrencias de keywords económicas
-        keyword_counts = {}
-        
-        for token in tokens:
-            if token in self.economic_keywords:
-                keyword_counts[token] = keyword_counts.get(token, 0) + 1
-        
-        # Ordenar por frecuencia (mayor a menor)
-        keyword_counts = dict(sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True))
-        
-        return keyword_counts
+        # Contar keywords económicas (set por token; las frases solo si aparece su inicio)
+        return rank_keywords(self.keyword_matcher.count(tokens))
     
     def calculate_sentiment(self, tokens: List[str]) -> float:
         """
@@ -233,45 +194,21 @@ class TextProcessor:
         positive_count = sum(1 for token in tokens if token in self.positive_words)
         negative_count = sum(1 for token in tokens if token in self.negative_words)
         
-        total_sentiment_words = positive_count + negative_count
-        
-        if total_sentiment_words == 0:
-            return 0.0  # Neutral
-        
-        # Calcular score normalizado
-        sentiment_score = (positive_count - negative_count) / total_sentiment_words
-        
-        return round(sentiment_score, 3)
+        return sentiment_from_counts(positive_count, negative_count)
     
-    def extract_entities(self, text: str) -> List[str]:
+    def extract_entities(self, tokens: List[str]) -> Dict[str, int]:
         """
-        Extraer entidades nombradas básicas (organizaciones, lugares)
+        Extraer entidades conocidas (emisores COLCAP, bancos, ministerios, instituciones, regiones)
         
         Args:
-            text: Texto del cual extraer entidades
+            tokens: Lista de tokens del texto
             
         Returns:
-            List[str]: Lista de entidades encontradas
+            Dict[str, int]: {id canónico: menciones}, de más a menos mencionada
         """
-        entities = []
-        
-        # Palabras que indican organizaciones
-        org_indicators = ["banco", "empresa", "compañía", "corporación", "grupo", "ministerio"]
-        
-        # Buscar patrones de entidades (palabras capitalizadas)
-        words = text.split()
-        for i, word in enumerate(words):
-            # Si la palabra comienza con mayúscula y no es la primera del texto
-            if word and word[0].isupper() and i > 0:
-                # Verificar si es parte de una organización
-                if i > 0 and any(indicator in words[i-1].lower() for indicator in org_indicators):
-                    entities.append(word)
-                # O si es seguida por palabras en mayúscula (nombres compuestos)
-                elif i < len(words) - 1 and words[i+1] and words[i+1][0].isupper():
-                    entities.append(f"{word} {words[i+1]}")
-        
-        # Eliminar duplicados y retornar
-        return list(set(entities))[:20]  # Limitar a 20 entidades
+        # Una pasada por el trie de alias del gazetteer
+        entity_counts = rank_keywords(self.entity_gazetteer.count(tokens))
+        return dict(list(entity_counts.items())[:MAX_ENTITIES])
     
     def process_article(self, title: str, content: str, url: str) -> Dict[str, Any]:
         """
@@ -284,94 +221,207 @@ class TextProcessor:
             
         Returns:
             Dict[str, Any]: Diccionario con todos los resultados del procesamiento
+                (processing_time_ms: tiempo de este artículo, incluida la caché)
         """
+        started = time.perf_counter()
+        result = self._process_article(title, content, url)
+        result["processing_time_ms"] = _elapsed_ms(started)
+        return result
+    
+    def _process_article(self, title: str, content: str, url: str) -> Dict[str, Any]:
+        cache_key, cached = self._lookup_cache(title, content, url)
+        if cached is not None:
+            return cached
+        
         try:
-            # 1. Limpiar HTML
-            cleaned_text = self.clean_html(content)
-            
-            # 2. Agregar título al texto
-            full_text = f"{title}. {cleaned_text}"
-            
-            # 3. Normalizar
-            normalized_text = self.normalize_text(full_text)
-            
-            # 4. Tokenizar
-            tokens = self.tokenize(normalized_text)
-            
-            # 5. Contar palabras
-            word_count = len(tokens)
-            
-            # 6. Extraer keywords económicas
-            economic_keywords = self.extract_economic_keywords(tokens)
-            
-            # 7. Calcular sentimiento
-            sentiment_score = self.calculate_sentiment(tokens)
-            
-            # 8. Extraer entidades
-            entities = self.extract_entities(cleaned_text)
-            
-            # 9. Calcular métricas adicionales
-            economic_density = len(economic_keywords) / max(word_count, 1)
-            
-            result = {
-                "cleaned_content": cleaned_text[:2000],  # Limitar para almacenamiento
-                "word_count": word_count,
-                "economic_keywords": economic_keywords,
-                "economic_keyword_count": len(economic_keywords),
-                "economic_density": round(economic_density, 4),
-                "sentiment_score": sentiment_score,
-                "entities": entities,
-                "entity_count": len(entities),
-                "title": title,
-                "url": url
-            }
-            
-            logger.debug(f"✅ Artículo procesado: {word_count} palabras, {len(economic_keywords)} keywords económicas")
-            
-            return result
-            
+            cleaned_text, tokens = self._prepare(title, content)
+            result = self._build_result(
+                title, url, cleaned_text, tokens,
+                self.extract_economic_keywords(tokens),
+                self.calculate_sentiment(tokens)
+            )
         except Exception as e:
-            logger.error(f"❌ Error procesando artículo: {e}")
-            # Retornar resultado vacío en caso de error
-            return {
-                "cleaned_content": "",
-                "word_count": 0,
-                "economic_keywords": {},
-                "economic_keyword_count": 0,
-                "economic_density": 0.0,
-                "sentiment_score": 0.0,
-                "entities": [],
-                "entity_count": 0,
-                "title": title,
-                "url": url,
-                "error": str(e)
-            }
-    
-    def batch_process(self, articles: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+            return self._error_result(title, url, e)
+        
+        self._store_cache(cache_key, result)
+        return result
+    
+    def _lookup_cache(self, title: str, content: str, url: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        if self.cache is None:
+            return None, None
+        # Mismo título y contenido con las mismas versiones de procesador y léxico: mismo resultado
+        cache_key = self.cache.key(title, content, self.lexicon.version)
+        cached = self.cache.get(cache_key)
+        return cache_key, ({**cached, "title": title, "url": url} if cached is not None else None)
+    
+    def _store_cache(self, cache_key: Optional[str], result: Dict[str, Any]):
+        if cache_key is not None:
+            self.cache.put(cache_key, result)
+    
+    def _prepare(self, title: str, content: str) -> Tuple[str, List[str]]:
+        """Limpiar HTML, agregar el título, normalizar y tokenizar: (texto limpio, tokens)"""
+        # 1. Limpiar HTML
+        cleaned_text = self.clean_html(content)
+        
+        # 2. Agregar título al texto
+        full_text = f"{title}. {cleaned_text}"
+        
+        # 3. Normalizar
+        normalized_text = self.normalize_text(full_text)
+        
+        # 4. Tokenizar
+        return cleaned_text, self.tokenize(normalized_text)
+    
+    def _build_result(self, title: str, url: str, cleaned_text: str, tokens: List[str],
+                      economic_keywords: Dict[str, int], sentiment_score: float) -> Dict[str, Any]:
+        """Armar el resultado a partir de los tokens, keywords y sentimiento ya calculados"""
+        # Contar palabras
+        word_count = len(tokens)
+        
+        # Extraer entidades
+        entity_counts = self.extract_entities(tokens)
+        
+        # Calcular métricas adicionales
+        economic_density = len(economic_keywords) / max(word_count, 1)
+        
+        logger.debug(f"✅ Artículo procesado: {word_count} palabras, {len(economic_keywords)} keywords económicas")
+        
+        return {
+            "cleaned_content": cleaned_text[:2000],  # Limitar para almacenamiento
+            "word_count": word_count,
+            "economic_keywords": economic_keywords,
+            "economic_keyword_count": len(economic_keywords),
+            "economic_density": round(economic_density, 4),
+            "sentiment_score": sentiment_score,
+            "entities": list(entity_counts),
+            "entity_counts": entity_counts,
+            "entity_count": len(entity_counts),
+            "lexicon_version": self.lexicon.version,
+            "title": title,
+            "url": url
+        }
+    
+    def _error_result(self, title: str, url: str, e: Exception) -> Dict[str, Any]:
+        logger.error(f"❌ Error procesando artículo: {e}")
+        # Retornar resultado vacío en caso de error
+        return {
+            "cleaned_content": "",
+            "word_count": 0,
+            "economic_keywords": {},
+            "economic_keyword_count": 0,
+            "economic_density": 0.0,
+            "sentiment_score": 0.0,
+            "entities": [],
+            "entity_counts": {},
+            "entity_count": 0,
+            "lexicon_version": self.lexicon.version,
+            "title": title,
+            "url": url,
+            "error": str(e)
+        }
+    
+    def batch_process(self, articles: List[Union[ArticleRecord, Dict[str, str]]]) -> List[Dict[str, Any]]:
         """
-        Procesar un lote de artículos
+        Procesar un lote de artículos. Desde VECTORIZED_BATCH_MIN artículos, keywords y
+        sentimiento de todo el lote salen de una matriz documento-término (BatchScorer)
+        con el mismo resultado que process_article.
+        
+        processing_time_ms de cada resultado es el tiempo de ese artículo: en el camino
+        vectorizado, su limpieza y armado del resultado más su parte (por tokens) de la
+        puntuación del lote.
         
         Args:
-            articles: Lista de diccionarios con datos de artículos
-                      Cada uno debe tener: title, content, url
+            articles: Lista de ArticleRecord (o diccionarios con title, content, url)
             
         Returns:
             List[Dict[str, Any]]: Lista con resultados de procesamiento
         """
-        results = []
-        
-        for article in articles:
-            result = self.process_article(
-                title=article.get('title', ''),
-                content=article.get('content', ''),
-                url=article.get('url', '')
-            )
-            results.append(result)
+        articles = [ArticleRecord.coerce(article) for article in articles]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(articles)
+        vectorized = len(articles) >= VECTORIZED_BATCH_MIN
+        
+        if self.cache is not None:
+            # Un solo MGET para los resultados que no están en memoria
+            self.cache.prefetch([self.cache.key(a.title, a.content, self.lexicon.version) for a in articles])
+        
+        # Las escrituras a Redis del lote van en un solo pipeline
+        with self.cache.batch() if self.cache is not None else nullcontext():
+            # (posición, clave de caché, texto limpio, tokens) de los artículos a puntuar en lote
+            pending = []
+            # Milisegundos de limpieza y tokenización de los artículos en pending
+            prepare_ms = []
+            for i, article in enumerate(articles):
+                if not vectorized:
+                    results[i] = self.process_article(
+                        title=article.title,
+                        content=article.content,
+                        url=article.url
+                    )
+                    continue
+                
+                started = time.perf_counter()
+                cache_key, cached = self._lookup_cache(article.title, article.content, article.url)
+                if cached is not None:
+                    results[i] = cached
+                    cached["processing_time_ms"] = _elapsed_ms(started)
+                    continue
+                try:
+                    pending.append((i, cache_key, *self._prepare(article.title, article.content)))
+                    prepare_ms.append((time.perf_counter() - started) * 1000)
+                except Exception as e:
+                    results[i] = self._error_result(article.title, article.url, e)
+                    results[i]["processing_time_ms"] = _elapsed_ms(started)
+            
+            if pending:
+                started = time.perf_counter()
+                scores = self.batch_scorer.score([tokens for _, _, _, tokens in pending])
+                # La puntuación del lote se reparte en proporción a los tokens de cada artículo
+                score_ms_per_token = (time.perf_counter() - started) * 1000 / max(
+                    sum(len(tokens) for _, _, _, tokens in pending), 1
+                )
+                for (i, cache_key, cleaned_text, tokens), (keyword_counts, positive, negative), ms in zip(
+                    pending, scores, prepare_ms
+                ):
+                    started = time.perf_counter()
+                    article = articles[i]
+                    result = self._build_result(
+                        article.title, article.url, cleaned_text, tokens,
+                        rank_keywords(keyword_counts),
+                        sentiment_from_counts(positive, negative)
+                    )
+                    self._store_cache(cache_key, result)
+                    result["processing_time_ms"] = round(
+                        ms + len(tokens) * score_ms_per_token + (time.perf_counter() - started) * 1000, 2
+                    )
+                    results[i] = result
+        
+        for article, result in zip(articles, results):
+            if article.article_id is not None:
+                result["article_id"] = article.article_id
         
         logger.info(f"✅ Lote procesado: {len(results)} artículos")
         
         return results
 
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+def rank_keywords(keyword_counts: Dict[str, int]) -> Dict[str, int]:
+    """Ordenar keywords por frecuencia (mayor a menor; empates en orden de aparición)"""
+    return dict(sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True))
+
+def sentiment_from_counts(positive_count: int, negative_count: int) -> float:
+    """Score de sentimiento (-1.0 a 1.0) a partir de los conteos de palabras positivas y negativas"""
+    total_sentiment_words = positive_count + negative_count
+    
+    if total_sentiment_words == 0:
+        return 0.0  # Neutral
+    
+    # Calcular score normalizado
+    sentiment_score = (positive_count - negative_count) / total_sentiment_words
+    
+    return round(sentiment_score, 3)
+
 # ==================== FUNCIONES AUXILIARES ====================
 
 def calculate_readability(text: str) -> float:
@@ -457,6 +507,6 @@ if __name__ == "__main__":
     print(f"Palabras: {result['word_count']}")
     print(f"Keywords económicas: {result['economic_keywords']}")
     print(f"Sentimiento: {result['sentiment_score']}")
-    print(f"Entidades: {result['entities']}")
+    print(f"Entidades: {result['entity_counts']}")
     print(f"Densidad económica: {result['economic_density']}")
     print("="*50)
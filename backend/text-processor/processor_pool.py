@@ -0,0 +1,252 @@
+"""
+Processor Pool - News2Market
+
+Pool de procesos para ejecutar TextProcessor fuera del event loop.
+process_article es CPU puro (BeautifulSoup, regex, tokenización): en el event loop
+ocupa un solo core y bloquea heartbeats y health checks mientras procesa.
+Cada proceso del pool mantiene un TextProcessor ya inicializado (warm) y los lotes
+se reparten en fragmentos entre todos los procesos. Desde VECTORIZED_BATCH_MIN artículos
+ningún fragmento baja de ese tamaño, para que cada proceso puntúe el suyo con BatchScorer;
+la limpieza HTML y la tokenización, que son la mayor parte del costo, siguen repartidas.
+
+Cada tarea lleva la versión de léxico activa: el proceso que recibe una versión distinta
+de la suya carga ese artefacto y cambia su TextProcessor antes de procesar (recarga en
+caliente sin reiniciar el pool; las tareas en curso terminan con el léxico anterior).
+
+Autor: Equipo News2Market
+Versión: 1.0.0
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import lexicon as lexicon_store
+import result_cache
+from article_record import ArticleRecord
+from processor import VECTORIZED_BATCH_MIN
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """
+    CPUs que el proceso puede usar de verdad: afinidad del proceso acotada por la
+    cuota CFS del cgroup (limits.cpu en k8s). os.cpu_count() devuelve los cores del nodo.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = period = None
+    try:
+        # cgroup v2: "<cuota> <periodo>" o "max <periodo>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: cuota -1 = sin límite
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            pass
+
+    if quota not in (None, 'max', '-1') and int(period) > 0:
+        cpus = min(cpus, -(-int(quota) // int(period)))
+    return max(cpus, 1)
+
+
+# Procesos del pool (0 = procesar en un hilo, sin pool)
+POOL_WORKERS = int(os.getenv('PROCESSOR_POOL_WORKERS', str(available_cpus())))
+# Artículos mínimos por fragmento al repartir un lote
+MIN_CHUNK_SIZE = int(os.getenv('PROCESSOR_POOL_MIN_CHUNK', '4'))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# TextProcessor del proceso worker (o del proceso principal si el pool está desactivado)
+_processor = None
+
+# Aciertos/fallos de la caché de resultados sumados de todos los procesos del pool
+_cache_stats: Counter = Counter()
+
+# Versión de léxico activa en el proceso principal (se envía con cada tarea)
+_lexicon_version: Optional[str] = None
+_lexicon_lock = threading.Lock()
+
+
+def _init_worker():
+    """Inicializar el proceso worker con un TextProcessor reutilizable"""
+    global _processor
+    from processor import PROCESSOR_VERSION, TextProcessor
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'WARNING'))
+    _processor = TextProcessor(cache=result_cache.from_env(PROCESSOR_VERSION))
+
+
+def _get_processor(lexicon_version: Optional[str] = None):
+    global _processor
+    if _processor is None:
+        _init_worker()
+    if lexicon_version is not None and _processor.lexicon.version != lexicon_version:
+        from processor import TextProcessor
+        previous = _processor.lexicon.version
+        _processor = TextProcessor(cache=_processor.cache, lexicon=lexicon_store.load(lexicon_version))
+        logger.info(f"📚 Proceso {os.getpid()}: léxico {previous} -> {lexicon_version}")
+    return _processor
+
+
+def _warm_up(lexicon_version: str) -> None:
+    _get_processor(lexicon_version)
+
+
+def _drain_cache_stats() -> Dict[str, int]:
+    cache = _get_processor().cache
+    return cache.drain_stats() if cache is not None else {}
+
+
+def _process_article(lexicon_version: str, title: str, content: str, url: str) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    result = _get_processor(lexicon_version).process_article(title=title, content=content, url=url)
+    return result, _drain_cache_stats()
+
+
+def _batch_process(lexicon_version: str, articles: List[ArticleRecord]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    results = _get_processor(lexicon_version).batch_process(articles)
+    return results, _drain_cache_stats()
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Pool de procesos compartido (se crea bajo demanda; None si está desactivado)"""
+    global _pool
+    if POOL_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=POOL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            logger.info(f"⚙️  Pool de procesamiento iniciado con {POOL_WORKERS} procesos")
+        return _pool
+
+
+def warm_up():
+    """Arrancar todos los procesos del pool (y sus TextProcessor) antes de la primera tarea"""
+    pool = get_pool()
+    if pool is None:
+        return
+    futures = [pool.submit(_warm_up, lexicon_version()) for _ in range(POOL_WORKERS)]
+    for future in futures:
+        future.result()
+
+
+def shutdown_pool():
+    """Cerrar el pool de procesos"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def lexicon_version() -> str:
+    """Versión de léxico que usan (o adoptarán en su próxima tarea) los procesos del pool"""
+    global _lexicon_version
+    with _lexicon_lock:
+        if _lexicon_version is None:
+            _lexicon_version = lexicon_store.current_version()
+        return _lexicon_version
+
+
+def reload_lexicon(version: Optional[str] = None) -> str:
+    """
+    Activar una versión del léxico (bloqueante: lee o compila el artefacto)
+
+    La versión se carga primero en este proceso para validarla y dejar el artefacto
+    compilado; los procesos del pool la cargan con su siguiente tarea.
+
+    Args:
+        version: Versión a activar (None = la de lexicons/CURRENT o LEXICON_VERSION)
+
+    Returns:
+        str: Versión activa
+    """
+    global _lexicon_version
+    loaded = lexicon_store.load(version)
+    with _lexicon_lock:
+        previous, _lexicon_version = _lexicon_version, loaded.version
+    if previous != loaded.version:
+        logger.info(f"📚 Léxico activo: {previous} -> {loaded.version}")
+    return loaded.version
+
+
+async def _run(func, *args):
+    pool = get_pool()
+    args = (lexicon_version(), *args)
+    if pool is None:
+        result, stats = await asyncio.to_thread(func, *args)
+    else:
+        result, stats = await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    _cache_stats.update(stats)
+    return result
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Aciertos y fallos de la caché de resultados (memoria y Redis) de todos los procesos"""
+    return result_cache.hit_ratios(_cache_stats)
+
+
+async def process_article(title: str, content: str, url: str) -> Dict[str, Any]:
+    """Procesar un artículo en el pool sin bloquear el event loop"""
+    return await _run(_process_article, title or '', content or '', url or '')
+
+
+def default_batch_size(workers: Optional[int] = None) -> int:
+    """
+    Tamaño de lote que reparte un fragmento vectorizado a cada proceso del pool
+    (VECTORIZED_BATCH_MIN por proceso). Con menos de MIN_CHUNK_SIZE x procesos
+    quedan procesos sin trabajo, y cada fragmento pequeño paga su viaje al pool.
+    """
+    workers = POOL_WORKERS if workers is None else workers
+    return max(workers, 1) * VECTORIZED_BATCH_MIN
+
+
+def split_batch(articles: List[ArticleRecord], workers: Optional[int] = None) -> List[List[ArticleRecord]]:
+    """
+    Fragmentos de un lote para los procesos del pool.
+    Por debajo de VECTORIZED_BATCH_MIN: como mucho uno por proceso y de al menos MIN_CHUNK_SIZE.
+    Desde VECTORIZED_BATCH_MIN: tamaños parejos y ninguno menor que VECTORIZED_BATCH_MIN
+    (todos usan el camino vectorizado).
+    """
+    n = len(articles)
+    workers = max(POOL_WORKERS if workers is None else workers, 1)
+    if n < VECTORIZED_BATCH_MIN:
+        chunk_size = max(MIN_CHUNK_SIZE, -(-n // workers))
+        return [articles[i:i + chunk_size] for i in range(0, n, chunk_size)]
+
+    parts = min(workers, n // VECTORIZED_BATCH_MIN)
+    base, extra = divmod(n, parts)
+    chunks, start = [], 0
+    for part in range(parts):
+        end = start + base + (part < extra)
+        chunks.append(articles[start:end])
+        start = end
+    return chunks
+
+
+async def batch_process(articles: List[Union[ArticleRecord, Dict[str, str]]]) -> List[Dict[str, Any]]:
+    """Procesar un lote repartido en fragmentos entre los procesos del pool (conserva el orden)"""
+    articles = [ArticleRecord.coerce(article) for article in articles]
+    if not articles:
+        return []
+
+    results = await asyncio.gather(*(_run(_batch_process, chunk) for chunk in split_batch(articles)))
+    return [result for chunk_results in results for result in chunk_results]
@@ -9,31 +9,59 @@ Versión: 1.0.0
 """
 
 import redis.asyncio as redis
-from typing import Optional, Dict, Any
+from redis.exceptions import ResponseError
+from typing import Optional, Dict, Any, List, Tuple
 import json
 import logging
+import os
+import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Grupo de consumidores compartido por todos los pods del text-processor
+CONSUMER_GROUP = os.getenv('QUEUE_CONSUMER_GROUP', 'text-processor')
+# Milisegundos sin ACK tras los que una entrada se considera abandonada y otro worker la reclama
+VISIBILITY_TIMEOUT_MS = int(os.getenv('QUEUE_VISIBILITY_TIMEOUT_MS', '300000'))
+# Entregas máximas de una misma entrada antes de marcarla como fallida (worker caído en cada intento)
+MAX_DELIVERIES = int(os.getenv('QUEUE_MAX_DELIVERIES', '3'))
+# Milisegundos de inactividad tras los que un consumidor sin pendientes se da de baja del grupo
+CONSUMER_IDLE_MS = int(os.getenv('QUEUE_CONSUMER_IDLE_MS', '3600000'))
+
 class RedisQueue:
-    """Cliente de cola Redis para distribución de tareas"""
+    """
+    Cliente de cola Redis para distribución de tareas (Redis Streams + grupo de consumidores).
+    
+    Cada carril de prioridad es un stream propio; las tareas viajan en el campo 'task' (JSON).
+    Una entrada leída con XREADGROUP queda pendiente para el consumidor hasta su XACK; si el
+    worker muere, tras VISIBILITY_TIMEOUT_MS otro worker la reclama con XAUTOCLAIM.
+    Las entradas confirmadas se borran del stream (XDEL) para que no crezca.
+    
+    Cada tarea arrendada lleva su stream y su id de entrada ('stream', 'entry_id'); las
+    confirmaciones se hacen por id de entrada, así dos entradas del mismo artículo en la
+    cola se confirman cada una por separado.
+    """
     
     # Nombres de las colas
-    TASK_QUEUE = "tasks:text_processor"
-    PROCESSING_QUEUE = "tasks:text_processor:processing"
+    TASK_QUEUE = "tasks:text_processor:stream"
+    PRIORITY_QUEUE = "tasks:text_processor:stream:priority"
     COMPLETED_QUEUE = "tasks:text_processor:completed"
     FAILED_QUEUE = "tasks:text_processor:failed"
+    # Carriles en orden de lectura
+    LANES = (PRIORITY_QUEUE, TASK_QUEUE)
     
-    def __init__(self, redis_url: str):
+    def __init__(self, redis_url: str, consumer: Optional[str] = None):
         """
         Inicializar cliente Redis
         
         Args:
             redis_url: URL de conexión a Redis (ej: redis://localhost:6379/0)
+            consumer: Nombre del consumidor en el grupo (un nombre estable por worker)
         """
         self.redis_url = redis_url
+        self.consumer = consumer or f"consumer-{os.getpid()}"
         self.client: Optional[redis.Redis] = None
+        self._last_reclaim = 0.0
         logger.info(f"RedisQueue configurado con URL: {redis_url}")
     
     async def connect(self):
@@ -46,17 +74,66 @@ class RedisQueue:
             )
             # Verificar conexión
             await self.client.ping()
+            await self._ensure_groups()
             logger.info("✅ Conexión a Redis establecida")
         except Exception as e:
             logger.error(f"❌ Error conectando a Redis: {e}")
             raise
     
+    async def _ensure_groups(self):
+        """Crear los streams y el grupo de consumidores si no existen"""
+        for stream in self.LANES:
+            try:
+                await self.client.xgroup_create(stream, CONSUMER_GROUP, id='0', mkstream=True)
+            except ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+    
     async def disconnect(self):
-        """Cerrar conexión con Redis"""
+        """
+        Cerrar conexión con Redis. El consumidor no se da de baja aquí: sus entradas pendientes
+        las reclama otro worker y, ya vacío, lo borra prune_idle_consumers.
+        Detener el worker loop antes de llamar a este método.
+        """
         if self.client:
             await self.client.close()
             logger.info("👋 Conexión a Redis cerrada")
     
+    async def prune_idle_consumers(self, min_idle_ms: int = CONSUMER_IDLE_MS) -> int:
+        """
+        Borrar del grupo los consumidores sin entradas pendientes e inactivos más de min_idle_ms
+        (pods que ya no existen). Comprobación y borrado van en un script Lua (atómico), así
+        no se borra un consumidor que arrendó entradas entre XINFO CONSUMERS y DELCONSUMER.
+        
+        Returns:
+            int: Consumidores borrados
+        """
+        if not self.client:
+            return 0
+        removed = 0
+        for stream in self.LANES:
+            removed += await self.client.eval(
+                self._PRUNE_CONSUMERS_SCRIPT, 1, stream, CONSUMER_GROUP, min_idle_ms, self.consumer
+            )
+        if removed:
+            logger.info(f"🧹 {removed} consumidores inactivos dados de baja")
+        return removed
+    
+    # KEYS[1] = stream; ARGV = grupo, inactividad mínima (ms), consumidor propio (nunca se borra)
+    _PRUNE_CONSUMERS_SCRIPT = """
+    local removed = 0
+    for _, info in ipairs(redis.call('XINFO', 'CONSUMERS', KEYS[1], ARGV[1])) do
+        local consumer = {}
+        for i = 1, #info, 2 do consumer[info[i]] = info[i + 1] end
+        if consumer['name'] ~= ARGV[3] and consumer['pending'] == 0
+                and consumer['idle'] >= tonumber(ARGV[2]) then
+            redis.call('XGROUP', 'DELCONSUMER', KEYS[1], ARGV[1], consumer['name'])
+            removed = removed + 1
+        end
+    end
+    return removed
+    """
+    
     async def ping(self) -> bool:
         """
         Verificar que Redis está respondiendo
@@ -73,13 +150,16 @@ class RedisQueue:
             logger.error(f"Redis ping falló: {e}")
             return False
     
+    def _lane(self, priority: int) -> str:
+        return self.PRIORITY_QUEUE if priority > 0 else self.TASK_QUEUE
+    
     async def enqueue_task(self, task: Dict[str, Any], priority: int = 0):
         """
         Encolar una tarea para procesamiento
         
         Args:
             task: Diccionario con datos de la tarea
-            priority: Prioridad de la tarea (mayor = más prioritario)
+            priority: Prioridad de la tarea (> 0 va al carril prioritario)
         """
         try:
             if not self.client:
@@ -89,16 +169,7 @@ class RedisQueue:
             task['enqueued_at'] = datetime.utcnow().isoformat()
             task['priority'] = priority
             
-            # Serializar tarea
-            task_json = json.dumps(task)
-            
-            # Agregar a la cola (usar RPUSH para FIFO o ZADD para prioridad)
-            if priority > 0:
-                # Con prioridad (sorted set)
-                await self.client.zadd(self.TASK_QUEUE, {task_json: -priority})
-            else:
-                # Sin prioridad (lista FIFO)
-                await self.client.rpush(self.TASK_QUEUE, task_json)
+            await self.client.xadd(self._lane(priority), {'task': json.dumps(task)})
             
             logger.debug(f"✅ Tarea encolada: article_id={task.get('article_id')}, priority={priority}")
             
@@ -106,6 +177,129 @@ class RedisQueue:
             logger.error(f"❌ Error encolando tarea: {e}")
             raise
     
+    async def enqueue_tasks(self, tasks: List[Dict[str, Any]], priority: int = 0) -> int:
+        """
+        Encolar un lote de tareas en un solo round trip (pipeline)
+        
+        Args:
+            tasks: Lista de tareas
+            priority: Prioridad común del lote
+            
+        Returns:
+            int: Número de tareas encoladas
+        """
+        if not self.client:
+            raise Exception("Redis no conectado")
+        if not tasks:
+            return 0
+        
+        enqueued_at = datetime.utcnow().isoformat()
+        stream = self._lane(priority)
+        
+        async with self.client.pipeline(transaction=False) as pipe:
+            for task in tasks:
+                pipe.xadd(stream, {'task': json.dumps({**task, 'enqueued_at': enqueued_at, 'priority': priority})})
+            await pipe.execute()
+        
+        logger.debug(f"✅ {len(tasks)} tareas encoladas, priority={priority}")
+        return len(tasks)
+    
+    async def requeue_tasks(self, tasks: List[Dict[str, Any]]) -> int:
+        """
+        Devolver tareas arrendadas a su carril (reintento o lote no procesado):
+        agrega entradas nuevas y confirma las originales en una sola transacción
+        
+        Args:
+            tasks: Tareas obtenidas con dequeue_batch (conservan retry_count y priority)
+            
+        Returns:
+            int: Número de tareas reencoladas
+        """
+        if not self.client or not tasks:
+            return 0
+        
+        async with self.client.pipeline(transaction=True) as pipe:
+            for task in tasks:
+                fields = {k: v for k, v in task.items() if k not in self._LEASE_FIELDS}
+                pipe.xadd(self._lane(task.get('priority', 0)), {'task': json.dumps(fields)})
+            self._ack(pipe, tasks)
+            await pipe.execute()
+        
+        logger.debug(f"↩️ {len(tasks)} tareas reencoladas")
+        return len(tasks)
+    
+    # Campos de arriendo que _lease agrega a cada tarea (no se guardan al reencolar)
+    _LEASE_FIELDS = ('stream', 'entry_id')
+    
+    def _ack(self, pipe, tasks: List[Dict[str, Any]]):
+        """Agregar al pipeline el XACK + XDEL de las entradas de esas tareas arrendadas"""
+        by_stream: Dict[str, List[str]] = {}
+        for task in tasks:
+            if task.get('entry_id'):
+                by_stream.setdefault(task['stream'], []).append(task['entry_id'])
+        for stream, entry_ids in by_stream.items():
+            pipe.xack(stream, CONSUMER_GROUP, *entry_ids)
+            pipe.xdel(stream, *entry_ids)
+    
+    def _lease(self, stream: str, entries: List[Tuple[str, Dict[str, str]]]) -> List[Dict[str, Any]]:
+        """Decodificar entradas leídas y anotar en cada tarea la entrada que hay que confirmar"""
+        started_at = datetime.utcnow().isoformat()
+        tasks = []
+        for entry_id, fields in entries:
+            if not fields:
+                # Entrada borrada mientras estaba pendiente
+                continue
+            task = json.loads(fields['task'])
+            task['started_at'] = started_at
+            task['stream'] = stream
+            task['entry_id'] = entry_id
+            tasks.append(task)
+        return tasks
+    
+    async def _reclaim(self, count: int) -> List[Dict[str, Any]]:
+        """
+        Reclamar entradas pendientes de otros consumidores sin ACK más allá de VISIBILITY_TIMEOUT_MS
+        y dar de baja a los consumidores inactivos. Se ejecuta como mucho una vez por mitad del
+        timeout de visibilidad.
+        """
+        now = time.monotonic()
+        if now - self._last_reclaim < VISIBILITY_TIMEOUT_MS / 2000:
+            return []
+        self._last_reclaim = now
+        
+        tasks: List[Dict[str, Any]] = []
+        poisoned: List[Dict[str, Any]] = []
+        for stream in self.LANES:
+            if len(tasks) >= count:
+                break
+            stalled = await self.client.xpending_range(
+                stream, CONSUMER_GROUP, min='-', max='+', count=count - len(tasks), idle=VISIBILITY_TIMEOUT_MS
+            )
+            if not stalled:
+                continue
+            deliveries = {entry['message_id']: entry['times_delivered'] for entry in stalled}
+            result = await self.client.xautoclaim(
+                stream, CONSUMER_GROUP, self.consumer,
+                min_idle_time=VISIBILITY_TIMEOUT_MS, start_id='0-0', count=count - len(tasks)
+            )
+            for entry_id, fields in result[1]:
+                task_list = self._lease(stream, [(entry_id, fields)])
+                # Tareas que tumbaron al worker en cada entrega: no se vuelven a repartir
+                if deliveries.get(entry_id, 1) >= MAX_DELIVERIES:
+                    poisoned.extend(task_list)
+                else:
+                    tasks.extend(task_list)
+        
+        if tasks:
+            logger.warning(f"♻️ {len(tasks)} tareas reclamadas de workers sin respuesta")
+        for task in poisoned:
+            await self.mark_failed(task, f"Sin completar tras {MAX_DELIVERIES} entregas")
+        try:
+            await self.prune_idle_consumers()
+        except ResponseError as e:
+            logger.debug(f"No se pudo limpiar consumidores inactivos: {e}")
+        return tasks
+    
     async def dequeue_task(self, timeout: int = 5) -> Optional[Dict[str, Any]]:
         """
         Obtener una tarea de la cola
@@ -116,112 +310,135 @@ class RedisQueue:
         Returns:
             Optional[Dict[str, Any]]: Tarea o None si no hay tareas
         """
+        tasks = await self.dequeue_batch(1, timeout=timeout)
+        return tasks[0] if tasks else None
+    
+    async def dequeue_batch(self, count: int, timeout: int = 5) -> List[Dict[str, Any]]:
+        """
+        Arrendar hasta `count` tareas: primero las reclamadas a workers caídos, después el
+        carril prioritario y después el normal (XREADGROUP por lotes)
+        
+        Args:
+            count: Máximo de tareas del lote
+            timeout: Si los streams están vacíos, segundos de espera bloqueante por la primera tarea
+            
+        Returns:
+            List[Dict[str, Any]]: Tareas obtenidas (lista vacía si no hay)
+        """
         try:
             if not self.client:
                 raise Exception("Redis no conectado")
             
-            # Intentar obtener de cola con prioridad primero
-            result = await self.client.zpopmin(self.TASK_QUEUE, count=1)
-            
-            if result:
-                task_json, _ = result[0]
-                task = json.loads(task_json)
-                
-                # Marcar como en procesamiento
-                await self.client.hset(
-                    self.PROCESSING_QUEUE,
-                    task.get('article_id', 'unknown'),
-                    json.dumps({
-                        **task,
-                        'started_at': datetime.utcnow().isoformat()
-                    })
-                )
-                
-                logger.debug(f"📥 Tarea obtenida: article_id={task.get('article_id')}")
-                return task
-            
-            # Si no hay en cola con prioridad, intentar en cola normal
-            result = await self.client.blpop(self.TASK_QUEUE, timeout=timeout)
+            tasks = await self._reclaim(count)
+            tasks.extend(await self._read(count - len(tasks)))
             
-            if result:
-                _, task_json = result
-                task = json.loads(task_json)
-                
-                # Marcar como en procesamiento
-                await self.client.hset(
-                    self.PROCESSING_QUEUE,
-                    task.get('article_id', 'unknown'),
-                    json.dumps({
-                        **task,
-                        'started_at': datetime.utcnow().isoformat()
-                    })
-                )
-                
-                logger.debug(f"📥 Tarea obtenida: article_id={task.get('article_id')}")
-                return task
+            if not tasks and timeout:
+                # Streams vacíos: esperar la primera tarea de cualquier carril y completar el lote
+                tasks = await self._read(1, block_ms=timeout * 1000)
+                if tasks and count > len(tasks):
+                    tasks.extend(await self._read(count - len(tasks)))
             
-            return None
+            logger.debug(f"📥 Lote obtenido: {len(tasks)} tareas")
+            return tasks
             
+        except ResponseError as e:
+            if 'NOGROUP' in str(e):
+                # Streams borrados (clear_queue o FLUSHDB): recrear el grupo
+                await self._ensure_groups()
+            logger.error(f"❌ Error obteniendo lote de tareas: {e}")
+            return []
         except Exception as e:
-            logger.error(f"❌ Error obteniendo tarea: {e}")
-            return None
+            logger.error(f"❌ Error obteniendo lote de tareas: {e}")
+            return []
     
-    async def mark_completed(self, article_id: int, result: Dict[str, Any]):
+    async def _read(self, count: int, block_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        """XREADGROUP de entradas nuevas ('>') recorriendo los carriles en orden de prioridad"""
+        if count <= 0:
+            return []
+        
+        if block_ms is not None:
+            # Bloqueo sobre todos los carriles a la vez (una entrada por carril como máximo)
+            result = await self.client.xreadgroup(
+                CONSUMER_GROUP, self.consumer, {stream: '>' for stream in self.LANES},
+                count=count, block=block_ms
+            )
+            return [task for stream, entries in (result or []) for task in self._lease(stream, entries)]
+        
+        tasks: List[Dict[str, Any]] = []
+        for stream in self.LANES:
+            if len(tasks) >= count:
+                break
+            result = await self.client.xreadgroup(
+                CONSUMER_GROUP, self.consumer, {stream: '>'}, count=count - len(tasks)
+            )
+            for _, entries in result or []:
+                tasks.extend(self._lease(stream, entries))
+        return tasks
+    
+    async def mark_completed(self, task: Dict[str, Any], result: Dict[str, Any]):
         """
         Marcar una tarea como completada
         
         Args:
-            article_id: ID del artículo procesado
+            task: Tarea arrendada con dequeue_task/dequeue_batch
             result: Resultado del procesamiento
         """
+        await self.mark_completed_batch([task], [{**result, 'article_id': task.get('article_id')}])
+    
+    async def mark_completed_batch(self, tasks: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+        """
+        Confirmar (XACK) un lote de tareas y registrarlas como completadas en un solo round trip
+        
+        Args:
+            tasks: Tareas arrendadas que quedan resueltas (todas sus entradas se confirman)
+            results: Resultados con 'article_id'
+        """
         try:
-            if not self.client:
+            if not self.client or not tasks:
                 return
             
-            # Remover de procesamiento
-            await self.client.hdel(self.PROCESSING_QUEUE, str(article_id))
-            
-            # Agregar a completados con TTL de 1 hora
-            await self.client.hset(
-                self.COMPLETED_QUEUE,
-                str(article_id),
-                json.dumps({
-                    **result,
-                    'completed_at': datetime.utcnow().isoformat()
-                })
-            )
-            await self.client.expire(self.COMPLETED_QUEUE, 3600)
+            completed_at = datetime.utcnow().isoformat()
+            async with self.client.pipeline(transaction=False) as pipe:
+                self._ack(pipe, tasks)
+                # Agregar a completados con TTL de 1 hora
+                if results:
+                    pipe.hset(self.COMPLETED_QUEUE, mapping={
+                        str(r['article_id']): json.dumps({**r, 'completed_at': completed_at})
+                        for r in results
+                    })
+                    pipe.expire(self.COMPLETED_QUEUE, 3600)
+                await pipe.execute()
             
-            logger.debug(f"✅ Tarea marcada como completada: article_id={article_id}")
+            logger.debug(f"✅ {len(results)} tareas marcadas como completadas")
             
         except Exception as e:
-            logger.error(f"❌ Error marcando tarea como completada: {e}")
+            logger.error(f"❌ Error marcando lote como completado: {e}")
     
-    async def mark_failed(self, article_id: int, error: str):
+    async def mark_failed(self, task: Dict[str, Any], error: str):
         """
-        Marcar una tarea como fallida
+        Confirmar (XACK) una tarea y registrarla como fallida
         
         Args:
-            article_id: ID del artículo
+            task: Tarea arrendada con dequeue_task/dequeue_batch
             error: Mensaje de error
         """
+        article_id = task.get('article_id')
         try:
             if not self.client:
                 return
             
-            # Remover de procesamiento
-            await self.client.hdel(self.PROCESSING_QUEUE, str(article_id))
-            
-            # Agregar a fallidos
-            await self.client.hset(
-                self.FAILED_QUEUE,
-                str(article_id),
-                json.dumps({
-                    'article_id': article_id,
-                    'error': error,
-                    'failed_at': datetime.utcnow().isoformat()
-                })
-            )
+            async with self.client.pipeline(transaction=False) as pipe:
+                self._ack(pipe, [task])
+                pipe.hset(
+                    self.FAILED_QUEUE,
+                    str(article_id),
+                    json.dumps({
+                        'article_id': article_id,
+                        'error': error,
+                        'failed_at': datetime.utcnow().isoformat()
+                    })
+                )
+                await pipe.execute()
             
             logger.debug(f"❌ Tarea marcada como fallida: article_id={article_id}")
             
@@ -239,10 +456,19 @@ class RedisQueue:
             if not self.client:
                 return {}
             
-            pending = await self.client.llen(self.TASK_QUEUE)
-            processing = await self.client.hlen(self.PROCESSING_QUEUE)
-            completed = await self.client.hlen(self.COMPLETED_QUEUE)
-            failed = await self.client.hlen(self.FAILED_QUEUE)
+            async with self.client.pipeline(transaction=False) as pipe:
+                for stream in self.LANES:
+                    pipe.xlen(stream)
+                    pipe.xpending(stream, CONSUMER_GROUP)
+                pipe.hlen(self.COMPLETED_QUEUE)
+                pipe.hlen(self.FAILED_QUEUE)
+                values = await pipe.execute()
+            
+            # Las entradas confirmadas se borran: lo que queda en el stream está pendiente o en proceso
+            lanes = values[:-2]
+            processing = sum(info['pending'] for info in lanes[1::2])
+            pending = sum(lanes[0::2]) - processing
+            completed, failed = values[-2:]
             
             return {
                 "pending": pending,
@@ -271,13 +497,9 @@ class RedisQueue:
                 await self.client.delete(queue_name)
                 logger.info(f"🗑️ Cola {queue_name} limpiada")
             else:
-                await self.client.delete(
-                    self.TASK_QUEUE,
-                    self.PROCESSING_QUEUE,
-                    self.COMPLETED_QUEUE,
-                    self.FAILED_QUEUE
-                )
+                await self.client.delete(*self.LANES, self.COMPLETED_QUEUE, self.FAILED_QUEUE)
                 logger.info("🗑️ Todas las colas limpiadas")
+            await self._ensure_groups()
                 
         except Exception as e:
             logger.error(f"❌ Error limpiando cola: {e}")
@@ -313,7 +535,7 @@ if __name__ == "__main__":
             
             if task:
                 # Marcar como completada
-                await queue.mark_completed(task['article_id'], {"status": "success"})
+                await queue.mark_completed(task, {"status": "success"})
             
             # Estadísticas finales
             stats = await queue.get_queue_stats()
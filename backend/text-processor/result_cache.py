@@ -0,0 +1,208 @@
+"""
+Result Cache - News2Market
+
+Caché de resultados de TextProcessor por hash de (versión del procesador, versión del
+léxico, título, contenido).
+El mismo cuerpo llega una y otra vez (URLs reingeridas, copias sindicadas, reintentos) y
+cada vez se repetía el pipeline completo de limpieza, normalización y tokenización.
+
+Dos niveles:
+- LRU en memoria, acotado (RESULT_CACHE_SIZE), uno por proceso del pool
+- Redis con TTL (RESULT_CACHE_TTL_SECONDS), compartido entre procesos y pods
+
+Las versiones forman parte de la clave: al cambiar el algoritmo (PROCESSOR_VERSION) o
+recargar otro léxico las entradas anteriores dejan de usarse (y expiran por TTL).
+
+Autor: Equipo News2Market
+Versión: 1.0.0
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv('RESULT_CACHE', 'on').lower() not in ('off', 'false', '0')
+CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '2048'))
+CACHE_TTL_SECONDS = int(os.getenv('RESULT_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+# Vacío = solo LRU en memoria
+CACHE_REDIS_URL = os.getenv('RESULT_CACHE_REDIS_URL', os.getenv('REDIS_URL', ''))
+CACHE_REDIS_PREFIX = os.getenv('RESULT_CACHE_PREFIX', 'text_processor:result')
+# Segundos sin intentar Redis tras un error (el procesamiento sigue solo con el LRU)
+CACHE_REDIS_RETRY_SECONDS = float(os.getenv('RESULT_CACHE_REDIS_RETRY_SECONDS', '30'))
+
+# Campos que dependen del artículo y no del contenido: no se guardan en caché
+_PER_ARTICLE_FIELDS = ('title', 'url', 'article_id', 'processing_time_ms')
+
+
+def cache_key(version: str, title: str, content: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (version, title or '', content or ''):
+        digest.update(part.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU en memoria respaldado por Redis, con contadores de aciertos por nivel"""
+
+    def __init__(self, version: str, size: int = CACHE_SIZE, redis_url: str = CACHE_REDIS_URL,
+                 ttl_seconds: int = CACHE_TTL_SECONDS, prefix: str = CACHE_REDIS_PREFIX):
+        self.version = version
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.stats: Counter = Counter()
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # Claves traídas de Redis por prefetch que aún no se han leído (cuentan como acierto en Redis)
+        self._from_redis: set = set()
+        # Claves que el último prefetch no encontró en Redis: get() no repite el GET
+        self._known_missing: set = set()
+        self._pending_writes: Optional[List[Tuple[str, str]]] = None
+        self._redis = None
+        self._redis_down_until = 0.0
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            except Exception as e:
+                logger.warning(f"⚠️ Caché de resultados sin Redis: {e}")
+
+    def key(self, title: str, content: str, lexicon_version: str = '') -> str:
+        return cache_key(f"{self.version}/{lexicon_version}", title, content)
+
+    # ===== REDIS =====
+
+    def _redis_available(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception):
+        logger.warning(f"⚠️ Caché de resultados: Redis no disponible ({e}), solo memoria por {CACHE_REDIS_RETRY_SECONDS:.0f}s")
+        self._redis_down_until = time.monotonic() + CACHE_REDIS_RETRY_SECONDS
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _write_redis(self, items: List[Tuple[str, str]]):
+        if not items or not self._redis_available():
+            return
+        try:
+            with self._redis.pipeline(transaction=False) as pipe:
+                for key, payload in items:
+                    pipe.set(self._redis_key(key), payload, ex=self.ttl_seconds)
+                pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    # ===== LRU =====
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._from_redis.discard(evicted)
+
+    def prefetch(self, keys: List[str]):
+        """Traer de Redis en un solo MGET las claves que no están en memoria"""
+        self._known_missing.clear()
+        missing = [key for key in dict.fromkeys(keys) if key not in self._entries]
+        if not missing or not self._redis_available():
+            return
+        try:
+            payloads = self._redis.mget([self._redis_key(key) for key in missing])
+        except Exception as e:
+            self._redis_failed(e)
+            return
+        for key, payload in zip(missing, payloads):
+            if payload is not None:
+                self._remember(key, json.loads(payload))
+                self._from_redis.add(key)
+            else:
+                self._known_missing.add(key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Resultado en caché (sin los campos propios del artículo) o None"""
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            if key in self._from_redis:
+                self._from_redis.discard(key)
+                self.stats['redis_hits'] += 1
+            else:
+                self.stats['memory_hits'] += 1
+            return value
+
+        if key in self._known_missing:
+            self._known_missing.discard(key)
+        elif self._redis_available():
+            try:
+                payload = self._redis.get(self._redis_key(key))
+            except Exception as e:
+                self._redis_failed(e)
+                payload = None
+            if payload is not None:
+                value = json.loads(payload)
+                self._remember(key, value)
+                self.stats['redis_hits'] += 1
+                return value
+
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Guardar un resultado (en memoria y en Redis, o al cerrar el bloque batch())"""
+        value = {k: v for k, v in result.items() if k not in _PER_ARTICLE_FIELDS}
+        self._known_missing.discard(key)
+        self._remember(key, value)
+        payload = json.dumps(value, ensure_ascii=False)
+        if self._pending_writes is not None:
+            self._pending_writes.append((key, payload))
+        else:
+            self._write_redis([(key, payload)])
+
+    @contextmanager
+    def batch(self):
+        """Agrupar las escrituras a Redis de un lote en un solo pipeline"""
+        if self._pending_writes is not None:
+            yield
+            return
+        self._pending_writes = []
+        try:
+            yield
+        finally:
+            pending, self._pending_writes = self._pending_writes, None
+            self._write_redis(pending)
+
+    def drain_stats(self) -> Dict[str, int]:
+        """Contadores acumulados desde la última llamada (se reinician)"""
+        stats, self.stats = dict(self.stats), Counter()
+        return stats
+
+
+def from_env(version: str) -> Optional[ResultCache]:
+    """Caché configurada por variables de entorno (None si RESULT_CACHE=off)"""
+    return ResultCache(version) if CACHE_ENABLED else None
+
+
+def hit_ratios(stats: Dict[str, int]) -> Dict[str, Any]:
+    """Contadores y proporciones de aciertos para exportar"""
+    memory_hits = stats.get('memory_hits', 0)
+    redis_hits = stats.get('redis_hits', 0)
+    misses = stats.get('misses', 0)
+    lookups = memory_hits + redis_hits + misses
+    return {
+        "lookups": lookups,
+        "memory_hits": memory_hits,
+        "redis_hits": redis_hits,
+        "misses": misses,
+        "hit_ratio": round((memory_hits + redis_hits) / lookups, 4) if lookups else 0.0,
+        "memory_hit_ratio": round(memory_hits / lookups, 4) if lookups else 0.0,
+        "redis_hit_ratio": round(redis_hits / lookups, 4) if lookups else 0.0
+    }
@@ -0,0 +1,44 @@
+import os
+import random
+import sys
+
+import pytest
+
+# Los módulos del servicio son planos (sin paquete): importarlos desde el directorio del servicio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexicon as lexicon_store  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def lexicon():
+    return lexicon_store.load()
+
+
+@pytest.fixture(scope='session')
+def processor(lexicon):
+    from processor import TextProcessor
+    return TextProcessor(cache=None, lexicon=lexicon)
+
+
+@pytest.fixture(scope='session')
+def sample_articles(lexicon):
+    """Artículos HTML con keywords, frases, sentimiento, entidades y relleno, en proporciones variadas"""
+    rng = random.Random(46)
+    words = (
+        list(lexicon.economic_keywords)
+        + sorted(lexicon.positive_words) + sorted(lexicon.negative_words)
+        + ['Banco de Bogotá', 'Ecopetrol', 'Medellín', 'Banco de la República', 'Ministerio de Hacienda']
+        + ['gobierno', 'anunció', 'semana', 'ciudad', 'según', 'informe', 'el', 'de', 'la', 'que']
+    )
+    articles = []
+    for i in range(150):
+        n = rng.choice([0, 5, 40, 200, 600])
+        body = ' '.join(rng.choice(words) for _ in range(n))
+        articles.append({
+            'title': f"Noticia {i}",
+            'content': f"<html><body><p>{body}</p><script>var x = 1;</script></body></html>",
+            'url': f"https://example.com.co/{i}",
+            'article_id': i
+        })
+    return articles
@@ -0,0 +1,56 @@
+"""BatchScorer: mismos conteos (y mismo orden de keywords) que el camino escalar de TextProcessor"""
+
+import random
+
+import pytest
+
+from batch_scoring import BatchScorer
+from phrase_matcher import PhraseMatcher
+
+
+def _scalar(processor, tokens):
+    positive = sum(1 for token in tokens if token in processor.positive_words)
+    negative = sum(1 for token in tokens if token in processor.negative_words)
+    return processor.keyword_matcher.count(tokens), positive, negative
+
+
+def _assert_same(scored, expected):
+    for (keywords, positive, negative), (scalar_keywords, scalar_positive, scalar_negative) in zip(scored, expected):
+        assert list(keywords.items()) == list(scalar_keywords.items())
+        assert (positive, negative) == (scalar_positive, scalar_negative)
+    assert len(scored) == len(expected)
+
+
+def test_random_documents_match_scalar_path(processor):
+    vocabulary = sorted(
+        {t for keyword in processor.lexicon.economic_keywords for t in processor.tokenize(processor.normalize_text(keyword))}
+        | set(processor.positive_words) | set(processor.negative_words)
+    ) + [f"relleno{i}" for i in range(50)]
+    rng = random.Random(48)
+    documents = [[rng.choice(vocabulary) for _ in range(rng.choice([0, 1, 5, 40, 300]))] for _ in range(500)]
+
+    scored = processor.batch_scorer.score(documents)
+
+    _assert_same(scored, [_scalar(processor, tokens) for tokens in documents])
+
+
+def test_sample_articles_match_scalar_path(processor, sample_articles):
+    documents = [processor._prepare(a['title'], a['content'])[1] for a in sample_articles]
+    _assert_same(processor.batch_scorer.score(documents), [_scalar(processor, tokens) for tokens in documents])
+
+
+@pytest.mark.parametrize('documents', [[], [[]], [['nada'], []]])
+def test_empty_batches_and_documents(documents):
+    matcher = PhraseMatcher({'tasa': ['tasa'], 'tasa cambio': ['tasa', 'cambio']})
+    scorer = BatchScorer(matcher, ['alza'], ['caída'])
+    assert scorer.score(documents) == [({}, 0, 0)] * len(documents)
+
+
+def test_phrases_resolved_from_matrix_counts():
+    matcher = PhraseMatcher({'tasa': ['tasa'], 'cambio': ['cambio'], 'tasa cambio': ['tasa', 'cambio']})
+    scorer = BatchScorer(matcher, ['alza'], ['caída'])
+    documents = [['tasa', 'cambio', 'alza', 'tasa'], ['cambio', 'tasa', 'caída', 'caída']]
+    assert scorer.score(documents) == [
+        ({'tasa': 1, 'tasa cambio': 1}, 1, 0),
+        ({'cambio': 1, 'tasa': 1}, 0, 2),
+    ]
@@ -0,0 +1,67 @@
+"""Gazetteer: alias compilados con el tokenizador del artículo, la coincidencia más larga gana"""
+
+import pytest
+
+from gazetteer import Gazetteer, strip_accents
+
+
+def tokenize(text):
+    return [t for t in text.lower().split() if t not in ('de', 'la', 'el', 'y')]
+
+
+ENTITIES = {
+    'issuer:BOGOTA': ['Banco de Bogotá'],
+    'region:BOGOTA': ['Bogotá'],
+    'bank:BANREP': ['Banco de la República', 'Banrep'],
+}
+
+
+def test_longest_alias_wins_and_accentless_variants_match():
+    gazetteer = Gazetteer(ENTITIES, tokenize)
+    tokens = tokenize("el Banco de Bogotá abrió en Bogota y el Banrep en Bogotá")
+    assert gazetteer.count(tokens) == {'issuer:BOGOTA': 1, 'region:BOGOTA': 2, 'bank:BANREP': 1}
+
+
+def test_aliases_of_one_entity_are_summed():
+    gazetteer = Gazetteer(ENTITIES, tokenize)
+    assert gazetteer.count(tokenize("Banrep y Banco de la República")) == {'bank:BANREP': 2}
+
+
+def test_alias_shared_by_two_entities_is_rejected():
+    with pytest.raises(ValueError):
+        Gazetteer({'region:BOGOTA': ['Bogotá'], 'issuer:BOGOTA': ['Bogota']}, tokenize)
+
+
+def test_strip_accents():
+    assert strip_accents("Medellín, Bogotá, pingüino") == "Medellin, Bogota, pinguino"
+
+
+def test_lexicon_gazetteer_on_news_text(processor):
+    text = (
+        "El Banco de la República subió las tasas. Ecopetrol y PFBCOLOM cayeron en la BVC, "
+        "mientras el Banco de Bogotá y el Grupo Energía Bogotá ganaron. El Ministerio de Hacienda "
+        "y Credito Publico habló en Medellin; en Bogotá y Valle del Cauca el DANE reportó empleo."
+    )
+    counts = processor.entity_gazetteer.count(processor.tokenize(processor.normalize_text(text)))
+    assert counts == {
+        'bank:BANREP': 1, 'issuer:ECOPETROL': 1, 'issuer:BCOLOMBIA': 1, 'institution:BVC': 1,
+        'issuer:BOGOTA': 1, 'issuer:GEB': 1, 'ministry:HACIENDA': 1, 'region:MEDELLIN': 1,
+        'region:BOGOTA': 1, 'region:VALLE_CAUCA': 1, 'institution:DANE': 1,
+    }
+
+
+def test_lexicon_gazetteer_matches_reference(processor):
+    import random
+    from test_phrase_matcher import reference_count
+
+    gazetteer = processor.entity_gazetteer
+    phrases = {alias: alias.split() for alias in gazetteer._entity_ids}
+    vocabulary = sorted({t for tokens in phrases.values() for t in tokens}) + ['mercado', 'acciones']
+    rng = random.Random(49)
+    for _ in range(2000):
+        tokens = [rng.choice(vocabulary) for _ in range(rng.randint(0, 30))]
+        expected = {}
+        for alias, n in reference_count(phrases, tokens).items():
+            entity_id = gazetteer._entity_ids[alias]
+            expected[entity_id] = expected.get(entity_id, 0) + n
+        assert gazetteer.count(tokens) == expected, tokens
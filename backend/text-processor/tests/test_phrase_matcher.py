@@ -0,0 +1,75 @@
+"""PhraseMatcher: misma semántica que recorrer las keywords una a una (la más larga desde la izquierda)"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from phrase_matcher import PhraseMatcher
+
+
+def reference_count(phrases, tokens):
+    """Implementación directa: en cada posición, la keyword más larga que empieza ahí"""
+    by_tokens = {tuple(t): keyword for keyword, t in phrases.items() if t}
+    longest = max(map(len, by_tokens), default=0)
+    counts = {}
+    i = 0
+    while i < len(tokens):
+        for size in range(min(longest, len(tokens) - i), 0, -1):
+            keyword = by_tokens.get(tuple(tokens[i:i + size]))
+            if keyword is not None:
+                counts[keyword] = counts.get(keyword, 0) + 1
+                i += size
+                break
+        else:
+            i += 1
+    return counts
+
+
+INDEPENDENT = {
+    'tasa': ['tasa'], 'cambio': ['cambio'], 'tasa de cambio': ['tasa', 'cambio'],
+    'política económica': ['política', 'económica'], 'dólar': ['dólar'], 'banco': ['banco'],
+}
+OVERLAPPING = {
+    'ministerio hacienda': ['ministerio', 'hacienda'],
+    'ministerio hacienda crédito público': ['ministerio', 'hacienda', 'crédito', 'público'],
+    'hacienda crédito': ['hacienda', 'crédito'], 'crédito': ['crédito'], 'a a': ['a', 'a'],
+    'bogotá': ['bogotá'], 'banco bogotá': ['banco', 'bogotá'],
+}
+
+
+def test_independent_phrases_use_str_count_path():
+    assert PhraseMatcher(INDEPENDENT)._patterns is not None
+    assert PhraseMatcher(OVERLAPPING)._patterns is None
+
+
+@pytest.mark.parametrize('phrases', [INDEPENDENT, OVERLAPPING], ids=['independientes', 'solapadas'])
+def test_count_and_resolve_match_reference(phrases):
+    matcher = PhraseMatcher(phrases)
+    vocabulary = sorted({t for tokens in phrases.values() for t in tokens}) + ['otro', 'más']
+    rng = random.Random(46)
+    for _ in range(5000):
+        tokens = [rng.choice(vocabulary) for _ in range(rng.randint(0, 15))]
+        expected = reference_count(phrases, tokens)
+        assert matcher.count(tokens) == expected, tokens
+        assert matcher.resolve(tokens, dict(Counter(tokens))) == expected, tokens
+
+
+def test_phrase_tokens_are_not_counted_alone():
+    matcher = PhraseMatcher(INDEPENDENT)
+    tokens = ['tasa', 'cambio', 'tasa', 'cambio', 'tasa', 'dólar', 'cambio']
+    assert matcher.count(tokens) == {'tasa': 1, 'cambio': 1, 'dólar': 1, 'tasa de cambio': 2}
+
+
+def test_unigrams_keep_order_of_first_appearance():
+    matcher = PhraseMatcher(INDEPENDENT)
+    tokens = ['dólar', 'tasa', 'cambio', 'banco', 'cambio', 'tasa']
+    assert list(matcher.count(tokens)) == ['dólar', 'tasa', 'cambio', 'banco', 'tasa de cambio']
+
+
+def test_lexicon_keywords_match_across_stopwords(processor):
+    tokens = processor.tokenize(processor.normalize_text("La tasa de cambio y la política económica del dólar"))
+    counts = processor.keyword_matcher.count(tokens)
+    assert counts['tasa de cambio'] == 1
+    assert counts['política económica'] == 1
+    assert 'tasa' not in counts
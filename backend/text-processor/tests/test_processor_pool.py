@@ -0,0 +1,80 @@
+"""Reparto de lotes en el pool y equivalencia del camino vectorizado con el escalar"""
+
+import asyncio
+import time
+
+import pytest
+
+import processor
+import processor_pool
+from article_record import ArticleRecord
+
+MIN = processor.VECTORIZED_BATCH_MIN
+
+
+def _records(n):
+    return [ArticleRecord(url=f"u{i}", article_id=i) for i in range(n)]
+
+
+@pytest.mark.parametrize('n', [1, 3, 10, MIN - 1])
+def test_small_batches_spread_across_workers(n):
+    chunks = processor_pool.split_batch(_records(n), workers=4)
+    assert len(chunks) <= 4
+    assert len(chunks[0]) >= min(n, processor_pool.MIN_CHUNK_SIZE)
+    assert [a for chunk in chunks for a in chunk] == _records(n)
+
+
+@pytest.mark.parametrize('n, workers, parts', [
+    (MIN, 4, 1), (2 * MIN - 1, 4, 1), (2 * MIN, 4, 2), (3 * MIN + 1, 4, 3),
+    (4 * MIN, 4, 4), (10 * MIN + 7, 4, 4), (5 * MIN, 1, 1)
+])
+def test_large_batches_use_all_workers_in_vectorized_chunks(n, workers, parts):
+    chunks = processor_pool.split_batch(_records(n), workers=workers)
+    assert len(chunks) == parts
+    # Todos los fragmentos llegan al camino vectorizado
+    assert min(len(chunk) for chunk in chunks) >= MIN
+    assert max(len(chunk) for chunk in chunks) - min(len(chunk) for chunk in chunks) <= 1
+    assert [a for chunk in chunks for a in chunk] == _records(n)
+
+
+@pytest.mark.parametrize('workers', [1, 2, 4, 8])
+def test_default_batch_size_keeps_every_process_busy(workers):
+    chunks = processor_pool.split_batch(_records(processor_pool.default_batch_size(workers)), workers=workers)
+    assert len(chunks) == workers
+    assert min(len(chunk) for chunk in chunks) >= MIN
+
+
+def _without_timing(results):
+    return [{k: v for k, v in r.items() if k != 'processing_time_ms'} for r in results]
+
+
+def test_vectorized_batch_equals_per_article(processor, sample_articles):
+    assert len(sample_articles) >= MIN
+    vectorized = processor.batch_process(sample_articles)
+    scalar = [
+        {**processor.process_article(a['title'], a['content'], a['url']), 'article_id': a['article_id']}
+        for a in sample_articles
+    ]
+    assert _without_timing(vectorized) == _without_timing(scalar)
+
+
+@pytest.mark.parametrize('size', [MIN - 1, MIN])
+def test_batch_process_times_each_article(processor, sample_articles, size):
+    started = time.perf_counter()
+    results = processor.batch_process(sample_articles[:size])
+    batch_ms = (time.perf_counter() - started) * 1000
+    times = [r['processing_time_ms'] for r in results]
+    assert all(t >= 0 for t in times)
+    # Tiempo propio de cada artículo, no el promedio del lote
+    assert len(set(times)) > 1
+    assert sum(times) <= batch_ms
+
+
+def test_pool_batch_process_keeps_order(monkeypatch, sample_articles):
+    monkeypatch.setattr(processor_pool, 'POOL_WORKERS', 0)
+    split = processor_pool.split_batch
+    monkeypatch.setattr(processor_pool, 'split_batch', lambda articles: split(articles, workers=2))
+
+    results = asyncio.run(processor_pool.batch_process(sample_articles))
+
+    assert [r['article_id'] for r in results] == [a['article_id'] for a in sample_articles]
@@ -0,0 +1,108 @@
+"""RedisQueue sobre fakeredis: confirmación por id de entrada, reintentos y baja de consumidores"""
+
+import asyncio
+
+import fakeredis
+import pytest
+
+import queue_client
+from article_record import ArticleRecord
+from queue_client import CONSUMER_GROUP, RedisQueue
+
+
+def make_queue(server, consumer):
+    queue = RedisQueue('redis://fake', consumer=consumer)
+    queue.client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    return queue
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def pending(queue, stream=RedisQueue.TASK_QUEUE):
+    return (await queue.client.xpending(stream, CONSUMER_GROUP))['pending']
+
+
+def test_duplicate_entries_of_one_article_are_all_acked(server):
+    async def scenario():
+        queue = make_queue(server, 'w1')
+        await queue._ensure_groups()
+        await queue.enqueue_tasks([{'article_id': 7}, {'article_id': 7}, {'article_id': 8}])
+        tasks = await queue.dequeue_batch(10, timeout=0)
+        assert [t['article_id'] for t in tasks] == [7, 7, 8]
+        assert len({t['entry_id'] for t in tasks}) == 3
+        await queue.mark_completed_batch(tasks, [{'article_id': 7}, {'article_id': 8}])
+        assert await pending(queue) == 0
+        assert await queue.client.xlen(RedisQueue.TASK_QUEUE) == 0
+    run(scenario())
+
+
+def test_requeue_acks_original_entries_and_drops_lease_fields(server):
+    async def scenario():
+        queue = make_queue(server, 'w1')
+        await queue._ensure_groups()
+        await queue.enqueue_tasks([{'article_id': 1}, {'article_id': 2}])
+        tasks = await queue.dequeue_batch(10, timeout=0)
+        await queue.requeue_tasks(tasks)
+        assert await pending(queue) == 0
+        again = await queue.dequeue_batch(10, timeout=0)
+        assert [t['article_id'] for t in again] == [1, 2]
+        assert {t['entry_id'] for t in again}.isdisjoint(t['entry_id'] for t in tasks)
+    run(scenario())
+
+
+def test_disconnect_keeps_consumer_and_its_pending_entries(server):
+    async def scenario():
+        queue = make_queue(server, 'w1')
+        await queue._ensure_groups()
+        await queue.enqueue_task({'article_id': 1})
+        await queue.dequeue_batch(1, timeout=0)
+        await queue.disconnect()
+        other = make_queue(server, 'w2')
+        consumers = await other.client.xinfo_consumers(RedisQueue.TASK_QUEUE, CONSUMER_GROUP)
+        assert {c['name']: c['pending'] for c in consumers} == {'w1': 1}
+    run(scenario())
+
+
+def test_prune_removes_only_idle_consumers_without_pending(server):
+    async def scenario():
+        busy, idle, me = make_queue(server, 'busy'), make_queue(server, 'idle'), make_queue(server, 'me')
+        await me._ensure_groups()
+        await me.enqueue_task({'article_id': 1})
+        await busy.dequeue_batch(1, timeout=0)
+        await idle.dequeue_batch(1, timeout=0)
+        await me.dequeue_batch(1, timeout=0)
+        # 'idle' en los dos carriles y 'busy' en el prioritario, donde no tiene pendientes
+        assert await me.prune_idle_consumers(min_idle_ms=0) == 3
+        consumers = await me.client.xinfo_consumers(RedisQueue.TASK_QUEUE, CONSUMER_GROUP)
+        assert sorted(c['name'] for c in consumers) == ['busy', 'me']
+        assert await me.prune_idle_consumers(min_idle_ms=10 ** 9) == 0
+    run(scenario())
+
+
+def test_failed_batch_retries_only_tasks_still_leased(server, monkeypatch):
+    import app
+
+    async def failing_batch(articles):
+        raise RuntimeError('pool caído')
+
+    async def scenario():
+        queue = make_queue(server, 'w1')
+        await queue._ensure_groups()
+        monkeypatch.setattr(app, 'redis_queue', queue)
+        monkeypatch.setattr(app.processor_pool, 'batch_process', failing_batch)
+        await queue.enqueue_tasks([{'article_id': 1}, {'article_id': 2}])
+        tasks = await queue.dequeue_batch(10, timeout=0)
+        # El artículo 2 no existe: se confirma como fallido y no se reintenta
+        await app.process_task_batch(tasks, [ArticleRecord(url='u', content='texto', article_id=1)])
+        assert await pending(queue) == 0
+        assert list(await queue.client.hgetall(RedisQueue.FAILED_QUEUE)) == ['2']
+        retried = await queue.dequeue_batch(10, timeout=0)
+        assert [(t['article_id'], t['retry_count']) for t in retried] == [(1, 1)]
+    run(scenario())
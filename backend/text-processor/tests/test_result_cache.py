@@ -0,0 +1,90 @@
+"""ResultCache: LRU en memoria, nivel Redis (fakeredis) y contadores de aciertos"""
+
+import fakeredis
+
+from result_cache import ResultCache, hit_ratios
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """FakeRedis que cuenta los GET individuales"""
+
+    gets = 0
+
+    def get(self, name):
+        self.gets += 1
+        return super().get(name)
+
+
+def make_cache(size=2, redis=None):
+    cache = ResultCache('v1', size=size, redis_url='')
+    cache._redis = redis
+    return cache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = make_cache(size=2)
+    cache.put('a', {'word_count': 1})
+    cache.put('b', {'word_count': 2})
+    assert cache.get('a') == {'word_count': 1}
+    cache.put('c', {'word_count': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.drain_stats() == {'memory_hits': 3, 'misses': 1}
+    assert cache.drain_stats() == {}
+
+
+def test_per_article_fields_are_not_cached():
+    cache = make_cache()
+    cache.put('a', {'word_count': 1, 'title': 't', 'url': 'u', 'article_id': 7, 'processing_time_ms': 1.5})
+    assert cache.get('a') == {'word_count': 1}
+
+
+def test_key_depends_on_lexicon_version_and_content():
+    cache = make_cache()
+    assert cache.key('t', 'c', 'lex1') == cache.key('t', 'c', 'lex1')
+    assert len({cache.key('t', 'c', 'lex1'), cache.key('t', 'c', 'lex2'), cache.key('t', 'd', 'lex1')}) == 3
+
+
+def test_redis_level_hits_and_prefetch_misses_skip_get():
+    redis = CountingRedis()
+    writer = make_cache(redis=redis)
+    with writer.batch():
+        writer.put('a', {'word_count': 1})
+        assert redis.dbsize() == 0
+    assert redis.dbsize() == 1
+
+    reader = make_cache(redis=redis)
+    reader.prefetch(['a', 'b'])
+    assert reader.get('a') == {'word_count': 1}
+    assert reader.get('a') == {'word_count': 1}
+    assert reader.get('b') is None
+    assert redis.gets == 0
+    assert hit_ratios(reader.drain_stats()) == {
+        'lookups': 3, 'memory_hits': 1, 'redis_hits': 1, 'misses': 1,
+        'hit_ratio': 0.6667, 'memory_hit_ratio': 0.3333, 'redis_hit_ratio': 0.3333
+    }
+
+
+def test_redis_errors_fall_back_to_memory():
+    class BrokenRedis:
+        def get(self, name):
+            raise ConnectionError('sin Redis')
+
+    cache = make_cache(redis=BrokenRedis())
+    assert cache.get('a') is None
+    assert not cache._redis_available()
+    cache.put('a', {'word_count': 1})
+    assert cache.get('a') == {'word_count': 1}
+
+
+def test_processor_cache_hit_keeps_article_fields(lexicon):
+    from processor import TextProcessor
+
+    processor = TextProcessor(cache=make_cache(size=8), lexicon=lexicon)
+    content = '<p>La inflación y la tasa de cambio subieron</p>'
+    first = processor.process_article('Título', content, 'https://a.co/1')
+    again = processor.process_article('Título', content, 'https://b.co/2')
+    assert again['url'] == 'https://b.co/2'
+    strip = lambda r: {k: v for k, v in r.items() if k not in ('url', 'processing_time_ms')}
+    assert strip(again) == strip(first)
+    assert processor.cache.drain_stats() == {'misses': 1, 'memory_hits': 1}